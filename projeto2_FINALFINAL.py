@@ -1,13 +1,123 @@
-import networkx as nx
 import random
-import matplotlib.pyplot as plt
 import socket
 import struct
+import numpy as np
+import json
+import os
+import sys
+import time
+import weakref
+import heapq
+import bisect
+import itertools
+import importlib
+from array import array
+from collections import Counter, deque
+from collections.abc import Mapping, MutableMapping, Sequence
+
+
+class _ModuloAdiado:
+    """
+    Substituto de um módulo pesado que só é importado no primeiro acesso a um
+    atributo. Nesse momento o nome global passa a apontar para o módulo real,
+    então os acessos seguintes não passam mais por aqui.
+    """
+
+    def __init__(self, modulo, apelido):
+        self._modulo = modulo
+        self._apelido = apelido
+
+    def __getattr__(self, atributo):
+        modulo = importlib.import_module(self._modulo)
+        globals()[self._apelido] = modulo
+        return getattr(modulo, atributo)
+
+
+# O networkx (~0,25 s) só é carregado quando um GrafoRede é criado; o matplotlib
+# (~0,8 s) é importado dentro das funções de desenho. Assim, gerar datagramas,
+# ler pcaps ou usar o módulo como biblioteca não pagam por eles.
+nx = _ModuloAdiado("networkx", "nx")
 
 ###############################################
 # CLASSE IPDatagram – DATAGRAMA IPv4 COMPLETO
 ###############################################
+# Cabeçalho fixo de 20 bytes (sem opções), pré-compilado
+CABECALHO_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+
+
+def soma_checksum(buffer, inicio=0, fim=None):
+    """
+    Checksum da Internet (complemento de 1 da soma de palavras de 16 bits)
+    da região buffer[inicio:fim], sem laço em Python: como 2^16 ≡ 1 (mód 0xFFFF),
+    a soma com carries de todas as palavras é congruente ao próprio buffer lido
+    como um único inteiro big-endian, então basta um int.from_bytes e um módulo.
+    Regiões de tamanho ímpar são completadas com um byte zero.
+    """
+    with memoryview(buffer) as view:
+        dados = view[inicio:fim]
+        valor = int.from_bytes(dados, "big")
+        if len(dados) % 2:
+            valor <<= 8
+        dados.release()
+    soma = valor % 0xFFFF
+    if soma == 0 and valor:
+        soma = 0xFFFF  # soma em complemento de 1 não nula nunca dá zero
+    return ~soma & 0xFFFF
+
+
+def checksum_lote(buffer, quantidade, tamanho_cabecalho=20, passo=None, offset=0):
+    """
+    Checksum de `quantidade` cabeçalhos guardados em sequência no buffer (um a
+    cada `passo` bytes; por padrão, colados um no outro), calculados de uma vez
+    com NumPy. Aplicado a cabeçalhos completos (com o campo checksum preenchido),
+    o resultado é 0 para cada cabeçalho íntegro.
+    """
+    passo = tamanho_cabecalho if passo is None else passo
+    if passo % 2 or tamanho_cabecalho % 2:
+        raise ValueError("Cabeçalhos e passo devem ter tamanho par.")
+    if quantidade == 0:
+        return np.empty(0, dtype=np.uint16)
+    palavras = np.frombuffer(buffer, dtype=">u2", count=((quantidade - 1) * passo + tamanho_cabecalho) // 2,
+                             offset=offset)
+    palavras = np.lib.stride_tricks.as_strided(palavras, shape=(quantidade, tamanho_cabecalho // 2),
+                                               strides=(passo, 2))
+    soma = palavras.sum(axis=1, dtype=np.uint64)
+    soma = (soma & 0xFFFF) + (soma >> 16)
+    soma = (soma & 0xFFFF) + (soma >> 16)
+    return (~soma & 0xFFFF).astype(np.uint16)
+
+
+def atualizar_checksum(checksum, palavra_antiga, palavra_nova):
+    """
+    Atualização incremental do checksum quando uma palavra de 16 bits do
+    cabeçalho muda (RFC 1624, eq. 3): HC' = ~(~HC + ~m + m').
+    """
+    soma = (~checksum & 0xFFFF) + (~palavra_antiga & 0xFFFF) + palavra_nova
+    soma = (soma & 0xFFFF) + (soma >> 16)
+    soma = (soma & 0xFFFF) + (soma >> 16)
+    return ~soma & 0xFFFF
+
+
+def decrementar_ttl_em_buffer(buffer, offset=0):
+    """
+    Decrementa o TTL de um cabeçalho já serializado no buffer, corrigindo o
+    checksum de forma incremental. Retorna o novo TTL; com TTL 0 (datagrama
+    expirado) gera ValueError e o buffer não muda.
+    """
+    ttl, protocolo, checksum = struct.unpack_from("!BBH", buffer, offset + 8)
+    if ttl == 0:
+        raise ValueError(f"TTL já é 0 no datagrama do offset {offset}: ele deveria ter sido descartado.")
+    novo_checksum = atualizar_checksum(checksum, (ttl << 8) | protocolo, ((ttl - 1) << 8) | protocolo)
+    struct.pack_into("!BBH", buffer, offset + 8, ttl - 1, protocolo, novo_checksum)
+    return ttl - 1
+
+
 class IPDatagram:
+    # Sem __dict__ por instância: simulações mantêm milhões de datagramas vivos.
+    __slots__ = ("version", "ihl", "tos", "payload", "options", "total_length", "identification",
+                 "flags", "fragment_offset", "ttl", "protocol", "checksum",
+                 "_src_ip", "_src_bytes", "_dest_ip", "_dest_bytes")
+
     def __init__(self, src_ip, dest_ip, payload, protocol='TCP', type_of_service=0, ttl=64, flags='DF', options=b''):
         """
         Inicializa um datagrama IPv4 com todos os campos do cabeçalho.
@@ -60,6 +170,58 @@ class IPDatagram:
         self.src_ip = src_ip
         self.dest_ip = dest_ip
 
+    # Os endereços também são guardados já empacotados (4 bytes), para que a
+    # serialização não precise chamar socket.inet_aton a cada datagrama.
+    @property
+    def src_ip(self):
+        return self._src_ip
+
+    @src_ip.setter
+    def src_ip(self, valor):
+        self._src_ip = valor
+        self._src_bytes = socket.inet_aton(valor)
+
+    @property
+    def dest_ip(self):
+        return self._dest_ip
+
+    @dest_ip.setter
+    def dest_ip(self, valor):
+        self._dest_ip = valor
+        self._dest_bytes = socket.inet_aton(valor)
+
+    @classmethod
+    def from_bytes(cls, dados, verificar_checksum=False):
+        """
+        Reconstrói um IPDatagram a partir dos bytes de um datagrama serializado
+        (o inverso de generate()). Bytes além do Total Length são ignorados.
+        """
+        if len(dados) < 20:
+            raise ValueError(f"Datagrama truncado: {len(dados)} bytes (mínimo 20).")
+        (versao_ihl, tos, total_length, identification, flags_offset,
+         ttl, protocol, checksum, src, dest) = CABECALHO_IPV4.unpack_from(dados)
+        ihl = versao_ihl & 0x0F
+        if versao_ihl >> 4 != 4 or ihl < 5 or total_length < ihl * 4 or total_length > len(dados):
+            raise ValueError("Cabeçalho IPv4 inválido.")
+        if verificar_checksum and soma_checksum(dados, 0, ihl * 4) != 0:
+            raise ValueError("Checksum do cabeçalho inválido.")
+        datagrama = cls.__new__(cls)
+        datagrama.version = 4
+        datagrama.ihl = ihl
+        datagrama.tos = tos
+        datagrama.options = bytes(dados[20:ihl * 4])
+        datagrama.payload = bytes(dados[ihl * 4:total_length])
+        datagrama.total_length = total_length
+        datagrama.identification = identification
+        datagrama.flags = flags_offset >> 13
+        datagrama.fragment_offset = flags_offset & 0x1FFF
+        datagrama.ttl = ttl
+        datagrama.protocol = protocol
+        datagrama.checksum = checksum
+        datagrama.src_ip = socket.inet_ntoa(src)
+        datagrama.dest_ip = socket.inet_ntoa(dest)
+        return datagrama
+
     def parse_flags(self, flags_str):
         """
         Converte uma string de flags em um inteiro de 3 bits.
@@ -101,7 +263,12 @@ class IPDatagram:
         O campo checksum é calculado sobre o cabeçalho (com o campo checksum zerado),
         somando os valores de 16 bits, somando o carry e aplicando o complemento de 1.
         """
-        header_without_checksum = struct.pack("!BBHHHBBH4s4s",
+        header = bytearray(self.ihl * 4)
+        self._pack_header_into(header, 0, 0)
+        return soma_checksum(header)
+
+    def _pack_header_into(self, buffer, offset, checksum):
+        CABECALHO_IPV4.pack_into(buffer, offset,
             (self.version << 4) + self.ihl,
             self.tos,
             self.total_length,
@@ -109,42 +276,52 @@ class IPDatagram:
             (self.flags << 13) + self.fragment_offset,
             self.ttl,
             self.protocol,
-            0,  # checksum zerado para o cálculo
-            socket.inet_aton(self.src_ip),
-            socket.inet_aton(self.dest_ip)
+            checksum,
+            self._src_bytes,
+            self._dest_bytes
         )
         if self.options:
-            header_without_checksum += self.options
-        checksum = 0
-        for i in range(0, len(header_without_checksum), 2):
-            word = (header_without_checksum[i] << 8) + header_without_checksum[i+1]
-            checksum += word
-        # Adiciona os carries
-        while checksum >> 16:
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
-        checksum = ~checksum & 0xFFFF
-        return checksum
+            buffer[offset + 20:offset + 20 + len(self.options)] = self.options
+
+    def pack_into(self, buffer, offset=0):
+        """
+        Serializa o datagrama diretamente em um bytearray/memoryview gravável, a
+        partir de `offset`, sem criar objetos bytes intermediários: o cabeçalho é
+        escrito com o checksum zerado, o checksum é calculado sobre o próprio
+        buffer e gravado no lugar. Retorna o número de bytes escritos.
+        """
+        tamanho_cabecalho = self.ihl * 4
+        fim = offset + self.total_length
+        if fim > len(buffer):
+            raise ValueError(f"Buffer pequeno demais: {self.total_length} bytes a partir de {offset}, "
+                             f"mas o buffer tem {len(buffer)}.")
+        self._pack_header_into(buffer, offset, 0)
+        self.checksum = soma_checksum(buffer, offset, offset + tamanho_cabecalho)
+        struct.pack_into("!H", buffer, offset + 10, self.checksum)
+        buffer[offset + tamanho_cabecalho:fim] = self.payload
+        return self.total_length
+
+    def decrement_ttl(self):
+        """
+        Decrementa o TTL (como um roteador faz a cada salto) e corrige o checksum
+        incrementalmente (RFC 1624), sem recalcular o cabeçalho inteiro.
+        O checksum precisa estar válido (ver compute_checksum/generate).
+        Com TTL 0 o datagrama já expirou: gera ValueError em vez de ir a -1.
+        """
+        if self.ttl == 0:
+            raise ValueError("TTL já é 0: o datagrama expirou e deveria ter sido descartado.")
+        palavra_antiga = (self.ttl << 8) | self.protocol
+        self.ttl -= 1
+        self.checksum = atualizar_checksum(self.checksum, palavra_antiga, (self.ttl << 8) | self.protocol)
+        return self.ttl
 
     def generate(self):
         """
         Gera o datagrama completo (cabeçalho + payload) em bytes.
         """
-        self.checksum = self.compute_checksum()
-        header = struct.pack("!BBHHHBBH4s4s",
-            (self.version << 4) + self.ihl,
-            self.tos,
-            self.total_length,
-            self.identification,
-            (self.flags << 13) + self.fragment_offset,
-            self.ttl,
-            self.protocol,
-            self.checksum,
-            socket.inet_aton(self.src_ip),
-            socket.inet_aton(self.dest_ip)
-        )
-        if self.options:
-            header += self.options
-        return header + self.payload
+        buffer = bytearray(self.total_length)
+        self.pack_into(buffer)
+        return bytes(buffer)
 
     def display_detailed(self):
         """
@@ -175,6 +352,943 @@ class IPDatagram:
         print("================================\n")
 
 
+###############################################
+# BUFFER CIRCULAR DE DATAGRAMAS (SERIALIZAÇÃO SEM CÓPIAS)
+###############################################
+class BufferDatagramas:
+    """
+    Buffer circular pré-alocado com `num_slots` posições de `tamanho_slot` bytes.
+    Cada datagrama é serializado direto no seu slot com IPDatagram.pack_into;
+    quando o buffer enche, o datagrama mais antigo é sobrescrito. Nenhum objeto
+    bytes é criado por pacote: a leitura devolve memoryviews do próprio buffer.
+    """
+
+    def __init__(self, num_slots, tamanho_slot=1500):
+        self.num_slots = num_slots
+        self.tamanho_slot = tamanho_slot
+        self.dados = bytearray(num_slots * tamanho_slot)
+        self._view = memoryview(self.dados)
+        self.comprimentos = array("H", [0]) * num_slots
+        self.escritos = 0  # total de datagramas já escritos (a cabeça do anel)
+
+    def escrever(self, datagrama):
+        """Serializa o datagrama no próximo slot e retorna o índice do slot."""
+        if datagrama.total_length > self.tamanho_slot:
+            raise ValueError(f"Datagrama de {datagrama.total_length} bytes não cabe em slots de {self.tamanho_slot}.")
+        slot = self.escritos % self.num_slots
+        self.comprimentos[slot] = datagrama.pack_into(self.dados, slot * self.tamanho_slot)
+        self.escritos += 1
+        return slot
+
+    def preencher(self, datagramas):
+        """Escreve uma sequência de datagramas; retorna quantos foram escritos."""
+        inicial = self.escritos
+        for datagrama in datagramas:
+            self.escrever(datagrama)
+        return self.escritos - inicial
+
+    def slot(self, indice):
+        """memoryview (sem cópia) do datagrama guardado no slot."""
+        inicio = indice * self.tamanho_slot
+        return self._view[inicio:inicio + self.comprimentos[indice]]
+
+    def __len__(self):
+        return min(self.escritos, self.num_slots)
+
+    def __iter__(self):
+        """Datagramas guardados, do mais antigo ao mais recente."""
+        primeiro = self.escritos - len(self)
+        for i in range(primeiro, self.escritos):
+            yield self.slot(i % self.num_slots)
+
+
+def benchmark_serializacao(num_datagramas=100_000, tamanho_payload=512):
+    """Compara generate() (bytes novos por datagrama) com pack_into em um BufferDatagramas."""
+    datagramas = [IPDatagram(f"10.0.{i >> 8 & 0xFF}.{i & 0xFF}", "10.1.0.1", b"x" * tamanho_payload, "UDP")
+                  for i in range(min(num_datagramas, 10_000))]
+    repeticoes = -(-num_datagramas // len(datagramas))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for datagrama in datagramas:
+            datagrama.generate()
+    t_generate = time.perf_counter() - inicio
+
+    anel = BufferDatagramas(len(datagramas), tamanho_payload + 20)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        anel.preencher(datagramas)
+    t_anel = time.perf_counter() - inicio
+
+    total = repeticoes * len(datagramas)
+    print(f"Serialização de {total} datagramas ({tamanho_payload} bytes de payload):")
+    print(f"  generate():               {total / t_generate:,.0f} datagramas/s")
+    print(f"  pack_into (buffer anel):  {total / t_anel:,.0f} datagramas/s")
+
+
+def benchmark_checksum(num_cabecalhos=100_000):
+    """Cabeçalhos/s do checksum unitário, em lote e da atualização incremental do TTL."""
+    datagramas = [IPDatagram(f"10.0.{i >> 8 & 0xFF}.{i & 0xFF}", "10.1.0.1", b"", "UDP") for i in range(1000)]
+    repeticoes = -(-num_cabecalhos // len(datagramas))
+    total = repeticoes * len(datagramas)
+    blob = b"".join(d.generate() for d in datagramas) * repeticoes
+
+    inicio = time.perf_counter()
+    for i in range(0, len(blob), 20):
+        soma_checksum(blob, i, i + 20)
+    t_unitario = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    validos = int((checksum_lote(blob, total) == 0).sum())
+    t_lote = time.perf_counter() - inicio
+    # Cada repetição parte do TTL e checksum originais (64 → 63), para medir
+    # só atualizações de cabeçalhos válidos
+    originais = [(d.ttl, d.checksum) for d in datagramas]
+    t_incremental = 0.0
+    for _ in range(repeticoes):
+        for datagrama, (ttl, checksum) in zip(datagramas, originais):
+            datagrama.ttl, datagrama.checksum = ttl, checksum
+        inicio = time.perf_counter()
+        for datagrama in datagramas:
+            datagrama.decrement_ttl()
+        t_incremental += time.perf_counter() - inicio
+    if any(d.checksum != d.compute_checksum() for d in datagramas):
+        raise AssertionError("A atualização incremental do TTL deixou checksums inválidos.")
+
+    print(f"Checksum de {total} cabeçalhos IPv4 ({validos} válidos no lote):")
+    print(f"  Unitário (int.from_bytes):  {total / t_unitario:,.0f} cabeçalhos/s")
+    print(f"  Em lote (NumPy):            {total / t_lote:,.0f} cabeçalhos/s")
+    print(f"  Incremental (TTL, RFC 1624): {total / t_incremental:,.0f} atualizações/s")
+
+
+###############################################
+# LEITURA DE DATAGRAMAS (BYTES → OBJETOS)
+###############################################
+class DatagramaView:
+    """
+    Visão somente-leitura de um datagrama IPv4 serializado. Nada é decodificado
+    na criação: cada campo é lido do memoryview quando acessado, e o payload é
+    devolvido como memoryview (sem cópia).
+    """
+    __slots__ = ("_buf",)
+
+    def __init__(self, buffer):
+        self._buf = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+
+    @property
+    def version(self):
+        return self._buf[0] >> 4
+
+    @property
+    def ihl(self):
+        return self._buf[0] & 0x0F
+
+    @property
+    def tos(self):
+        return self._buf[1]
+
+    @property
+    def total_length(self):
+        return (self._buf[2] << 8) | self._buf[3]
+
+    @property
+    def identification(self):
+        return (self._buf[4] << 8) | self._buf[5]
+
+    @property
+    def flags(self):
+        return self._buf[6] >> 5
+
+    @property
+    def fragment_offset(self):
+        return ((self._buf[6] & 0x1F) << 8) | self._buf[7]
+
+    @property
+    def ttl(self):
+        return self._buf[8]
+
+    @property
+    def protocol(self):
+        return self._buf[9]
+
+    @property
+    def checksum(self):
+        return (self._buf[10] << 8) | self._buf[11]
+
+    @property
+    def src_ip(self):
+        return socket.inet_ntoa(self._buf[12:16])
+
+    @property
+    def dest_ip(self):
+        return socket.inet_ntoa(self._buf[16:20])
+
+    @property
+    def options(self):
+        return bytes(self._buf[20:self.ihl * 4])
+
+    @property
+    def payload(self):
+        return self._buf[self.ihl * 4:self.total_length]
+
+    def checksum_valido(self):
+        return soma_checksum(self._buf, 0, self.ihl * 4) == 0
+
+    def para_datagrama(self):
+        """Decodifica todos os campos em um IPDatagram."""
+        return IPDatagram.from_bytes(self._buf)
+
+    def __bytes__(self):
+        return bytes(self._buf[:self.total_length])
+
+    def __repr__(self):
+        return (f"DatagramaView({self.src_ip} → {self.dest_ip}, proto={self.protocol}, "
+                f"ttl={self.ttl}, {self.total_length} bytes)")
+
+
+def iterar_datagramas(buffer, offset=0, verificar_checksum=False):
+    """
+    Percorre um buffer (bytes, bytearray, mmap...) com datagramas IPv4 colados
+    um após o outro, devolvendo um DatagramaView por datagrama (sem cópias).
+    Com verificar_checksum=True, datagramas com checksum inválido geram ValueError.
+    """
+    view = memoryview(buffer)
+    fim = len(view)
+    while offset < fim:
+        if fim - offset < 20:
+            raise ValueError(f"Datagrama truncado no offset {offset}.")
+        total = (view[offset + 2] << 8) | view[offset + 3]
+        ihl = view[offset] & 0x0F
+        if view[offset] >> 4 != 4 or ihl < 5 or total < ihl * 4 or offset + total > fim:
+            raise ValueError(f"Cabeçalho IPv4 inválido no offset {offset}.")
+        datagrama = DatagramaView(view[offset:offset + total])
+        if verificar_checksum and not datagrama.checksum_valido():
+            raise ValueError(f"Checksum inválido no datagrama do offset {offset}.")
+        yield datagrama
+        offset += total
+
+
+def indexar_datagramas(buffer, offset=0):
+    """
+    Offsets de todos os datagramas de um buffer contínuo, como array NumPy.
+    Só versão, IHL e Total Length são lidos (com as mesmas validações de
+    iterar_datagramas); datagrama truncado ou bytes sobrando geram ValueError.
+    """
+    view = memoryview(buffer)
+    fim = len(view)
+    offsets = array("q")
+    while offset < fim:
+        if fim - offset < 20:
+            raise ValueError(f"Datagrama truncado no offset {offset}.")
+        total = (view[offset + 2] << 8) | view[offset + 3]
+        ihl = view[offset] & 0x0F
+        if view[offset] >> 4 != 4 or ihl < 5 or total < ihl * 4 or offset + total > fim:
+            raise ValueError(f"Cabeçalho IPv4 inválido no offset {offset}.")
+        offsets.append(offset)
+        offset += total
+    return np.frombuffer(offsets, dtype=np.int64) if offsets else np.empty(0, dtype=np.int64)
+
+
+def verificar_checksums(buffer, offsets=None, bloco=1 << 20):
+    """
+    Verifica o checksum de todos os datagramas em lote (NumPy), em blocos de até
+    `bloco` datagramas para manter a memória constante. Funciona com qualquer
+    alinhamento (payloads de tamanho ímpar). Retorna um array bool por datagrama.
+    """
+    if offsets is None:
+        offsets = indexar_datagramas(buffer)
+    dados = np.frombuffer(buffer, dtype=np.uint8)
+    validos = np.empty(len(offsets), dtype=bool)
+    for inicio in range(0, len(offsets), bloco):
+        parte = offsets[inicio:inicio + bloco]
+        tamanhos = (dados[parte] & 0x0F).astype(np.int64) * 4
+        for tamanho in np.unique(tamanhos):
+            sel = np.nonzero(tamanhos == tamanho)[0]
+            cabecalhos = dados[parte[sel, None] + np.arange(tamanho)].astype(np.uint64)
+            soma = (cabecalhos[:, 0::2] << 8 | cabecalhos[:, 1::2]).sum(axis=1)
+            soma = (soma & 0xFFFF) + (soma >> 16)
+            soma = (soma & 0xFFFF) + (soma >> 16)
+            validos[inicio + sel] = soma == 0xFFFF
+    return validos
+
+
+def benchmark_parser(num_datagramas=200_000, tamanho_payload=512):
+    """Mede a leitura de um buffer de datagramas: indexação, leitura preguiçosa e checksum em lote."""
+    datagramas = [IPDatagram(f"10.0.{i >> 8 & 0xFF}.{i & 0xFF}", "10.1.0.1", b"x" * tamanho_payload, "UDP")
+                  for i in range(1000)]
+    blob = b"".join(d.generate() for d in datagramas) * (num_datagramas // 1000)
+    mb = len(blob) / 1e6
+
+    inicio = time.perf_counter()
+    offsets = indexar_datagramas(blob)
+    t_indice = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    ttl_total = sum(d.ttl for d in iterar_datagramas(blob))
+    t_iter = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    validos = verificar_checksums(blob, offsets)
+    t_checksum = time.perf_counter() - inicio
+
+    print(f"Leitura de {len(offsets)} datagramas ({mb:.0f} MB, soma dos TTLs = {ttl_total}):")
+    print(f"  Indexação:           {len(offsets) / t_indice:,.0f} datagramas/s ({mb / t_indice:,.0f} MB/s)")
+    print(f"  Iteração + TTL:      {len(offsets) / t_iter:,.0f} datagramas/s ({mb / t_iter:,.0f} MB/s)")
+    print(f"  Checksums em lote:   {len(offsets) / t_checksum:,.0f} datagramas/s ({int(validos.sum())} válidos)")
+
+
+###############################################
+# LOTE DE DATAGRAMAS (COLUNAS + ARENA DE PAYLOADS)
+###############################################
+class DatagramaLote:
+    """
+    Visão O(1) de uma linha de um LoteDatagramas, com os mesmos atributos de um
+    IPDatagram. Só guarda a referência ao lote e o índice; cada campo é lido da
+    coluna correspondente quando acessado.
+    """
+    __slots__ = ("_lote", "_i")
+
+    version = 4
+
+    def __init__(self, lote, indice):
+        self._lote = lote
+        self._i = indice
+
+    ihl = property(lambda self: int(self._lote.ihl[self._i]))
+    tos = property(lambda self: int(self._lote.tos[self._i]))
+    total_length = property(lambda self: int(self._lote.total_length[self._i]))
+    identification = property(lambda self: int(self._lote.identification[self._i]))
+    flags = property(lambda self: int(self._lote.flags[self._i]))
+    fragment_offset = property(lambda self: int(self._lote.fragment_offset[self._i]))
+    ttl = property(lambda self: int(self._lote.ttl[self._i]))
+    protocol = property(lambda self: int(self._lote.protocol[self._i]))
+    checksum = property(lambda self: int(self._lote.checksum[self._i]))
+    src_ip = property(lambda self: int_para_ip(int(self._lote.src[self._i])))
+    dest_ip = property(lambda self: int_para_ip(int(self._lote.dest[self._i])))
+
+    @property
+    def options(self):
+        inicio = int(self._lote.inicio[self._i])
+        return bytes(self._lote.arena[inicio:inicio + (self.ihl - 5) * 4])
+
+    @property
+    def payload(self):
+        inicio = int(self._lote.inicio[self._i]) + (self.ihl - 5) * 4
+        return bytes(self._lote.arena[inicio:inicio + self.total_length - self.ihl * 4])
+
+    def decrement_ttl(self):
+        if self.ttl == 0:
+            raise ValueError("TTL já é 0: o datagrama expirou e deveria ter sido descartado.")
+        return int(self._lote.decrementar_ttl([self._i])[0])
+
+    def pack_into(self, buffer, offset=0):
+        return self._lote.pack_into(self._i, buffer, offset)
+
+    def generate(self):
+        buffer = bytearray(self.total_length)
+        self.pack_into(buffer)
+        return bytes(buffer)
+
+    def para_datagrama(self):
+        """Materializa a linha como um IPDatagram independente do lote."""
+        return IPDatagram.from_bytes(self.generate())
+
+    def __repr__(self):
+        return (f"DatagramaLote(#{self._i}: {self.src_ip} → {self.dest_ip}, proto={self.protocol}, "
+                f"ttl={self.ttl}, {self.total_length} bytes)")
+
+
+class LoteDatagramas:
+    """
+    Armazenamento colunar de datagramas: cada campo do cabeçalho fica em uma
+    coluna NumPy (uint8/uint16/uint32) e opções + payload de todos os datagramas
+    ficam colados em uma única arena (bytearray), com o offset de cada um na
+    coluna `inicio`. Não existe um objeto Python por datagrama: lote[i] devolve
+    uma DatagramaLote em O(1).
+    """
+    CAMPOS = (("ihl", np.uint8), ("tos", np.uint8), ("total_length", np.uint16),
+              ("identification", np.uint16), ("flags", np.uint8), ("fragment_offset", np.uint16),
+              ("ttl", np.uint8), ("protocol", np.uint8), ("checksum", np.uint16),
+              ("src", np.uint32), ("dest", np.uint32), ("inicio", np.int64))
+
+    def __init__(self, capacidade=1024):
+        self._n = 0
+        self._capacidade = max(1, capacidade)
+        for nome, tipo in self.CAMPOS:
+            setattr(self, nome, np.zeros(self._capacidade, dtype=tipo))
+        self.arena = bytearray()
+
+    @classmethod
+    def de_datagramas(cls, datagramas):
+        datagramas = list(datagramas)
+        lote = cls(len(datagramas))
+        lote.estender(datagramas)
+        return lote
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self._n
+        if not 0 <= indice < self._n:
+            raise IndexError("índice fora do lote")
+        return DatagramaLote(self, indice)
+
+    def __iter__(self):
+        return (DatagramaLote(self, i) for i in range(self._n))
+
+    def _crescer(self, minimo):
+        nova = max(minimo, self._capacidade * 2)
+        for nome, tipo in self.CAMPOS:
+            coluna = np.zeros(nova, dtype=tipo)
+            coluna[:self._n] = getattr(self, nome)[:self._n]
+            setattr(self, nome, coluna)
+        self._capacidade = nova
+
+    def adicionar_campos(self, src, dest, payload, protocol=6, tos=0, ttl=64, flags=2,
+                         options=b"", identification=None, fragment_offset=0):
+        """
+        Acrescenta um datagrama a partir dos campos (endereços como str ou int),
+        sem criar um IPDatagram. O checksum é calculado na inserção. Retorna o índice.
+        """
+        if self._n == self._capacidade:
+            self._crescer(self._n + 1)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        if len(options) % 4:
+            options = bytes(options) + b"\x00" * (4 - len(options) % 4)
+        src = ip_para_int(src) if isinstance(src, str) else src
+        dest = ip_para_int(dest) if isinstance(dest, str) else dest
+        if identification is None:
+            identification = random.randint(0, 0xFFFF)
+        ihl = 5 + len(options) // 4
+        total = ihl * 4 + len(payload)
+        soma = ((0x40 | ihl) << 8 | tos) + total + identification + (flags << 13 | fragment_offset) \
+            + (ttl << 8 | protocol) + (src >> 16) + (src & 0xFFFF) + (dest >> 16) + (dest & 0xFFFF)
+        if options:
+            soma += ~soma_checksum(options) & 0xFFFF
+        soma = (soma & 0xFFFF) + (soma >> 16)
+        soma = (soma & 0xFFFF) + (soma >> 16)
+
+        i = self._n
+        self.ihl[i] = ihl
+        self.tos[i] = tos
+        self.total_length[i] = total
+        self.identification[i] = identification
+        self.flags[i] = flags
+        self.fragment_offset[i] = fragment_offset
+        self.ttl[i] = ttl
+        self.protocol[i] = protocol
+        self.checksum[i] = ~soma & 0xFFFF
+        self.src[i] = src
+        self.dest[i] = dest
+        self.inicio[i] = len(self.arena)
+        self.arena += options
+        self.arena += payload
+        self._n += 1
+        return i
+
+    def adicionar(self, datagrama):
+        """Copia um IPDatagram (ou qualquer visão com os mesmos campos) para o lote."""
+        return self.adicionar_campos(datagrama.src_ip, datagrama.dest_ip, datagrama.payload,
+                                     datagrama.protocol, datagrama.tos, datagrama.ttl, datagrama.flags,
+                                     datagrama.options, datagrama.identification, datagrama.fragment_offset)
+
+    def estender(self, datagramas):
+        for datagrama in datagramas:
+            self.adicionar(datagrama)
+
+    def estender_campos(self, src, dest, payloads, protocol=6, tos=0, ttl=64, flags=2, identification=None):
+        """
+        Versão vetorizada de adicionar_campos (sem opções): src/dest são arrays de
+        endereços inteiros e os demais campos podem ser escalares ou arrays.
+        Retorna o intervalo de índices inserido.
+        """
+        src = np.asarray(src, dtype=np.uint32)
+        quantidade = len(src)
+        inicio, fim = self._n, self._n + quantidade
+        if fim > self._capacidade:
+            self._crescer(fim)
+        tamanhos = np.fromiter(map(len, payloads), dtype=np.int64, count=quantidade)
+        if identification is None:
+            identification = np.random.randint(0, 0x10000, size=quantidade)
+        self.ihl[inicio:fim] = 5
+        self.tos[inicio:fim] = tos
+        self.total_length[inicio:fim] = 20 + tamanhos
+        self.identification[inicio:fim] = identification
+        self.flags[inicio:fim] = flags
+        self.fragment_offset[inicio:fim] = 0
+        self.ttl[inicio:fim] = ttl
+        self.protocol[inicio:fim] = protocol
+        self.src[inicio:fim] = src
+        self.dest[inicio:fim] = dest
+        self.inicio[inicio:fim] = len(self.arena) + np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        self.arena += b"".join(payloads)
+        self._n = fim
+        self.calcular_checksums(inicio)
+        return range(inicio, fim)
+
+    def decrementar_ttl(self, indices=None):
+        """
+        Decrementa o TTL das linhas indicadas (todas, por padrão) de uma vez,
+        atualizando os checksums incrementalmente (RFC 1624). Linhas que já estão
+        com TTL 0 (expiradas, a descartar) não mudam. Retorna os novos TTLs das
+        linhas indicadas: 0 marca as expiradas.
+        """
+        indicadas = np.arange(self._n) if indices is None else np.asarray(indices, dtype=np.int64)
+        indices = indicadas[self.ttl[indicadas] > 0]
+        ttl = self.ttl[indices].astype(np.uint32)
+        protocolo = self.protocol[indices].astype(np.uint32)
+        soma = (~self.checksum[indices].astype(np.uint32) & 0xFFFF) \
+            + (~(ttl << 8 | protocolo) & 0xFFFF) + ((ttl - 1) << 8 | protocolo)
+        soma = (soma & 0xFFFF) + (soma >> 16)
+        soma = (soma & 0xFFFF) + (soma >> 16)
+        self.checksum[indices] = ~soma & 0xFFFF
+        self.ttl[indices] = ttl - 1
+        return self.ttl[indicadas]
+
+    def calcular_checksums(self, primeiro=0):
+        """Recalcula o checksum das linhas a partir de `primeiro` usando só as colunas (após edições em massa)."""
+        faixa = slice(primeiro, self._n)
+        ihl = self.ihl[faixa].astype(np.uint32)
+        src = self.src[faixa].astype(np.uint64)
+        dest = self.dest[faixa].astype(np.uint64)
+        soma = (((0x40 | ihl) << 8) | self.tos[faixa]).astype(np.uint64) \
+            + self.total_length[faixa] + self.identification[faixa] \
+            + ((self.flags[faixa].astype(np.uint32) << 13) | self.fragment_offset[faixa]) \
+            + ((self.ttl[faixa].astype(np.uint32) << 8) | self.protocol[faixa]) \
+            + (src >> 16) + (src & 0xFFFF) + (dest >> 16) + (dest & 0xFFFF)
+        for i in np.nonzero(ihl > 5)[0]:
+            inicio = int(self.inicio[primeiro + i])
+            soma[i] += ~soma_checksum(self.arena, inicio, inicio + (int(ihl[i]) - 5) * 4) & 0xFFFF
+        soma = (soma & 0xFFFF) + (soma >> 16)
+        soma = (soma & 0xFFFF) + (soma >> 16)
+        self.checksum[faixa] = ~soma & 0xFFFF
+
+    def pack_into(self, indice, buffer, offset=0):
+        """Serializa a linha `indice` no buffer a partir de `offset`. Retorna os bytes escritos."""
+        ihl = int(self.ihl[indice])
+        total = int(self.total_length[indice])
+        if offset + total > len(buffer):
+            raise ValueError(f"Buffer pequeno demais: {total} bytes a partir de {offset}, "
+                             f"mas o buffer tem {len(buffer)}.")
+        CABECALHO_IPV4.pack_into(buffer, offset, 0x40 | ihl, int(self.tos[indice]), total,
+                                 int(self.identification[indice]),
+                                 int(self.flags[indice]) << 13 | int(self.fragment_offset[indice]),
+                                 int(self.ttl[indice]), int(self.protocol[indice]), int(self.checksum[indice]),
+                                 int(self.src[indice]).to_bytes(4, "big"), int(self.dest[indice]).to_bytes(4, "big"))
+        inicio = int(self.inicio[indice])
+        buffer[offset + 20:offset + total] = self.arena[inicio:inicio + total - 20]
+        return total
+
+    def serializar(self):
+        """Todos os datagramas do lote, serializados um após o outro."""
+        buffer = bytearray(int(self.total_length[:self._n].sum()))
+        offset = 0
+        for i in range(self._n):
+            offset += self.pack_into(i, buffer, offset)
+        return bytes(buffer)
+
+    def memoria(self):
+        """Bytes ocupados pelas colunas (até o tamanho atual) e pela arena."""
+        return sum(getattr(self, nome)[:self._n].nbytes for nome, _ in self.CAMPOS) + len(self.arena)
+
+
+def benchmark_memoria(num_datagramas=200_000, tamanho_payload=64):
+    """Memória por datagrama: objeto com __dict__, IPDatagram com __slots__ e LoteDatagramas."""
+    import tracemalloc
+
+    class DatagramaComDict(IPDatagram):
+        pass  # sem __slots__ próprio → cada instância volta a ter __dict__
+
+    payloads = [bytes([i & 0xFF]) * tamanho_payload for i in range(256)]
+
+    def medir(criar):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        objeto = criar()
+        duracao = time.perf_counter() - inicio
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objeto
+        return memoria, duracao
+
+    def lista(classe):
+        return lambda: [classe(f"10.0.{i >> 8 & 0xFF}.{i & 0xFF}", "10.1.0.1", payloads[i & 0xFF] + b"", "UDP")
+                        for i in range(num_datagramas)]
+
+    def lote():
+        lote = LoteDatagramas(num_datagramas)
+        indices = np.arange(num_datagramas)
+        lote.estender_campos(0x0A000000 | indices & 0xFFFF, np.full(num_datagramas, 0x0A010001),
+                             [payloads[i & 0xFF] for i in range(num_datagramas)], 17)
+        return lote
+
+    print(f"Memória para {num_datagramas} datagramas ({tamanho_payload} bytes de payload):")
+    for nome, criar in (("IPDatagram com __dict__", lista(DatagramaComDict)),
+                        ("IPDatagram com __slots__", lista(IPDatagram)),
+                        ("LoteDatagramas (colunas)", lote)):
+        memoria, duracao = medir(criar)
+        print(f"  {nome:<26} {memoria / 1e6:8.1f} MB  ({memoria / num_datagramas:6.0f} bytes/datagrama, {duracao:.2f} s)")
+
+
+###############################################
+# FRAGMENTAÇÃO E REMONTAGEM (RFC 791 / RFC 815)
+###############################################
+MTU_PADRAO = 1500             # Ethernet
+TEMPO_REMONTAGEM_S = 15.0     # valor inicial sugerido pela RFC 791
+
+
+def _copiar_cabecalho(datagrama, payload, fragment_offset, flags, options):
+    copia = IPDatagram.__new__(IPDatagram)
+    copia.version = 4
+    copia.ihl = 5 + len(options) // 4
+    copia.tos = datagrama.tos
+    copia.options = options
+    copia.payload = payload
+    copia.total_length = copia.ihl * 4 + len(payload)
+    copia.identification = datagrama.identification
+    copia.flags = flags
+    copia.fragment_offset = fragment_offset
+    copia.ttl = datagrama.ttl
+    copia.protocol = datagrama.protocol
+    copia._src_ip, copia._src_bytes = datagrama._src_ip, datagrama._src_bytes
+    copia._dest_ip, copia._dest_bytes = datagrama._dest_ip, datagrama._dest_bytes
+    copia.checksum = copia.compute_checksum()
+    return copia
+
+
+def fragmentar(datagrama, mtu=MTU_PADRAO):
+    """
+    Divide um datagrama maior que o MTU em fragmentos (RFC 791). Os dados de
+    cada fragmento (exceto o último) são múltiplos de 8 bytes; todos os
+    fragmentos, menos o último, levam MF=1, e o último herda o MF do original
+    (refragmentar um fragmento também funciona). As opções só vão no primeiro
+    fragmento. Datagramas com DF=1 que não cabem geram ValueError.
+    """
+    if datagrama.total_length <= mtu:
+        return [datagrama]
+    if datagrama.flags & 2:
+        raise ValueError(f"Datagrama de {datagrama.total_length} bytes com DF=1 não cabe no MTU {mtu}.")
+    payload = memoryview(datagrama.payload)
+    fragmentos = []
+    inicio = 0
+    options = datagrama.options
+    while inicio < len(payload):
+        por_fragmento = (mtu - 20 - len(options)) // 8 * 8
+        if por_fragmento <= 0:
+            raise ValueError(f"MTU {mtu} pequeno demais para fragmentar.")
+        fim = min(inicio + por_fragmento, len(payload))
+        ultimo = fim == len(payload)
+        flags = (datagrama.flags & 1 if ultimo else 1) | (datagrama.flags & 4)
+        fragmentos.append(_copiar_cabecalho(datagrama, payload[inicio:fim].tobytes(),
+                                            datagrama.fragment_offset + inicio // 8, flags, options))
+        inicio = fim
+        options = b""
+    return fragmentos
+
+
+class _BufferRemontagem:
+    """
+    Estado de remontagem de um datagrama: dados recebidos até agora e a lista de
+    buracos (RFC 815), guardada ordenada em dois arrays (início, fim) para que
+    cada fragmento encontre por busca binária só os buracos que ele cobre.
+    """
+    __slots__ = ("dados", "buracos_inicio", "buracos_fim", "primeiro", "prazo")
+
+    def __init__(self, prazo):
+        self.dados = bytearray()
+        self.buracos_inicio = [0]
+        self.buracos_fim = [float("inf")]
+        self.primeiro = None
+        self.prazo = prazo
+
+    def inserir(self, primeiro_byte, ultimo_byte, mais_fragmentos):
+        inicios, fins = self.buracos_inicio, self.buracos_fim
+        # primeiro buraco que pode ser coberto: o último com início <= primeiro_byte
+        i = max(bisect.bisect_right(inicios, primeiro_byte) - 1, 0)
+        novos_inicios, novos_fins = [], []
+        j = i
+        while j < len(inicios) and inicios[j] <= ultimo_byte:
+            b_ini, b_fim = inicios[j], fins[j]
+            if b_fim < primeiro_byte:
+                novos_inicios.append(b_ini)
+                novos_fins.append(b_fim)
+            else:
+                if primeiro_byte > b_ini:
+                    novos_inicios.append(b_ini)
+                    novos_fins.append(primeiro_byte - 1)
+                if ultimo_byte < b_fim and mais_fragmentos:
+                    novos_inicios.append(ultimo_byte + 1)
+                    novos_fins.append(b_fim)
+            j += 1
+        inicios[i:j] = novos_inicios
+        fins[i:j] = novos_fins
+        if not mais_fragmentos:
+            # o último fragmento fixa o tamanho: buracos além dele deixam de existir
+            while inicios and inicios[-1] > ultimo_byte:
+                inicios.pop()
+                fins.pop()
+            if fins and fins[-1] > ultimo_byte:
+                fins[-1] = ultimo_byte
+        return not inicios
+
+
+class Remontador:
+    """
+    Remontagem de fragmentos em um host de destino. receber() devolve o
+    IPDatagram completo quando o último buraco é preenchido (ou o próprio
+    datagrama, se ele não for um fragmento) e None enquanto faltam partes.
+    Buffers incompletos expiram `tempo_limite` s após o primeiro fragmento;
+    como o prazo é o mesmo para todos, a fila de prazos já sai ordenada e a
+    expiração custa O(1) amortizado por datagrama.
+    """
+
+    def __init__(self, tempo_limite=TEMPO_REMONTAGEM_S):
+        self.tempo_limite = tempo_limite
+        self.buffers = {}
+        self._prazos = deque()
+        self.fragmentos = 0
+        self.remontados = 0
+        self.expirados = 0
+
+    def expirar(self, instante):
+        """Descarta os buffers cujo prazo terminou. Retorna quantos foram descartados."""
+        prazos, buffers = self._prazos, self.buffers
+        descartados = 0
+        while prazos and prazos[0][0] <= instante:
+            prazo, chave = prazos.popleft()
+            estado = buffers.get(chave)
+            if estado is not None and estado.prazo == prazo:
+                del buffers[chave]
+                descartados += 1
+        self.expirados += descartados
+        return descartados
+
+    def receber(self, fragmento, instante=0.0):
+        if not fragmento.flags & 1 and not fragmento.fragment_offset:
+            return fragmento
+        self.fragmentos += 1
+        if self._prazos and self._prazos[0][0] <= instante:
+            self.expirar(instante)
+        chave = (fragmento._src_bytes, fragmento._dest_bytes, fragmento.protocol, fragmento.identification)
+        estado = self.buffers.get(chave)
+        if estado is None:
+            estado = self.buffers[chave] = _BufferRemontagem(instante + self.tempo_limite)
+            self._prazos.append((estado.prazo, chave))
+
+        inicio = fragmento.fragment_offset * 8
+        fim = inicio + len(fragmento.payload)
+        dados = estado.dados
+        if fim > len(dados):
+            dados.extend(bytes(fim - len(dados)))
+        dados[inicio:fim] = fragmento.payload
+        if not fragmento.fragment_offset:
+            estado.primeiro = fragmento
+        if not estado.inserir(inicio, fim - 1, fragmento.flags & 1) or estado.primeiro is None:
+            return None
+
+        del self.buffers[chave]
+        self.remontados += 1
+        primeiro = estado.primeiro
+        return _copiar_cabecalho(primeiro, bytes(dados), 0, primeiro.flags & ~1, primeiro.options)
+
+    def __len__(self):
+        return len(self.buffers)
+
+
+def benchmark_fragmentacao(mtu=MTU_PADRAO, bytes_por_tamanho=64_000_000, semente=0):
+    """Fragmentação e remontagem (em ordem e embaralhada) para vários tamanhos de payload."""
+    rng = random.Random(semente)
+    print(f"Fragmentação/remontagem com MTU {mtu} (~{bytes_por_tamanho / 1e6:.0f} MB por tamanho):")
+    print(f"  {'payload':>8} {'frags':>6} {'fragmentar':>15} {'remontar':>15} {'embaralhado':>15}")
+    for tamanho in (2_000, 8_000, 32_000, 65_000):
+        quantidade = max(bytes_por_tamanho // tamanho, 1)
+        payload = bytes(rng.randrange(256) for _ in range(tamanho))
+        datagramas = [IPDatagram("10.0.0.1", "10.1.0.1", payload, "UDP", flags='') for _ in range(quantidade)]
+        for i, datagrama in enumerate(datagramas):
+            datagrama.identification = i & 0xFFFF
+        inicio = time.perf_counter()
+        fragmentos = [fragmentar(d, mtu) for d in datagramas]
+        t_frag = time.perf_counter() - inicio
+
+        tempos = []
+        for embaralhar in (False, True):
+            sequencia = []
+            for bloco in range(0, quantidade, 0x10000):  # ids não se repetem dentro de um bloco
+                trecho = [f for partes in fragmentos[bloco:bloco + 0x10000] for f in partes]
+                if embaralhar:
+                    rng.shuffle(trecho)
+                sequencia.append(trecho)
+            remontador = Remontador()
+            completos = 0
+            inicio = time.perf_counter()
+            for trecho in sequencia:
+                for fragmento in trecho:
+                    if remontador.receber(fragmento) is not None:
+                        completos += 1
+            tempos.append(time.perf_counter() - inicio)
+            assert completos == quantidade and not len(remontador)
+        mb = quantidade * tamanho / 1e6
+        print(f"  {tamanho:>8} {len(fragmentos[0]):>6} {mb / t_frag:>10,.0f} MB/s "
+              f"{mb / tempos[0]:>10,.0f} MB/s {mb / tempos[1]:>10,.0f} MB/s")
+
+
+###############################################
+# CAPTURA PCAP (WIRESHARK / TCPDUMP)
+###############################################
+PCAP_MAGICO_US = 0xA1B2C3D4   # timestamps em microssegundos
+PCAP_MAGICO_NS = 0xA1B23C4D   # timestamps em nanossegundos
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101            # pacote começa direto no cabeçalho IP
+CABECALHO_PCAP = struct.Struct("<IHHiIII")
+REGISTRO_PCAP = struct.Struct("<IIII")
+
+
+class EscritorPcap:
+    """
+    Grava datagramas em um arquivo pcap (LINKTYPE_RAW) com timestamps simulados.
+    Os registros são montados em um bytearray e gravados em blocos de
+    `tamanho_buffer` bytes, então o custo por pacote é só o pack no buffer.
+    Use como context manager (ou chame fechar()) para descarregar o final.
+    """
+
+    def __init__(self, caminho, snaplen=65535, nanossegundos=False, tamanho_buffer=1 << 20, inicio=0.0):
+        self.arquivo = open(caminho, "wb")
+        self.snaplen = snaplen
+        self.escala = 1_000_000_000 if nanossegundos else 1_000_000
+        self.tamanho_buffer = tamanho_buffer
+        self.inicio = inicio  # época (s) somada aos instantes simulados
+        self.pacotes = 0
+        self.bytes = 0
+        self._buffer = bytearray(CABECALHO_PCAP.pack(PCAP_MAGICO_NS if nanossegundos else PCAP_MAGICO_US,
+                                                     2, 4, 0, 0, snaplen, LINKTYPE_RAW))
+
+    def _registro(self, instante, tamanho, capturado):
+        unidades = round((self.inicio + instante) * self.escala)
+        segundos, fracao = divmod(unidades, self.escala)
+        self._buffer += REGISTRO_PCAP.pack(segundos, fracao, capturado, tamanho)
+
+    def escrever(self, dados, instante=0.0):
+        """Grava os bytes de um datagrama já serializado, capturado no instante dado (s)."""
+        capturado = min(len(dados), self.snaplen)
+        self._registro(instante, len(dados), capturado)
+        self._buffer += dados[:capturado] if capturado < len(dados) else dados
+        self._contar(capturado)
+
+    def escrever_datagrama(self, datagrama, instante=0.0):
+        """Serializa o datagrama direto no buffer de escrita (pack_into), sem bytes intermediários."""
+        tamanho = datagrama.total_length
+        if tamanho > self.snaplen:
+            self.escrever(datagrama.generate(), instante)
+            return
+        self._registro(instante, tamanho, tamanho)
+        offset = len(self._buffer)
+        self._buffer.extend(bytes(tamanho))
+        datagrama.pack_into(self._buffer, offset)
+        self._contar(tamanho)
+
+    def _contar(self, capturado):
+        self.pacotes += 1
+        self.bytes += capturado
+        if len(self._buffer) >= self.tamanho_buffer:
+            self.descarregar()
+
+    def descarregar(self):
+        self.arquivo.write(self._buffer)
+        self._buffer.clear()
+
+    def fechar(self):
+        if not self.arquivo.closed:
+            self.descarregar()
+            self.arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def ler_pcap(caminho, como="view"):
+    """
+    Lê um arquivo pcap (µs ou ns, little ou big endian) via mmap, como gerador
+    de (instante, pacote): nada além do registro atual é carregado, então
+    capturas de vários GB são lidas em memória constante. Com como="view" o
+    pacote é um DatagramaView sobre o próprio mmap, válido só até o próximo
+    item; para guardar pacotes use como="bytes" ou como="datagrama".
+    Capturas Ethernet têm o cabeçalho de 14 bytes removido e só IPv4 é devolvido.
+    """
+    import mmap
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size < CABECALHO_PCAP.size:
+            return
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magico = int.from_bytes(mapa[:4], "little")
+        ordem = "<"
+        if magico not in (PCAP_MAGICO_US, PCAP_MAGICO_NS):
+            ordem = ">"
+            magico = int.from_bytes(mapa[:4], "big")
+            if magico not in (PCAP_MAGICO_US, PCAP_MAGICO_NS):
+                raise ValueError(f"{caminho}: não é um arquivo pcap (pcapng não é suportado).")
+        escala = 1e9 if magico == PCAP_MAGICO_NS else 1e6
+        linktype = struct.unpack_from(ordem + "I", mapa, 20)[0] & 0xFFFF
+        if linktype not in (LINKTYPE_RAW, LINKTYPE_ETHERNET):
+            raise ValueError(f"{caminho}: linktype {linktype} não suportado.")
+        registro = struct.Struct(ordem + "IIII")
+        view = memoryview(mapa)
+        offset, fim = CABECALHO_PCAP.size, len(mapa)
+        try:
+            while offset + registro.size <= fim:
+                segundos, fracao, capturado, _ = registro.unpack_from(mapa, offset)
+                offset += registro.size
+                pacote = view[offset:offset + capturado]
+                offset += capturado
+                if linktype == LINKTYPE_ETHERNET:
+                    if pacote[12:14] != b"\x08\x00":
+                        continue
+                    pacote = pacote[14:]
+                instante = segundos + fracao / escala
+                if como == "bytes":
+                    yield instante, pacote.tobytes()
+                elif como == "datagrama":
+                    yield instante, IPDatagram.from_bytes(pacote)
+                else:
+                    yield instante, DatagramaView(pacote)
+                pacote.release()
+        finally:
+            view.release()
+    finally:
+        try:
+            mapa.close()
+        except BufferError:
+            pass  # o chamador ainda guarda visões do mmap; ele fecha quando forem coletadas
+
+
+def benchmark_pcap(num_datagramas=500_000, tamanho_payload=512):
+    """MB/s de escrita (buffer + pack_into) e de leitura (mmap) de um pcap."""
+    import tempfile
+    datagramas = [IPDatagram(f"10.0.{i >> 8 & 0xFF}.{i & 0xFF}", "10.1.0.1", b"x" * tamanho_payload, "UDP")
+                  for i in range(1000)]
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "captura.pcap")
+        inicio = time.perf_counter()
+        with EscritorPcap(caminho) as escritor:
+            for i in range(num_datagramas):
+                escritor.escrever_datagrama(datagramas[i % 1000], i * 1e-5)
+        t_escrita = time.perf_counter() - inicio
+        mb = os.path.getsize(caminho) / 1e6
+
+        inicio = time.perf_counter()
+        lidos = ttl = 0
+        for _, pacote in ler_pcap(caminho):
+            lidos += 1
+            ttl += pacote.ttl
+        t_leitura = time.perf_counter() - inicio
+    print(f"pcap com {num_datagramas} datagramas ({mb:.0f} MB):")
+    print(f"  Escrita: {num_datagramas / t_escrita:,.0f} datagramas/s ({mb / t_escrita:,.0f} MB/s)")
+    print(f"  Leitura: {lidos / t_leitura:,.0f} datagramas/s ({mb / t_leitura:,.0f} MB/s)")
+
+
 ###############################################
 # FUNÇÃO AUXILIAR – CONVERTE ENTRADA EM NÚMERO DE PROTOCOLO
 ###############################################
@@ -224,11 +1338,16 @@ def criar_e_visualizar_datagrama(enderecos_ip):
         protocolo = 6
 
     datagrama = IPDatagram(src_ip, dest_ip, payload, protocolo)
-    # Gera o datagrama (isso calcula o checksum)
-    _ = datagrama.generate()
+    # Gera o datagrama uma única vez (isso calcula o checksum)
+    dados = datagrama.generate()
     datagrama.display_detailed()
     print("Datagrama (em bytes):")
-    print(datagrama.generate().hex())
+    print(dados.hex())
+    caminho_pcap = input("Salvar em arquivo pcap? (caminho ou Enter para pular): ").strip()
+    if caminho_pcap:
+        with EscritorPcap(caminho_pcap) as escritor:
+            escritor.escrever(dados)
+        print(f"Datagrama salvo em '{caminho_pcap}' (abra com Wireshark ou tcpdump -r).")
     desenhar_diagrama_datagram(datagrama)
 
 
@@ -240,6 +1359,7 @@ def desenhar_diagrama_datagram(datagrama):
     Desenha um diagrama ilustrativo do cabeçalho IP (conforme o padrão IPv4),
     exibindo os principais campos em linhas.
     """
+    import matplotlib.pyplot as plt
     total_width = 40  # unidades arbitrárias
     row_height = 3
     num_rows = 6 + (1 if datagrama.options else 0)
@@ -325,60 +1445,446 @@ def desenhar_diagrama_datagram(datagrama):
 
 
 ###############################################
-# FUNÇÃO PARA CONFIGURAR A REDE SIMULADA
+# ALOCADOR DE ENDEREÇOS IP (INTEIROS DE 32 BITS, CIDR/VLSM)
 ###############################################
-def configurar_rede():
+def ip_para_int(ip):
+    """Converte "a.b.c.d" em inteiro de 32 bits."""
+    return int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def int_para_ip(valor):
+    """Converte um inteiro de 32 bits em "a.b.c.d" (usado só na exibição)."""
+    return socket.inet_ntoa(valor.to_bytes(4, "big"))
+
+
+def prefixo_para_mascara(prefixo):
+    """Máscara de rede (inteiro) correspondente a um prefixo /0../32."""
+    return (0xFFFFFFFF << (32 - prefixo)) & 0xFFFFFFFF
+
+
+def prefixo_para_capacidade(num_enderecos):
     """
-    Configura a rede simulada (roteadores, switches, subredes e hosts),
-    atribui endereços IP e cria os enlaces.
-    Retorna:
-      G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador_atualizadas,
-      roteadores, switches_borda, especificacoes_rede
+    Menor prefixo cujo bloco comporta num_enderecos endereços utilizáveis
+    (além do endereço de rede e do broadcast). O menor bloco é um /30.
     """
-    G = nx.Graph()
-    network_class = "Classe C"
-    base_ip = "192.168.1."
-    subnet_mask_class = "255.255.255.0"
-    network_address = "192.168.1.0"
-    broadcast_address = "192.168.1.255"
+    tamanho = max(4, 1 << (num_enderecos + 1).bit_length())
+    return 32 - (tamanho.bit_length() - 1)
 
-    print("=== Configuração da Rede ===\n")
-    while True:
-        try:
-            num_roteadores = int(input("Quantos roteadores a rede deve possuir? (mínimo 1): "))
-            if num_roteadores < 1:
-                print("Número mínimo de roteadores é 1.\n")
-            else:
-                break
-        except ValueError:
-            print("Entrada inválida. Insira um número inteiro.\n")
-    roteadores = [f"a{i+1}" for i in range(num_roteadores)]
-    G.add_node("Switch Central", tipo='Switch Central')
 
-    ip_counter = 1
-    enderecos_ip = {}
-    switch_central_ip = f"{base_ip}{ip_counter}"
-    enderecos_ip["Switch Central"] = switch_central_ip
-    ip_counter += 1
-    print(f"Assignando IP ao Switch Central: {switch_central_ip}")
+def parse_cidr(cidr):
+    """Converte "a.b.c.d/p" em (rede, prefixo), validando o alinhamento."""
+    endereco, _, prefixo = cidr.partition("/")
+    prefixo = int(prefixo) if prefixo else 32
+    if not 0 <= prefixo <= 32:
+        raise ValueError(f"Prefixo inválido em '{cidr}'.")
+    rede = ip_para_int(endereco)
+    if rede & ~prefixo_para_mascara(prefixo) & 0xFFFFFFFF:
+        raise ValueError(f"'{cidr}' não é um endereço de rede alinhado ao prefixo.")
+    return rede, prefixo
 
-    for roteador in roteadores:
-        G.add_node(roteador, tipo='Roteador de Agregação')
-        roteador_ip = f"{base_ip}{ip_counter}"
-        enderecos_ip[roteador] = roteador_ip
-        print(f"Assignando IP ao Roteador {roteador}: {roteador_ip}")
-        ip_counter += 1
 
-    subredes_por_roteador = {}
-    total_subredes = 0
-    print("\n=== Configuração das Subredes por Roteador ===")
-    for roteador in roteadores:
-        while True:
-            try:
-                num_subredes = int(input(f"Quantas subredes o roteador {roteador} gerenciará? (mínimo 1): "))
-                if num_subredes < 1:
-                    print("Cada roteador deve gerenciar pelo menos 1 subrede.\n")
-                else:
+class BlocoIP:
+    """
+    Bloco CIDR de uma subrede. Os endereços são entregues em blocos contíguos
+    a partir do primeiro endereço utilizável, em O(1).
+    """
+    __slots__ = ("rede", "prefixo", "proximo")
+
+    def __init__(self, rede, prefixo):
+        self.rede = rede
+        self.prefixo = prefixo
+        self.proximo = rede + 1  # o endereço de rede não é atribuído
+
+    @property
+    def tamanho(self):
+        return 1 << (32 - self.prefixo)
+
+    @property
+    def broadcast(self):
+        return self.rede + self.tamanho - 1
+
+    @property
+    def mascara(self):
+        return prefixo_para_mascara(self.prefixo)
+
+    @property
+    def livres(self):
+        return self.broadcast - self.proximo
+
+    def alocar(self, quantidade=1):
+        """Reserva `quantidade` endereços consecutivos e retorna o primeiro."""
+        if quantidade > self.livres:
+            raise ValueError(f"Bloco {self} sem endereços livres suficientes ({quantidade} pedidos, {self.livres} livres).")
+        inicio = self.proximo
+        self.proximo += quantidade
+        return inicio
+
+    def __contains__(self, endereco):
+        return self.rede <= endereco <= self.broadcast
+
+    def __str__(self):
+        return f"{int_para_ip(self.rede)}/{self.prefixo}"
+
+    def __repr__(self):
+        return f"BlocoIP('{self}')"
+
+
+class AlocadorIP:
+    """
+    Recorta blocos CIDR de tamanho variável (VLSM) de uma rede base.
+    Os blocos são sempre alinhados ao próprio tamanho; pedindo-os do maior para
+    o menor (como faz recortar_vlsm) não sobra nenhum buraco entre eles.
+    """
+
+    # Redes base tentadas, em ordem, quando nenhuma é informada
+    REDES_PADRAO = ("192.168.1.0/24", "192.168.0.0/16", "172.16.0.0/12", "10.0.0.0/8")
+
+    def __init__(self, rede_base="10.0.0.0/8"):
+        self.base = BlocoIP(*parse_cidr(rede_base))
+        self.cursor = self.base.rede
+
+    @classmethod
+    def escolher_rede(cls, prefixos):
+        """Primeira rede de REDES_PADRAO em que cabem os blocos de prefixos dados."""
+        necessario = sum(1 << (32 - p) for p in prefixos)
+        for cidr in cls.REDES_PADRAO:
+            if necessario <= 1 << (32 - parse_cidr(cidr)[1]):
+                return cidr
+        raise ValueError(f"Espaço de endereçamento insuficiente: {necessario} endereços pedidos (máximo de um /8).")
+
+    def reservar(self, prefixo):
+        """Recorta o próximo bloco /prefixo livre (O(1))."""
+        if prefixo < self.base.prefixo:
+            raise ValueError(f"Bloco /{prefixo} maior que a rede base {self.base}.")
+        tamanho = 1 << (32 - prefixo)
+        inicio = (self.cursor + tamanho - 1) & ~(tamanho - 1)
+        if inicio + tamanho - 1 > self.base.broadcast:
+            raise ValueError(f"Rede base {self.base} esgotada ao reservar um /{prefixo}.")
+        self.cursor = inicio + tamanho
+        return BlocoIP(inicio, prefixo)
+
+    def recortar_vlsm(self, demandas):
+        """
+        Recebe {nome: número de endereços necessários} e retorna {nome: BlocoIP},
+        recortando os blocos do maior para o menor.
+        """
+        prefixos = {nome: prefixo_para_capacidade(n) for nome, n in demandas.items()}
+        blocos = {nome: self.reservar(prefixos[nome]) for nome in sorted(prefixos, key=prefixos.get)}
+        return {nome: blocos[nome] for nome in demandas}
+
+
+class TabelaEnderecos(MutableMapping):
+    """
+    Tabela dispositivo → endereço IP. Os endereços ficam como inteiros de 32 bits
+    em um array('I'); a conversão para "a.b.c.d" só acontece na leitura
+    (tabela[nome]). Use inteiro(nome) para obter o valor numérico.
+    """
+
+    def __init__(self, dados=()):
+        self._posicao = {}
+        self._ips = array("I")
+        self._livres = []
+        self._reverso = None  # índice IP → nome, montado sob demanda
+        self._ordem = None    # nomes em ordem alfabética, montado sob demanda
+        self._compartilhada = False  # _posicao também é o dicionário nome → id de um GrafoCSR
+        self.update(dados)
+
+    def _compartilhar_posicoes(self):
+        """
+        Entrega _posicao para servir também de nome → id a um GrafoCSR com os
+        mesmos nomes na mesma ordem; a tabela passa a copiá-la antes de incluir
+        ou remover nomes.
+        """
+        self._compartilhada = True
+        return self._posicao
+
+    def _posicoes(self):
+        """_posicao pronta para incluir/remover nomes (copiada antes, se compartilhada)."""
+        if self._compartilhada:
+            self._posicao = self._posicao.copy()
+            self._compartilhada = False
+        return self._posicao
+
+    def inteiro(self, nome):
+        return self._ips[self._posicao[nome]]
+
+    def nome_por_ip(self, ip):
+        """Dispositivo dono do endereço (str ou inteiro), ou None."""
+        if self._reverso is None:
+            ips = self._ips
+            self._reverso = {ips[pos]: nome for nome, pos in self._posicao.items()}
+        return self._reverso.get(ip_para_int(ip) if isinstance(ip, str) else ip)
+
+    def ordenados(self):
+        """
+        Nomes em ordem alfabética (índice de ordenação montado uma vez e corrigido
+        a cada inclusão/remoção, com bisect). A lista é interna: não a altere.
+        """
+        if self._ordem is None:
+            self._ordem = sorted(self._posicao)
+        return self._ordem
+
+    def atribuir_bloco(self, nomes, inicio):
+        """Atribui endereços consecutivos a partir de `inicio` a todos os nomes, em lote."""
+        nomes = list(nomes)
+        pos = len(self._ips)
+        self._ips.extend(range(inicio, inicio + len(nomes)))
+        novos = dict(zip(nomes, range(pos, pos + len(nomes))))
+        repetidos = novos.keys() & self._posicao.keys()
+        for nome in repetidos:
+            self._livres.append(self._posicao[nome])
+        self._posicoes().update(novos)
+        self._reverso = None
+        if self._ordem is not None:
+            # Blocos pequenos (uma subrede nova) entram no índice de ordenação no
+            # lugar; blocos grandes fazem o índice ser remontado na próxima leitura
+            if len(novos) * 16 < len(self._ordem):
+                for nome in novos.keys() - repetidos:
+                    bisect.insort(self._ordem, nome)
+            else:
+                self._ordem = None
+
+    def __getitem__(self, nome):
+        return int_para_ip(self._ips[self._posicao[nome]])
+
+    def __setitem__(self, nome, ip):
+        valor = ip_para_int(ip) if isinstance(ip, str) else int(ip)
+        if self._reverso is not None:
+            # O índice reverso é corrigido no lugar: alterações pontuais custam O(1)
+            if nome in self._posicao and self._reverso.get(self._ips[self._posicao[nome]]) == nome:
+                del self._reverso[self._ips[self._posicao[nome]]]
+            self._reverso[valor] = nome
+        if nome in self._posicao:
+            self._ips[self._posicao[nome]] = valor
+            return
+        if self._ordem is not None:
+            bisect.insort(self._ordem, nome)
+        if self._livres:
+            pos = self._livres.pop()
+            self._ips[pos] = valor
+            self._posicoes()[nome] = pos
+        else:
+            self._posicoes()[nome] = len(self._ips)
+            self._ips.append(valor)
+
+    def __delitem__(self, nome):
+        pos = self._posicoes().pop(nome)
+        self._livres.append(pos)
+        if self._ordem is not None:
+            del self._ordem[bisect.bisect_left(self._ordem, nome)]
+        if self._reverso is not None and self._reverso.get(self._ips[pos]) == nome:
+            del self._reverso[self._ips[pos]]
+
+    def __contains__(self, nome):
+        return nome in self._posicao
+
+    def __iter__(self):
+        return iter(self._posicao)
+
+    def __len__(self):
+        return len(self._posicao)
+
+    def __repr__(self):
+        return f"TabelaEnderecos({len(self)} dispositivos)"
+
+
+###############################################
+# POSICIONAMENTO DAS SUBREDES NOS ROTEADORES (LPT + BUSCA LOCAL)
+###############################################
+# "aleatorio": embaralha e reparte por contagem (_distribuir_aleatoriamente);
+# "hosts"/"trafego": equilibra a soma de hosts/tráfego esperado por roteador
+MODOS_POSICIONAMENTO = ("aleatorio", "hosts", "trafego")
+TRAFEGO_POR_HOST_PADRAO_BPS = 1e6  # tráfego esperado de um host sem "trafego" na subrede
+
+
+def desequilibrio(cargas):
+    """Maior carga ÷ carga média dos roteadores (1.0 = equilíbrio perfeito)."""
+    cargas = np.asarray(cargas, dtype=np.float64)
+    media = cargas.mean() if len(cargas) else 0.0
+    return float(cargas.max() / media) if media > 0 else 1.0
+
+
+def pesos_subredes(subredes_definidas, criterio):
+    """Peso de cada subrede para o posicionamento: hosts ou tráfego esperado (bits/s)."""
+    if criterio == "hosts":
+        return {nome: float(info["capacidade"]) for nome, info in subredes_definidas.items()}
+    return {nome: capacidade_para_bps(info["trafego"]) if info.get("trafego") is not None
+            else info["capacidade"] * TRAFEGO_POR_HOST_PADRAO_BPS
+            for nome, info in subredes_definidas.items()}
+
+
+def _melhor_troca(pesos_a, pesos_b, folga):
+    """
+    Melhor movimento do roteador A (mais carregado) para B: mover um item de A
+    (peso_b = 0) ou trocar um item de A por um de B. A diferença d transferida
+    precisa ficar em (0, folga) e o ideal é d = folga/2. Retorna (d, i, j) com
+    j = -1 para um movimento simples, ou None se nada melhora.
+    """
+    alvo = folga / 2
+    melhor = None
+    d = pesos_a
+    validos = (d > 0) & (d < folga)
+    if validos.any():
+        i = int(np.argmin(np.where(validos, np.abs(d - alvo), np.inf)))
+        melhor = (abs(d[i] - alvo), float(d[i]), i, -1)
+    if len(pesos_b):
+        ordem = np.argsort(pesos_b, kind="stable")
+        ordenados = pesos_b[ordem]
+        posicao = np.searchsorted(ordenados, pesos_a - alvo)
+        for vizinho in (np.minimum(posicao, len(ordenados) - 1), np.maximum(posicao - 1, 0)):
+            d = pesos_a - ordenados[vizinho]
+            validos = (d > 0) & (d < folga)
+            if validos.any():
+                distancia = np.where(validos, np.abs(d - alvo), np.inf)
+                i = int(np.argmin(distancia))
+                if melhor is None or distancia[i] < melhor[0]:
+                    melhor = (distancia[i], float(d[i]), i, int(ordem[vizinho[i]]))
+    return None if melhor is None else melhor[1:]
+
+
+def posicionar_subredes(roteadores, pesos, iteracoes_maximas=100_000):
+    """
+    Distribui as subredes entre os roteadores equilibrando a soma dos pesos:
+      1. LPT (longest processing time): em ordem decrescente de peso, cada
+         subrede vai para o roteador menos carregado no momento (heap);
+      2. busca local: enquanto houver melhora, o roteador mais carregado passa
+         uma subrede (ou troca uma por outra menor) com o roteador de menor
+         carga para o qual o movimento reduz o máximo do par.
+    As subredes de peso zero (inativas) são repartidas em round-robin por contagem.
+    Retorna {roteador: [subredes na ordem original]}.
+    """
+    nomes = list(pesos)
+    w = np.fromiter((pesos[nome] for nome in nomes), dtype=np.float64, count=len(nomes))
+    m = len(roteadores)
+    destino = np.full(len(nomes), -1, dtype=np.int64)
+    ativos = np.nonzero(w > 0)[0]
+
+    heap = [(0.0, r) for r in range(m)]
+    for i in ativos[np.argsort(-w[ativos], kind="stable")].tolist():
+        carga, r = heapq.heappop(heap)
+        destino[i] = r
+        heapq.heappush(heap, (carga + w[i], r))
+    cargas = np.bincount(destino[ativos], weights=w[ativos], minlength=m)
+
+    tolerancia = 1e-9 * max(float(w.sum()), 1.0)
+    for _ in range(iteracoes_maximas):
+        a = int(np.argmax(cargas))
+        itens_a = np.nonzero(destino == a)[0]
+        for b in np.argsort(cargas, kind="stable").tolist():
+            folga = cargas[a] - cargas[b]
+            if b == a or folga <= tolerancia:
+                continue
+            itens_b = np.nonzero(destino == b)[0]
+            troca = _melhor_troca(w[itens_a], w[itens_b], folga - tolerancia)
+            if troca is not None:
+                d, i, j = troca
+                destino[itens_a[i]] = b
+                if j >= 0:
+                    destino[itens_b[j]] = a
+                cargas[a] -= d
+                cargas[b] += d
+                break
+        else:
+            break
+
+    inativos = np.nonzero(w <= 0)[0]
+    destino[inativos] = np.arange(len(inativos)) % m
+    distribuicao = {roteador: [] for roteador in roteadores}
+    for nome, r in zip(nomes, destino.tolist()):
+        distribuicao[roteadores[r]].append(nome)
+    return distribuicao
+
+
+def distribuir_subredes(roteadores, subredes_definidas, posicionamento="aleatorio", rng=random):
+    """
+    Distribuição das subredes pelo modo de posicionamento. Nos modos "hosts" e
+    "trafego" também compara com a distribuição aleatória e retorna o relatório
+    {"criterio", "antes", "depois", "limite_inferior"} (desequilíbrio = máx/média);
+    no modo "aleatorio" o relatório é None.
+    """
+    if posicionamento not in MODOS_POSICIONAMENTO:
+        raise ValueError(f"Posicionamento desconhecido: {posicionamento!r} "
+                         f"(use {', '.join(MODOS_POSICIONAMENTO)})")
+    aleatoria = _distribuir_aleatoriamente(roteadores, subredes_definidas, rng)
+    if posicionamento == "aleatorio":
+        return aleatoria, None
+    pesos = pesos_subredes(subredes_definidas, posicionamento)
+    distribuicao = posicionar_subredes(roteadores, pesos)
+
+    def cargas(dist):
+        return [sum(pesos[nome] for nome in dist[roteador]) for roteador in roteadores]
+
+    total = sum(pesos.values())
+    limite = max(total / len(roteadores), max(pesos.values(), default=0.0))
+    return distribuicao, {"criterio": posicionamento, "antes": desequilibrio(cargas(aleatoria)),
+                          "depois": desequilibrio(cargas(distribuicao)),
+                          "limite_inferior": limite * len(roteadores) / total if total > 0 else 1.0}
+
+
+def benchmark_posicionamento(num_subredes=(1_000, 10_000, 50_000), num_roteadores=200, semente=0):
+    """
+    Tempo e desequilíbrio (aleatório × só LPT × LPT + busca local) com
+    capacidades uniformes e de cauda longa, e conferência de que toda subrede
+    aparece exatamente uma vez.
+    """
+    rng = np.random.default_rng(semente)
+    roteadores = [f"a{i+1}" for i in range(num_roteadores)]
+    distribuicoes = {"uniforme": lambda n: rng.integers(1, 250, n),
+                     "cauda longa": lambda n: np.minimum(rng.pareto(1.5, n) * 20, 60_000).astype(int)}
+    for rotulo, sortear in distribuicoes.items():
+        print(f"Capacidades {rotulo}, {num_roteadores} roteadores (desequilíbrio = máx/média):")
+        for quantidade in num_subredes:
+            capacidades = sortear(quantidade)
+            capacidades[rng.random(quantidade) < 0.1] = 0
+            definidas = {f"e{i+1}": {"capacidade": int(c)} for i, c in enumerate(capacidades)}
+            pesos = pesos_subredes(definidas, "hosts")
+            so_lpt = posicionar_subredes(roteadores, pesos, iteracoes_maximas=0)
+            inicio = time.perf_counter()
+            distribuicao, relatorio = distribuir_subredes(roteadores, definidas, "hosts", random.Random(semente))
+            decorrido = time.perf_counter() - inicio
+            if sorted(s for lista in distribuicao.values() for s in lista) != sorted(definidas):
+                raise AssertionError("Posicionamento perdeu ou repetiu subredes.")
+            lpt = desequilibrio([sum(pesos[nome] for nome in so_lpt[r]) for r in roteadores])
+            print(f"  {quantidade:>6} subredes, {int(capacidades.sum()):>10,} hosts: {decorrido:6.3f} s, "
+                  f"aleatório {relatorio['antes']:.4f}, LPT {lpt:.4f}, LPT + busca local {relatorio['depois']:.4f} "
+                  f"(limite inferior {relatorio['limite_inferior']:.4f})")
+
+
+###############################################
+# FUNÇÃO PARA CONFIGURAR A REDE SIMULADA
+###############################################
+def configurar_rede():
+    """
+    Configura a rede simulada (roteadores, switches, subredes e hosts),
+    atribui endereços IP e cria os enlaces.
+    Os parâmetros são lidos interativamente; a construção em si é feita por
+    _montar_rede (a mesma usada por construir_rede).
+    Retorna:
+      G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador_atualizadas,
+      roteadores, switches_borda, especificacoes_rede
+    """
+    print("=== Configuração da Rede ===\n")
+    while True:
+        try:
+            num_roteadores = int(input("Quantos roteadores a rede deve possuir? (mínimo 1): "))
+            if num_roteadores < 1:
+                print("Número mínimo de roteadores é 1.\n")
+            else:
+                break
+        except ValueError:
+            print("Entrada inválida. Insira um número inteiro.\n")
+    roteadores = [f"a{i+1}" for i in range(num_roteadores)]
+
+    subredes_por_roteador = {}
+    total_subredes = 0
+    print("\n=== Configuração das Subredes por Roteador ===")
+    for roteador in roteadores:
+        while True:
+            try:
+                num_subredes = int(input(f"Quantas subredes o roteador {roteador} gerenciará? (mínimo 1): "))
+                if num_subredes < 1:
+                    print("Cada roteador deve gerenciar pelo menos 1 subrede.\n")
+                else:
                     subredes_por_roteador[roteador] = num_subredes
                     total_subredes += num_subredes
                     break
@@ -409,6 +1915,22 @@ def configurar_rede():
         subredes_definidas[nome] = {"capacidade": capacidade}
     print()
 
+    while True:
+        posicionamento = input(f"Posicionamento das subredes nos roteadores ({', '.join(MODOS_POSICIONAMENTO)}) "
+                               "[aleatorio]: ").strip().lower() or "aleatorio"
+        if posicionamento in MODOS_POSICIONAMENTO:
+            break
+        print(f"Opção inválida. Use: {', '.join(MODOS_POSICIONAMENTO)}.\n")
+    print()
+
+    return _montar_rede(roteadores, subredes_definidas, verbose=True, posicionamento=posicionamento)
+
+
+def _distribuir_aleatoriamente(roteadores, subredes_definidas, rng=random):
+    """
+    Distribui as subredes entre os roteadores: as ativas (capacidade > 0) e as
+    inativas são embaralhadas separadamente e repartidas em round-robin por contagem.
+    """
     active_subnets = [nome for nome, info in subredes_definidas.items() if info["capacidade"] > 0]
     inactive_subnets = [nome for nome, info in subredes_definidas.items() if info["capacidade"] == 0]
 
@@ -421,247 +1943,5195 @@ def configurar_rede():
     inactive_per_router = inactive_total // num_roteadores
     inactive_extra = inactive_total % num_roteadores
 
-    random.shuffle(active_subnets)
-    random.shuffle(inactive_subnets)
+    rng.shuffle(active_subnets)
+    rng.shuffle(inactive_subnets)
     index = 0
     for i, roteador in enumerate(roteadores):
         count = active_per_router + (1 if i < active_extra else 0)
-        for _ in range(count):
-            if index < active_total:
-                subredes_por_roteador_atualizadas[roteador].append(active_subnets[index])
-                index += 1
+        subredes_por_roteador_atualizadas[roteador].extend(active_subnets[index:index + count])
+        index += count
     index = 0
     for i, roteador in enumerate(roteadores):
         count = inactive_per_router + (1 if i < inactive_extra else 0)
-        for _ in range(count):
-            if index < inactive_total:
-                subredes_por_roteador_atualizadas[roteador].append(inactive_subnets[index])
-                index += 1
+        subredes_por_roteador_atualizadas[roteador].extend(inactive_subnets[index:index + count])
+        index += count
+    return subredes_por_roteador_atualizadas
+
+
+# Capacidade dos enlaces da hierarquia, por tipo de enlace
+CAPACIDADE_ENLACE_PADRAO = {'Fibra Óptica': '1 Gbps', 'Par Trançado': '100 Mbps'}
+
+
+def _montar_rede(roteadores, subredes_definidas, verbose=False, rng=random, rede_base=None, mtu=MTU_PADRAO,
+                 posicionamento="aleatorio"):
+    """
+    Monta o grafo (um GrafoCSR, com os nós e arestas em arrays), a tabela de
+    endereços IP e as especificações da rede em lote, a partir da lista de
+    roteadores e do dicionário {nome_subrede: {"capacidade": n}}.
+    Os endereços são recortados com VLSM: o Switch Central e os roteadores ficam
+    em um bloco de backbone e cada subrede recebe o menor prefixo que comporta o
+    switch de borda e seus hosts. Sem rede_base, usa a primeira rede privada
+    (192.168.1.0/24, 192.168.0.0/16, 172.16.0.0/12, 10.0.0.0/8) em que tudo cabe.
+    As subredes são distribuídas entre os roteadores conforme `posicionamento`
+    (ver distribuir_subredes).
+    Com verbose=False nenhuma linha por host/enlace é impressa.
+    Retorna a mesma tupla de configurar_rede; especificacoes_rede["Enlaces"] é
+    derivada das arestas do grafo (GrafoCSR.enlaces).
+    """
+    subredes_por_roteador_atualizadas, relatorio = distribuir_subredes(roteadores, subredes_definidas,
+                                                                       posicionamento, rng)
+    if verbose and relatorio:
+        print(f"Posicionamento por {relatorio['criterio']}: desequilíbrio (máx/média por roteador) "
+              f"{relatorio['antes']:.3f} → {relatorio['depois']:.3f}\n")
+
+    # Demanda de endereços: backbone = Switch Central + roteadores; subrede = switch de borda + hosts
+    demandas = {None: 1 + len(roteadores)}
+    for subrede, info in subredes_definidas.items():
+        demandas[subrede] = 1 + info["capacidade"]
+    if rede_base is None:
+        rede_base = AlocadorIP.escolher_rede(prefixo_para_capacidade(n) for n in demandas.values())
+    alocador = AlocadorIP(rede_base)
+    blocos = alocador.recortar_vlsm(demandas)
+
+    enderecos_ip = TabelaEnderecos()
+    backbone = blocos[None]
+    enderecos_ip.atribuir_bloco(["Switch Central"] + roteadores, backbone.alocar(1 + len(roteadores)))
+    if verbose:
+        print(f"Assignando IP ao Switch Central: {enderecos_ip['Switch Central']}")
+        for roteador in roteadores:
+            print(f"Assignando IP ao Roteador {roteador}: {enderecos_ip[roteador]}")
 
     subredes = {}
     mascaras_subrede = {}
-    enlaces = []
-    print("=== Configuração das Subredes e Hosts ===")
+    if verbose:
+        print("=== Configuração das Subredes e Hosts ===")
     for roteador, subrede_list in subredes_por_roteador_atualizadas.items():
-        print(f"\nConfiguração do Roteador {roteador}:")
+        if verbose:
+            print(f"\nConfiguração do Roteador {roteador}:")
         for subrede in subrede_list:
             capacidade = subredes_definidas[subrede]["capacidade"]
-            status = "Ativa" if capacidade > 0 else "Inativa"
-            print(f"  Subrede '{subrede}' - {status} com {capacidade} hosts.")
+            bloco = blocos[subrede]
+            mascara = int_para_ip(bloco.mascara)
+            hosts = [f"Host {subrede}-{j}" for j in range(1, capacidade + 1)]
             subredes[subrede] = {
-                "hosts": [f"Host {subrede}-{j}" for j in range(1, capacidade + 1)],
+                "hosts": hosts,
                 "roteador": roteador,
-                "mask": subnet_mask_class,
-                "capacidade": capacidade
+                "mask": mascara,
+                "capacidade": capacidade,
+                "rede": bloco.rede,
+                "prefixo": bloco.prefixo
             }
-            mascaras_subrede[subrede] = subnet_mask_class
+            mascaras_subrede[subrede] = mascara
             switch_borda = f"Switch {subrede}"
-            G.add_node(switch_borda, tipo='Switch de Borda')
-            switch_borda_ip = f"{base_ip}{ip_counter}"
-            enderecos_ip[switch_borda] = switch_borda_ip
-            print(f"  Assignando IP ao {switch_borda}: {switch_borda_ip}")
-            ip_counter += 1
-            if capacidade > 0:
-                for host in subredes[subrede]["hosts"]:
-                    host_ip = f"{base_ip}{ip_counter}"
-                    enderecos_ip[host] = host_ip
-                    print(f"    Assignando IP ao {host}: {host_ip}")
-                    ip_counter += 1
-    print()
+            enderecos_ip.atribuir_bloco([switch_borda] + hosts, bloco.alocar(1 + capacidade))
+            if verbose:
+                status = "Ativa" if capacidade > 0 else "Inativa"
+                print(f"  Subrede '{subrede}' ({bloco}) - {status} com {capacidade} hosts.")
+                print(f"  Assignando IP ao {switch_borda}: {enderecos_ip[switch_borda]}")
+                for host in hosts:
+                    print(f"    Assignando IP ao {host}: {enderecos_ip[host]}")
+    if verbose:
+        print()
 
     switches_borda = [f"Switch {subrede}" for subrede in subredes.keys() if subredes[subrede]["capacidade"] > 0]
-    for switch in switches_borda:
-        G.add_node(switch, tipo='Switch de Borda')
 
-    print("=== Configuração dos Enlaces ===")
-    for roteador in roteadores:
-        G.add_edge("Switch Central", roteador, tipo_enlace='Fibra Óptica', capacidade='1 Gbps')
-        enlaces.append(("Switch Central", roteador, {'tipo_enlace': 'Fibra Óptica', 'capacidade': '1 Gbps'}))
-        print(f"  Switch Central <--> {roteador}: Fibra Óptica, 1 Gbps")
+    # Ids dos nós na ordem da tabela de endereços: Switch Central, roteadores e,
+    # para cada subrede, o switch de borda seguido dos seus hosts
+    num_roteadores, num_subredes = len(roteadores), len(subredes)
+    nomes = ["Switch Central", *roteadores]
     for subrede, info in subredes.items():
-        roteador = info["roteador"]
-        switch_borda = f"Switch {subrede}"
-        G.add_edge(roteador, switch_borda, tipo_enlace='Par Trançado', capacidade='100 Mbps')
-        enlaces.append((roteador, switch_borda, {'tipo_enlace': 'Par Trançado', 'capacidade': '100 Mbps'}))
-        print(f"  {roteador} <--> {switch_borda}: Par Trançado, 100 Mbps")
-        if info["capacidade"] > 0:
-            G.add_nodes_from(info["hosts"], tipo='Host')
-            for host in info["hosts"]:
-                G.add_edge(switch_borda, host, tipo_enlace='Par Trançado', capacidade='100 Mbps')
-                enlaces.append((switch_borda, host, {'tipo_enlace': 'Par Trançado', 'capacidade': '100 Mbps'}))
-                print(f"    {switch_borda} <--> {host}: Par Trançado, 100 Mbps")
-        else:
-            print(f"    (Subrede '{subrede}' não utilizada)")
-    print()
+        nomes.append(f"Switch {subrede}")
+        nomes.extend(info["hosts"])
+    hosts_por_switch = np.fromiter((len(info["hosts"]) for info in subredes.values()), dtype=np.int64,
+                                   count=num_subredes)
+    ids_switches = (1 + num_roteadores + np.cumsum(hosts_por_switch + 1) - (hosts_por_switch + 1)).astype(np.int32)
+    tabela_nos = [{'tipo': tipo} for tipo in ('Switch Central', 'Roteador de Agregação', 'Switch de Borda', 'Host')]
+    codigos_no = np.full(len(nomes), 3, dtype=np.uint16)
+    codigos_no[0] = 0
+    codigos_no[1:1 + num_roteadores] = 1
+    codigos_no[ids_switches] = 2
 
+    # Um único dicionário de atributos por tipo de enlace, compartilhado pelas arestas
+    # (mtu: um valor para todos os enlaces ou um dicionário tipo_enlace → MTU)
+    fibra = {'tipo_enlace': 'Fibra Óptica', 'capacidade': CAPACIDADE_ENLACE_PADRAO['Fibra Óptica']}
+    par_trancado = {'tipo_enlace': 'Par Trançado', 'capacidade': CAPACIDADE_ENLACE_PADRAO['Par Trançado']}
+    for atributos in (fibra, par_trancado):
+        atributos['mtu'] = mtu.get(atributos['tipo_enlace'], MTU_PADRAO) if isinstance(mtu, dict) else mtu
+    # Arestas: Switch Central → roteadores (fibra), roteador → switch de borda e switch → hosts (par trançado)
+    id_roteador = dict(zip(roteadores, range(1, num_roteadores + 1)))
+    origens = np.concatenate((np.zeros(num_roteadores, dtype=np.int32),
+                              np.fromiter((id_roteador[info["roteador"]] for info in subredes.values()),
+                                          dtype=np.int32, count=num_subredes),
+                              np.repeat(ids_switches, hosts_por_switch)))
+    destinos = np.concatenate((np.arange(1, 1 + num_roteadores, dtype=np.int32), ids_switches,
+                               np.flatnonzero(codigos_no == 3).astype(np.int32)))
+    codigos_aresta = (np.arange(len(origens)) >= num_roteadores).astype(np.uint16)
+    G = GrafoCSR(nomes, codigos_no, tabela_nos, origens, destinos, codigos_aresta, [fibra, par_trancado])
+    if len(enderecos_ip._ips) == len(enderecos_ip) == len(nomes):
+        # Sem nomes repetidos, a tabela tem os nós na ordem dos ids: um só dicionário serve aos dois
+        G._ids = enderecos_ip._compartilhar_posicoes()
+
+    if verbose:
+        print("=== Configuração dos Enlaces ===")
+        for roteador in roteadores:
+            print(f"  Switch Central <--> {roteador}: Fibra Óptica, 1 Gbps")
+        for subrede, info in subredes.items():
+            switch_borda = f"Switch {subrede}"
+            print(f"  {info['roteador']} <--> {switch_borda}: Par Trançado, 100 Mbps")
+            if info["capacidade"] > 0:
+                for host in info["hosts"]:
+                    print(f"    {switch_borda} <--> {host}: Par Trançado, 100 Mbps")
+            else:
+                print(f"    (Subrede '{subrede}' não utilizada)")
+        print()
+
+    base = alocador.base
+    primeiro_octeto = base.rede >> 24
+    network_class = "Classe A" if primeiro_octeto < 128 else "Classe B" if primeiro_octeto < 192 else "Classe C"
     especificacoes_rede = {
         "Classe de Rede": network_class,
-        "Endereço de Rede": network_address,
-        "Máscara de Subrede Padrão": subnet_mask_class,
-        "Endereço de Broadcast": broadcast_address,
+        "Endereço de Rede": f"{int_para_ip(base.rede)}/{base.prefixo}",
+        "Máscara de Subrede Padrão": int_para_ip(base.mascara),
+        "Endereço de Broadcast": int_para_ip(base.broadcast),
         "Total de Roteadores": len(roteadores),
         "Total de Subredes": len(subredes),
-        "Total de Hosts": ip_counter - 1,
-        "Enlaces": enlaces
+        "Total de Hosts": len(enderecos_ip),
+        "Enlaces": G.enlaces()
     }
+    if relatorio:
+        especificacoes_rede["Posicionamento das Subredes"] = (
+            f"{relatorio['criterio']} (desequilíbrio {relatorio['antes']:.3f} → {relatorio['depois']:.3f})")
 
     return G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador_atualizadas, roteadores, switches_borda, especificacoes_rede
 
 
 ###############################################
-# FUNÇÃO PARA DESENHAR A TOPOLOGIA DA REDE (MELHORADA)
+# CONSTRUÇÃO DECLARATIVA DA REDE (SEM PROMPTS)
 ###############################################
-def desenhar_topologia(G):
-    plt.figure(figsize=(16, 12))
-    pos = nx.spring_layout(G, seed=42, k=0.3)
-
-    # Cores suaves com bordas pretas
-    color_map = []
-    for node in G:
-        tipo = G.nodes[node].get('tipo', 'Unknown')
-        if tipo == 'Switch Central':
-            color_map.append('#FF6347')  # Tomato
-        elif tipo == 'Roteador de Agregação':
-            color_map.append('#FFA500')  # Laranja
-        elif tipo == 'Switch de Borda':
-            color_map.append('#32CD32')  # Verde Limão
-        elif tipo == 'Host':
-            color_map.append('#87CEFA')  # Azul Céu Claro
-        else:
-            color_map.append('#D3D3D3')  # Cinza Claro
-
-    nx.draw_networkx_nodes(G, pos, node_color=color_map, node_size=2000, edgecolors='black', linewidths=1.5)
-    nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold', font_family='sans-serif')
-
-    # Configuração das arestas
-    edge_colors = []
-    edge_widths = []
-    for u, v, data in G.edges(data=True):
-        tipo_enlace = data.get('tipo_enlace', 'Default')
-        if tipo_enlace == 'Fibra Óptica':
-            edge_colors.append('#8A2BE2')  # Blue Violet
-            edge_widths.append(3)
-        elif tipo_enlace == 'Par Trançado':
-            edge_colors.append('#1E90FF')  # Dodger Blue
-            edge_widths.append(2)
-        else:
-            edge_colors.append('gray')
-            edge_widths.append(1.5)
+def carregar_especificacao(caminho):
+    """
+    Lê uma especificação de topologia de um arquivo JSON, TOML ou YAML
+    (o formato é escolhido pela extensão; YAML requer o pacote PyYAML).
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == ".toml":
+        import tomllib
+        with open(caminho, "rb") as f:
+            return tomllib.load(f)
+    if extensao in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Leitura de YAML requer o PyYAML (pip install pyyaml).") from None
+        with open(caminho, encoding="utf-8") as f:
+            return yaml.safe_load(f)
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
 
-    nx.draw_networkx_edges(G, pos, edge_color=edge_colors, width=edge_widths, alpha=0.8)
 
-    # Legenda personalizada
-    import matplotlib.patches as mpatches
-    from matplotlib.lines import Line2D
-    legend_elements = [
-        mpatches.Patch(facecolor='#FF6347', edgecolor='black', label='Switch Central'),
-        mpatches.Patch(facecolor='#FFA500', edgecolor='black', label='Roteador de Agregação'),
-        mpatches.Patch(facecolor='#32CD32', edgecolor='black', label='Switch de Borda'),
-        mpatches.Patch(facecolor='#87CEFA', edgecolor='black', label='Host'),
-        Line2D([0], [0], color='#8A2BE2', lw=3, label='Fibra Óptica'),
-        Line2D([0], [0], color='#1E90FF', lw=2, label='Par Trançado')
-    ]
-    plt.legend(handles=legend_elements, loc='upper left', fontsize=12,
-               frameon=True, facecolor='white', edgecolor='black')
+def gerar_especificacao(num_roteadores, subredes_por_roteador=1, hosts_por_subrede=0, semente=None):
+    """
+    Gera uma especificação sintética (útil para topologias grandes).
+    hosts_por_subrede pode ser um inteiro (todas iguais) ou uma lista com a
+    capacidade de cada subrede.
+    """
+    total_subredes = num_roteadores * subredes_por_roteador
+    if isinstance(hosts_por_subrede, int):
+        capacidades = [hosts_por_subrede] * total_subredes
+    else:
+        capacidades = list(hosts_por_subrede)
+        if len(capacidades) != total_subredes:
+            raise ValueError(f"Esperadas {total_subredes} capacidades, recebidas {len(capacidades)}.")
+    especificacao = {
+        "roteadores": num_roteadores,
+        "subredes": [{"nome": f"e{i+1}", "capacidade": c} for i, c in enumerate(capacidades)],
+    }
+    if semente is not None:
+        especificacao["semente"] = semente
+    return especificacao
 
-    plt.title("Topologia de Rede - Árvore Hierárquica", fontsize=16, fontweight='bold')
-    plt.axis('off')
-    plt.tight_layout()
-    plt.show()
 
+def construir_rede(especificacao, verbose=False):
+    """
+    Constrói a rede sem nenhuma interação, a partir de uma especificação declarativa
+    (dicionário ou caminho para arquivo JSON/TOML/YAML):
+
+      {
+        "roteadores": 2,                       # número de roteadores (a1..aN)
+        "subredes": [                          # ou {"e1": 10, "e2": 0}
+          {"nome": "e1", "capacidade": 10},
+          {"nome": "e2", "capacidade": 0, "trafego": "50 Mbps"}   # opcional: tráfego esperado
+        ],
+        "posicionamento": "hosts",             # opcional: aleatorio (padrão), hosts ou trafego
+        "semente": 42,                         # opcional: distribuição reprodutível
+        "rede_base": "10.0.0.0/8",             # opcional: rede de onde os blocos são recortados
+        "mtu": 1500                            # opcional: MTU dos enlaces (ou {"Fibra Óptica": 9000, ...})
+      }
 
-###############################################
-# FUNÇÕES DE EXIBIÇÃO DE CONFIGURAÇÃO E IPs
-###############################################
-def exibir_enderecos_ip(enderecos_ip):
-    print("\n==== Tabela de Endereços IP ====")
-    print(f"{'Dispositivo':<25} {'Endereço IP':<15}")
-    print("-" * 40)
-    for dispositivo, ip in sorted(enderecos_ip.items()):
-        print(f"{dispositivo:<25} {ip:<15}")
-    print("-" * 40)
+    Um caminho para um snapshot binário (salvar_snapshot) também é aceito.
+    Retorna a mesma tupla de configurar_rede.
+    """
+    if isinstance(especificacao, (str, os.PathLike)):
+        if eh_snapshot(especificacao):
+            return carregar_snapshot(especificacao)
+        especificacao = carregar_especificacao(especificacao)
 
+    num_roteadores = especificacao.get("roteadores")
+    if not isinstance(num_roteadores, int) or num_roteadores < 1:
+        raise ValueError("A especificação deve ter 'roteadores' inteiro >= 1.")
+    roteadores = [f"a{i+1}" for i in range(num_roteadores)]
 
-def exibir_configuracao_rede(subredes, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede, enderecos_ip):
-    print("\n==== Configuração da Rede ====")
-    for chave, valor in especificacoes_rede.items():
-        print(f"{chave}: {valor}")
-    print("\n---- Endereços IP ----")
-    exibir_enderecos_ip(enderecos_ip)
+    subredes_spec = especificacao.get("subredes", [])
+    if isinstance(subredes_spec, dict):
+        subredes_spec = [{"nome": nome, "capacidade": cap} for nome, cap in subredes_spec.items()]
+    subredes_definidas = {}
+    for i, item in enumerate(subredes_spec, start=1):
+        nome = str(item.get("nome") or f"e{i}")
+        capacidade = item.get("capacidade", 0)
+        if nome in subredes_definidas:
+            raise ValueError(f"Nome de subrede repetido: '{nome}'.")
+        if not isinstance(capacidade, int) or capacidade < 0:
+            raise ValueError(f"Capacidade inválida para a subrede '{nome}': {capacidade!r}.")
+        subredes_definidas[nome] = {"capacidade": capacidade}
+        if item.get("trafego") is not None:
+            capacidade_para_bps(item["trafego"])  # valida já na leitura
+            subredes_definidas[nome]["trafego"] = item["trafego"]
+
+    posicionamento = especificacao.get("posicionamento", "aleatorio")
+    if posicionamento not in MODOS_POSICIONAMENTO:
+        raise ValueError(f"'posicionamento' deve ser um de: {', '.join(MODOS_POSICIONAMENTO)}.")
+    rng = random.Random(especificacao["semente"]) if "semente" in especificacao else random
+    return _montar_rede(roteadores, subredes_definidas, verbose=verbose, rng=rng,
+                        rede_base=especificacao.get("rede_base"), mtu=especificacao.get("mtu", MTU_PADRAO),
+                        posicionamento=posicionamento)
 
 
 ###############################################
-# FUNÇÕES DE PING E TRACEROUTE
+# SNAPSHOT BINÁRIO DA REDE (SALVAR / CARREGAR)
 ###############################################
-def ping(G, enderecos_ip, origem, destino):
-    if origem not in enderecos_ip or destino not in enderecos_ip:
-        return f"Ping de {origem} para {destino}: Falha (host inexistente)\n"
-    if nx.has_path(G, origem, destino):
-        latencia = round(random.uniform(1, 100), 2)
-        return (f"Ping de {origem} ({enderecos_ip.get(origem)}) para {destino} ({enderecos_ip.get(destino)}):\n"
-                f"  Pacotes: 4 enviados, 4 recebidos, 0% perda\n"
-                f"  Tempo médio: {latencia} ms\n")
-    else:
-        return f"Ping de {origem} para {destino}: Falha (sem rota disponível)\n"
+MAGICO_SNAPSHOT = b"P2SNAP\r\n"   # o \r\n denuncia arquivos corrompidos por modo texto
+VERSAO_SNAPSHOT = 1
+_CABECALHO_SNAPSHOT = struct.Struct("<8sII")  # mágico, versão, tamanho do JSON de metadados
+_ALINHAMENTO_SNAPSHOT = 64
 
 
-def traceroute(G, enderecos_ip, origem, destino):
-    if origem not in enderecos_ip or destino not in enderecos_ip:
-        return f"Traceroute de {origem} para {destino}: Sem rota disponível\n"
-    if nx.has_path(G, origem, destino):
-        caminho = nx.shortest_path(G, origem, destino)
-        resultado = "Traceroute:\n"
-        for i, node in enumerate(caminho):
-            resultado += f"  {i+1}. {node} ({enderecos_ip.get(node)})\n"
-        return resultado
+def _codificar_atributos(itens, tabela, indices):
+    """Código (índice em `tabela`) do dicionário de atributos de cada item; dicionários iguais compartilham código."""
+    def codigo(atributos):
+        chave = tuple(atributos.items())
+        try:
+            return indices[chave]
+        except KeyError:
+            pass
+        except TypeError:  # valores não hasheáveis (listas...): chave textual
+            chave = json.dumps(atributos, sort_keys=True, default=str)
+            if chave in indices:
+                return indices[chave]
+        indices[chave] = len(tabela)
+        tabela.append(dict(atributos))
+        return indices[chave]
+    return np.fromiter(map(codigo, itens), dtype=np.uint16, count=len(itens))
+
+
+class _SemColetaDeLixo:
+    """Desliga o coletor cíclico durante a criação em massa de dicionários e tuplas."""
+
+    def __enter__(self):
+        import gc
+        self._ativo = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *exc):
+        import gc
+        if self._ativo:
+            gc.enable()
+
+
+def _ips_em_ordem(enderecos_ip):
+    """Endereços (uint32) na ordem de iteração da tabela."""
+    if isinstance(enderecos_ip, TabelaEnderecos):
+        posicoes = np.fromiter(enderecos_ip._posicao.values(), dtype=np.int64, count=len(enderecos_ip))
+        return np.frombuffer(enderecos_ip._ips, dtype=np.uint32)[posicoes].astype("<u4")
+    return np.fromiter(map(ip_para_int, enderecos_ip.values()), dtype="<u4", count=len(enderecos_ip))
+
+
+def _arestas_por_id(G, ids):
+    """
+    Arestas de G como (origens, destinos, dicionários de atributos), com os nós
+    trocados pelos ids; a ordem é a de G.edges (cada aresta sai pelo extremo que
+    vem primeiro), lida direto da adjacência para evitar as views do networkx.
+    """
+    origens, destinos, dados_arestas = array("i"), array("i"), []
+    for u, vizinhos in G._adj.items():
+        iu = ids[u]
+        for v, dados in vizinhos.items():
+            iv = ids[v]
+            if iv >= iu:
+                origens.append(iu)
+                destinos.append(iv)
+                dados_arestas.append(dados)
+    return origens, destinos, dados_arestas
+
+
+def salvar_snapshot(rede, caminho):
+    """
+    Grava a tupla completa da rede (G, subredes, enderecos_ip, mascaras_subrede,
+    subredes_por_roteador, roteadores, switches_borda, especificacoes_rede) em um
+    arquivo binário versionado:
+      - cabeçalho: mágico, versão e um JSON com os metadados pequenos (subredes,
+        roteadores, especificações, tabelas de atributos) e o mapa das seções;
+      - seções alinhadas em 64 bytes: tabela de nomes (UTF-8 separado por \\n)
+        e a permutação que a põe em ordem alfabética, códigos de atributo por
+        nó, arestas e enlaces como pares de ids int32, e os endereços IP como
+        uint32 (prontos para mmap).
+    """
+    with _SemColetaDeLixo():
+        return _salvar_snapshot(rede, caminho)
+
+
+def _salvar_snapshot(rede, caminho):
+    G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede = rede
+    nucleo = GrafoCSR.de_grafo(G)
+    nomes = nucleo.nomes
+    extras = [nome for nome in enderecos_ip if nome not in nucleo.ids]
+    todos = nomes + extras
+    if any("\n" in str(nome) for nome in todos) or any(not isinstance(nome, str) for nome in todos):
+        raise ValueError("O snapshot só aceita nomes de dispositivos do tipo str sem quebras de linha.")
+    ids = dict(zip(todos, range(len(todos)))) if extras else nucleo.ids
+    if not extras and isinstance(nucleo._ids, _IdsOrdenados):
+        ordem_nomes = nucleo._ids._ordem
     else:
-        return f"Traceroute de {origem} para {destino}: Sem rota disponível\n"
+        ordem_nomes = sorted(range(len(todos)), key=todos.__getitem__)
 
+    atributos_no, atributos_aresta = list(nucleo.tabela_nos), list(nucleo.tabela_enlaces)
+    origens, destinos, codigos_aresta = nucleo._arestas_ids()
+    enlaces = especificacoes_rede.get("Enlaces", [])
+    if isinstance(enlaces, _EnlacesCSR) and enlaces.grafo is nucleo:
+        pares_enlaces, codigos_enlace = enlaces._arrays()
+    else:
+        pares_enlaces = np.column_stack((np.fromiter((ids[e[0]] for e in enlaces), dtype="<i4", count=len(enlaces)),
+                                         np.fromiter((ids[e[1]] for e in enlaces), dtype="<i4", count=len(enlaces))))
+        codigos_enlace = _codificar_atributos([d for _, _, d in enlaces], atributos_aresta, {})
+    secoes = {
+        "nomes": np.frombuffer("\n".join(todos).encode("utf-8"), dtype=np.uint8),
+        "ordem_nomes": np.asarray(ordem_nomes, dtype="<i4"),
+        "atributos_no": nucleo.codigos_no,
+        "arestas": np.column_stack((origens, destinos)).astype("<i4").reshape(-1, 2),
+        "atributos_aresta": codigos_aresta,
+        "enlaces": pares_enlaces.astype("<i4").reshape(-1, 2),
+        "atributos_enlace": codigos_enlace,
+        "ip_nos": np.fromiter(map(ids.__getitem__, enderecos_ip), dtype="<i4", count=len(enderecos_ip)),
+        "ips": _ips_em_ordem(enderecos_ip),
+        "hosts_subrede": np.fromiter((ids[h] for info in subredes.values() for h in info["hosts"]), dtype="<i4"),
+    }
+    metadados = {
+        "versao": VERSAO_SNAPSHOT,
+        "num_nos": len(nomes),
+        "grafo": nucleo.graph,
+        "atributos_no": atributos_no,
+        "atributos_aresta": atributos_aresta,
+        "subredes": {nome: {**{chave: valor for chave, valor in info.items() if chave != "hosts"},
+                            "num_hosts": len(info["hosts"])} for nome, info in subredes.items()},
+        "mascaras_subrede": mascaras_subrede,
+        "subredes_por_roteador": subredes_por_roteador,
+        "roteadores": roteadores,
+        "switches_borda": switches_borda,
+        "especificacoes_rede": {chave: valor for chave, valor in especificacoes_rede.items() if chave != "Enlaces"},
+        "secoes": {},
+    }
 
-###############################################
-# MENU INTERATIVO DO SIMULADOR DE REDE
-###############################################
-def menu(G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede):
-    while True:
-        print("\n==== Simulador de Rede ====")
-        print("1. Exibir Topologia da Rede")
-        print("2. Executar Ping")
-        print("3. Executar Traceroute")
-        print("4. Exibir Endereços IP")
-        print("5. Exibir Configuração da Rede")
-        print("6. Criar Datagram IP")
-        print("7. Sair")
-        opcao = input("Escolha uma opção: ").strip()
-        if opcao == "1":
-            desenhar_topologia(G)
-        elif opcao == "2":
-            origem = input("Digite o nome do host de origem (ex.: Host e1-1): ").strip()
-            destino = input("Digite o nome do host de destino (ex.: Host e2-5): ").strip()
-            print(ping(G, enderecos_ip, origem, destino))
-        elif opcao == "3":
-            origem = input("Digite o nome do host de origem (ex.: Host e1-1): ").strip()
-            destino = input("Digite o nome do host de destino (ex.: Host e2-5): ").strip()
-            print(traceroute(G, enderecos_ip, origem, destino))
-        elif opcao == "4":
-            exibir_enderecos_ip(enderecos_ip)
-        elif opcao == "5":
-            exibir_configuracao_rede(subredes, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede, enderecos_ip)
-        elif opcao == "6":
-            criar_e_visualizar_datagrama(enderecos_ip)
-        elif opcao == "7":
-            print("Encerrando o simulador...")
-            break
-        else:
-            print("Opção inválida. Tente novamente.")
+    # O JSON guarda os offsets das seções, que dependem do tamanho do próprio JSON:
+    # reserva-se espaço de sobra e o cabeçalho é completado com espaços.
+    esboco = json.dumps(metadados, ensure_ascii=False).encode("utf-8")
+    reservado = len(esboco) + 64 * len(secoes) + 256
+    offset = -(-(_CABECALHO_SNAPSHOT.size + reservado) // _ALINHAMENTO_SNAPSHOT) * _ALINHAMENTO_SNAPSHOT
+    for nome, dados in secoes.items():
+        metadados["secoes"][nome] = [offset, dados.dtype.str, list(dados.shape)]
+        offset += -(-dados.nbytes // _ALINHAMENTO_SNAPSHOT) * _ALINHAMENTO_SNAPSHOT
+    cabecalho = json.dumps(metadados, ensure_ascii=False).encode("utf-8").ljust(reservado)
 
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(_CABECALHO_SNAPSHOT.pack(MAGICO_SNAPSHOT, VERSAO_SNAPSHOT, reservado))
+        arquivo.write(cabecalho)
+        for nome, dados in secoes.items():
+            arquivo.write(bytes(metadados["secoes"][nome][0] - arquivo.tell()))
+            arquivo.write(np.ascontiguousarray(dados).tobytes())
+    os.replace(temporario, caminho)
+    return caminho
 
-###############################################
-# FUNÇÃO MAIN – INÍCIO DO SIMULADOR
-###############################################
-def main():
-    G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede = configurar_rede()
-    desenhar_topologia(G)
-    menu(G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede)
+
+def eh_snapshot(caminho):
+    """O arquivo começa com o mágico de snapshot?"""
+    try:
+        with open(caminho, "rb") as arquivo:
+            return arquivo.read(len(MAGICO_SNAPSHOT)) == MAGICO_SNAPSHOT
+    except OSError:
+        return False
+
+
+class _IdsOrdenados(Mapping):
+    """
+    nome → id sobre os nomes de um snapshot e a permutação que os ordena (seção
+    "ordem_nomes"): cada consulta é uma busca binária nos arrays, sem montar um
+    dicionário de n entradas na carga. Passadas LIMITE consultas (uso em massa),
+    o dicionário é montado uma vez e as consultas seguintes vão direto a ele.
+    """
+
+    LIMITE = 4096
+
+    def __init__(self, nomes, ordem):
+        self._nomes, self._ordem = nomes, ordem
+        self._dicionario = None
+        self._consultas = 0
+
+    def _buscar(self, nome):
+        if self._dicionario is None:
+            self._consultas += 1
+            if self._consultas > self.LIMITE:
+                self._dicionario = self.copy()
+        if self._dicionario is not None:
+            return self._dicionario.get(nome, -1)
+        if not isinstance(nome, str):
+            return -1
+        nomes, ordem = self._nomes, self._ordem
+        k = bisect.bisect_left(ordem, nome, key=nomes.__getitem__)
+        return int(ordem[k]) if k < len(ordem) and nomes[ordem[k]] == nome else -1
+
+    def __getitem__(self, nome):
+        i = self._buscar(nome)
+        if i < 0:
+            raise KeyError(nome)
+        return i
+
+    def get(self, nome, padrao=None):
+        i = self._buscar(nome)
+        return padrao if i < 0 else i
+
+    def __contains__(self, nome):
+        return self._buscar(nome) >= 0
+
+    def __iter__(self):
+        return iter(self._nomes)
+
+    def __len__(self):
+        return len(self._nomes)
+
+    def items(self):
+        return zip(self._nomes, range(len(self._nomes)))
+
+    def values(self):
+        return range(len(self._nomes))
+
+    def copy(self):
+        """O dicionário nome → id equivalente."""
+        if self._dicionario is not None:
+            return self._dicionario.copy()
+        with _SemColetaDeLixo():
+            return dict(zip(self._nomes, range(len(self._nomes))))
+
+
+class Snapshot:
+    """
+    Snapshot aberto via mmap: as seções são arrays NumPy sobre o próprio arquivo
+    (nada é copiado na abertura) e os nomes são decodificados de uma vez.
+    rede() devolve a tupla completa com o grafo como GrafoCSR montado dos
+    arrays; grafo() reconstrói um GrafoRede (networkx), para quem vai alterá-lo.
+    """
+
+    def __init__(self, caminho):
+        import mmap
+        with open(caminho, "rb") as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, tamanho = _CABECALHO_SNAPSHOT.unpack_from(self._mapa, 0)
+        if magico != MAGICO_SNAPSHOT:
+            raise ValueError(f"{caminho}: não é um snapshot de rede.")
+        if versao > VERSAO_SNAPSHOT:
+            raise ValueError(f"{caminho}: snapshot versão {versao}, mas só a versão {VERSAO_SNAPSHOT} é suportada.")
+        inicio = _CABECALHO_SNAPSHOT.size
+        self.metadados = json.loads(self._mapa[inicio:inicio + tamanho].decode("utf-8"))
+        self.versao = versao
+        self.secoes = {}
+        for nome, (offset, tipo, forma) in self.metadados["secoes"].items():
+            dtype = np.dtype(tipo)
+            quantidade = int(np.prod(forma)) if forma else 1
+            self.secoes[nome] = np.frombuffer(self._mapa, dtype=dtype, count=quantidade, offset=offset).reshape(forma)
+        blob = self.secoes["nomes"]
+        self.nomes = blob.tobytes().decode("utf-8").split("\n") if len(blob) else []
+        self.num_nos = self.metadados["num_nos"]
+
+    def _enderecos_dos_nos(self):
+        """A tabela de endereços tem exatamente os nós do grafo, na ordem dos ids?"""
+        ip_nos = self.secoes["ip_nos"]
+        return len(ip_nos) == len(self.nomes) == self.num_nos and np.array_equal(ip_nos, np.arange(len(ip_nos)))
+
+    def enderecos(self):
+        """
+        TabelaEnderecos montada direto dos arrays (sem converter IPs para texto).
+        Se ela tem os nós na ordem dos ids, as posições são buscas binárias na
+        seção "ordem_nomes" em vez de um dicionário montado na carga.
+        """
+        tabela = TabelaEnderecos()
+        nomes = self.nomes
+        if "ordem_nomes" in self.secoes and self._enderecos_dos_nos():
+            tabela._posicao = _IdsOrdenados(nomes, self.secoes["ordem_nomes"])
+        else:
+            with _SemColetaDeLixo():
+                tabela._posicao = dict(zip(map(nomes.__getitem__, self.secoes["ip_nos"].tolist()),
+                                           range(len(self.secoes["ip_nos"]))))
+        tabela._ips = array("I", self.secoes["ips"].astype("=u4").tobytes())
+        return tabela
+
+    def grafo(self):
+        """GrafoRede com os mesmos nós, arestas e atributos (dicionários internos montados em bloco)."""
+        G = _classe_grafo_rede()()
+        G.graph.update(self.metadados["grafo"])
+        nomes = self.nomes[:self.num_nos]
+        tabela_no = self.metadados["atributos_no"]
+        tabela_aresta = self.metadados["atributos_aresta"]
+        pares = self.secoes["arestas"]
+        with _SemColetaDeLixo():
+            G._node.update(zip(nomes, (tabela_no[c].copy() for c in self.secoes["atributos_no"].tolist())))
+            adjacencia = G._adj
+            adjacencia.update((nome, {}) for nome in nomes)
+            for u, v, c in zip(map(nomes.__getitem__, pares[:, 0].tolist()), map(nomes.__getitem__, pares[:, 1].tolist()),
+                               self.secoes["atributos_aresta"].tolist()):
+                dados = tabela_aresta[c].copy()
+                adjacencia[u][v] = dados
+                adjacencia[v][u] = dados
+        return G
+
+    def nucleo(self):
+        """O grafo como GrafoCSR, lido direto dos arrays (sem networkx)."""
+        return GrafoCSR.de_snapshot(self)
+
+    def rede(self):
+        """A tupla (G, subredes, enderecos_ip, ..., especificacoes_rede), como construir_rede."""
+        with _SemColetaDeLixo():
+            return self._rede()
+
+    def _rede(self):
+        meta, nomes = self.metadados, self.nomes
+        G = self.nucleo()
+        hosts = list(map(nomes.__getitem__, self.secoes["hosts_subrede"].tolist()))
+        subredes, inicio = {}, 0
+        for nome, info in meta["subredes"].items():
+            info = dict(info)
+            quantidade = info.pop("num_hosts")
+            subredes[nome] = {"hosts": hosts[inicio:inicio + quantidade], **info}
+            inicio += quantidade
+        # "Enlaces" fica sobre as seções mapeadas (mesma ordem e a mesma tabela de atributos do grafo)
+        especificacoes_rede = dict(meta["especificacoes_rede"])
+        especificacoes_rede["Enlaces"] = _EnlacesCSR(G, self.secoes["enlaces"], self.secoes["atributos_enlace"])
+        enderecos_ip = self.enderecos()
+        if self._enderecos_dos_nos():
+            # Endereços na ordem dos nós: as posições da tabela são também o nome → id do grafo
+            G._ids = enderecos_ip._compartilhar_posicoes()
+        return (G, subredes, enderecos_ip, dict(meta["mascaras_subrede"]),
+                {r: list(s) for r, s in meta["subredes_por_roteador"].items()},
+                list(meta["roteadores"]), list(meta["switches_borda"]), especificacoes_rede)
+
+
+def carregar_snapshot(caminho):
+    """Lê um snapshot salvo por salvar_snapshot e devolve a tupla completa da rede."""
+    return Snapshot(caminho).rede()
+
+
+def _diferencas_rede(a, b):
+    """Partes que diferem entre duas tuplas de rede (lista vazia = iguais)."""
+    nomes = ("G", "subredes", "enderecos_ip", "mascaras_subrede", "subredes_por_roteador",
+             "roteadores", "switches_borda", "especificacoes_rede")
+    diferencas = []
+    for nome, x, y in zip(nomes, a, b):
+        if nome == "G":
+            iguais = (list(x.nodes(data=True)) == list(y.nodes(data=True)) and x.graph == y.graph and
+                      {frozenset((u, v)): d for u, v, d in x.edges(data=True)} ==
+                      {frozenset((u, v)): d for u, v, d in y.edges(data=True)})
+        elif nome == "enderecos_ip":
+            iguais = dict(x.items()) == dict(y.items())
+        else:
+            iguais = x == y
+        if not iguais:
+            diferencas.append(nome)
+    return diferencas
+
+
+def benchmark_snapshot(num_hosts=1_000_000, semente=0):
+    """Salva e recarrega uma rede grande, conferindo que a ida e volta preserva tudo."""
+    import tempfile
+    especificacao = gerar_especificacao(max(num_hosts // 20_000, 1), 20, 1000, semente)
+    inicio = time.perf_counter()
+    rede = construir_rede(especificacao)
+    print(f"Rede com {rede[0].number_of_nodes()} nós montada em {time.perf_counter() - inicio:.2f} s")
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "rede.snap")
+        inicio = time.perf_counter()
+        salvar_snapshot(rede, caminho)
+        print(f"  Salvar:                {time.perf_counter() - inicio:.2f} s ({os.path.getsize(caminho) / 1e6:.1f} MB)")
+        inicio = time.perf_counter()
+        snapshot = Snapshot(caminho)
+        print(f"  Abrir (mmap + nomes):  {time.perf_counter() - inicio:.2f} s")
+        inicio = time.perf_counter()
+        carregada = snapshot.rede()
+        print(f"  Tupla completa (G...): {time.perf_counter() - inicio:.2f} s")
+        hosts = [info["hosts"][0] for info in carregada[1].values() if info["hosts"]]
+        inicio = time.perf_counter()
+        ping_lote(carregada[0], [(hosts[0], hosts[-1])])
+        print(f"  Primeiro ping (índice de percursos incluído): {time.perf_counter() - inicio:.2f} s")
+        inicio = time.perf_counter()
+        traceroute_lote(carregada[0], [(hosts[-1], hosts[0])])
+        print(f"  Traceroute seguinte:   {(time.perf_counter() - inicio) * 1e3:.2f} ms")
+        diferencas = _diferencas_rede(rede, carregada)
+        print(f"  Ida e volta: {'OK' if not diferencas else 'DIFERENTE em ' + ', '.join(diferencas)}")
+        if diferencas:
+            raise AssertionError(f"Snapshot não preservou: {diferencas}")
+
+
+###############################################
+# NÚCLEO DO GRAFO (IDS INTEIROS, ADJACÊNCIA CSR)
+###############################################
+class GrafoCSR:
+    """
+    Grafo não dirigido imutável e compacto, o núcleo da topologia entregue por
+    construir_rede e pelos snapshots:
+      - cada nó tem um id inteiro denso (0..n-1); `nomes[id]` dá o nome e
+        `ids[nome]` o id (montado na primeira consulta por nome, ou o mesmo
+        mapeamento da tabela de endereços quando ela tem os nós na ordem dos ids);
+      - adjacência CSR: os vizinhos do nó i são indices[indptr[i]:indptr[i+1]],
+        em ordem crescente de id;
+      - atributos internados: cada nó guarda um código (uint16) em tabela_nos e
+        cada sentido de aresta um código em tabela_enlaces, em vez de um
+        dicionário por aresta (tipo de enlace, capacidade e MTU repetidos).
+    As consultas de leitura do networkx usadas pelo simulador (G.nodes,
+    G.edges, G[u], G._adj, degree, has_edge...) funcionam direto sobre os
+    arrays; os dicionários de atributos devolvidos são os das tabelas,
+    compartilhados: não os altere. Para os algoritmos do networkx ou para
+    alterar a rede (Rede), para_networkx() exporta um GrafoRede.
+    """
+
+    def __init__(self, nomes, codigos_no, tabela_nos, origens, destinos, codigos_aresta, tabela_enlaces,
+                 graph=None):
+        n = len(nomes)
+        origens = np.asarray(origens, dtype=np.int32)
+        destinos = np.asarray(destinos, dtype=np.int32)
+        codigos_aresta = np.asarray(codigos_aresta, dtype=np.uint16)
+        # Cada aresta entra nos dois sentidos; ordenar por (origem, destino) forma as linhas CSR
+        u = np.concatenate((origens, destinos))
+        v = np.concatenate((destinos, origens))
+        ordem = np.argsort(u.astype(np.int64) * max(n, 1) + v, kind="stable")
+        self.indices = v[ordem]
+        self.codigos_aresta = np.concatenate((codigos_aresta, codigos_aresta))[ordem]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=n), out=self.indptr[1:])
+        self.nomes = nomes
+        self.codigos_no = np.asarray(codigos_no, dtype=np.uint16)
+        self.tabela_nos = tabela_nos
+        self.tabela_enlaces = tabela_enlaces
+        self.graph = dict(graph or {})
+        self.indice_percursos = None
+        self._ids = None
+
+    @classmethod
+    def de_grafo(cls, G):
+        """Converte um grafo networkx (ou GrafoRede); atributos iguais viram um só código."""
+        if isinstance(G, GrafoCSR):
+            return G
+        with _SemColetaDeLixo():
+            nomes = list(G)
+            ids = dict(zip(nomes, range(len(nomes))))
+            tabela_nos, tabela_enlaces = [], []
+            codigos_no = _codificar_atributos([G._node[n] for n in nomes], tabela_nos, {})
+            origens, destinos, dados_arestas = _arestas_por_id(G, ids)
+            codigos_aresta = _codificar_atributos(dados_arestas, tabela_enlaces, {})
+        nucleo = cls(nomes, codigos_no, tabela_nos, np.frombuffer(origens, dtype=np.int32),
+                     np.frombuffer(destinos, dtype=np.int32), codigos_aresta, tabela_enlaces, G.graph)
+        nucleo._ids = ids
+        return nucleo
+
+    @classmethod
+    def de_snapshot(cls, snapshot):
+        """Monta o núcleo direto dos arrays de um Snapshot, sem passar pelo networkx."""
+        if not isinstance(snapshot, Snapshot):
+            snapshot = Snapshot(snapshot)
+        pares = snapshot.secoes["arestas"]
+        meta = snapshot.metadados
+        return cls(snapshot.nomes[:snapshot.num_nos], snapshot.secoes["atributos_no"], meta["atributos_no"],
+                   pares[:, 0], pares[:, 1], snapshot.secoes["atributos_aresta"], meta["atributos_aresta"],
+                   meta["grafo"])
+
+    def __getstate__(self):
+        # O dicionário nome → id e o índice de percursos não viajam no pickle: são refeitos sob demanda
+        return {**self.__dict__, "_ids": None, "indice_percursos": None}
+
+    # ---------- nomes ↔ ids ----------
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = dict(zip(self.nomes, range(len(self.nomes))))
+        return self._ids
+
+    def id(self, nome):
+        return self.ids[nome]
+
+    def __contains__(self, nome):
+        return nome in self.ids
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def __iter__(self):
+        return iter(self.nomes)
+
+    @property
+    def num_arestas(self):
+        return len(self.indices) // 2
+
+    # ---------- consultas ----------
+    def vizinhos_ids(self, i):
+        """Ids dos vizinhos do nó i (visão sobre o array CSR, sem cópia)."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def vizinhos(self, nome):
+        nomes = self.nomes
+        return [nomes[j] for j in self.vizinhos_ids(self.ids[nome]).tolist()]
+
+    def graus(self):
+        return np.diff(self.indptr)
+
+    def atributos_no(self, nome):
+        """Atributos do nó (dicionário compartilhado da tabela: não altere)."""
+        return self.tabela_nos[self.codigos_no[self.ids[nome]]]
+
+    def _posicao_aresta(self, iu, iv):
+        """Posição da aresta iu → iv nos arrays CSR (-1 se não existir)."""
+        inicio, fim = self.indptr[iu], self.indptr[iu + 1]
+        k = inicio + int(np.searchsorted(self.indices[inicio:fim], iv))
+        return k if k < fim and self.indices[k] == iv else -1
+
+    def enlace(self, u, v):
+        """Atributos do enlace u–v (dicionário compartilhado da tabela), ou None."""
+        k = self._posicao_aresta(self.ids[u], self.ids[v])
+        return self.tabela_enlaces[self.codigos_aresta[k]] if k >= 0 else None
+
+    def _arestas_ids(self):
+        """(origens, destinos, códigos) de cada aresta uma vez, saindo pelo extremo de menor id."""
+        origens = np.repeat(np.arange(len(self.nomes), dtype=np.int32), np.diff(self.indptr))
+        uma_vez = origens < self.indices
+        return origens[uma_vez], self.indices[uma_vez], self.codigos_aresta[uma_vez]
+
+    def arestas(self):
+        """Itera sobre (u, v, atributos), uma vez por aresta."""
+        origens, destinos, codigos = self._arestas_ids()
+        nomes, tabela = self.nomes, self.tabela_enlaces
+        for u, v, c in zip(origens.tolist(), destinos.tolist(), codigos.tolist()):
+            yield nomes[u], nomes[v], tabela[c]
+
+    def enlaces(self):
+        """Lista "Enlaces" de especificacoes_rede derivada das arestas (montada sob demanda)."""
+        return _EnlacesCSR(self)
+
+    def subgrafo(self, nos):
+        """GrafoCSR induzido pelos nós dados (na ordem de id), sem passar pelo networkx."""
+        ids = self.ids
+        manter = np.zeros(len(self.nomes), dtype=bool)
+        manter[[ids[no] for no in nos]] = True
+        novo_id = np.cumsum(manter) - 1
+        origens, destinos, codigos = self._arestas_ids()
+        ficam = manter[origens] & manter[destinos]
+        nomes = [nome for nome, fica in zip(self.nomes, manter.tolist()) if fica]
+        return GrafoCSR(nomes, self.codigos_no[manter], self.tabela_nos, novo_id[origens[ficam]],
+                        novo_id[destinos[ficam]], codigos[ficam], self.tabela_enlaces, self.graph)
+
+    # ---------- interface de leitura do networkx ----------
+    @property
+    def nodes(self):
+        return _VisaoNos(self)
+
+    _node = nodes
+
+    @property
+    def edges(self):
+        return _VisaoArestas(self)
+
+    @property
+    def adj(self):
+        return _VisaoAdjacencia(self)
+
+    _adj = adj
+
+    def __getitem__(self, nome):
+        return _VizinhosCSR(self, self.ids[nome])
+
+    def number_of_nodes(self):
+        return len(self.nomes)
+
+    def number_of_edges(self):
+        return self.num_arestas
+
+    def has_node(self, nome):
+        return nome in self.ids
+
+    def has_edge(self, u, v):
+        ids = self.ids
+        return u in ids and v in ids and self._posicao_aresta(ids[u], ids[v]) >= 0
+
+    def neighbors(self, nome):
+        return iter(self.vizinhos(nome))
+
+    def degree(self, nome=None):
+        """Grau do nó, ou pares (nó, grau) de todos os nós."""
+        if nome is not None:
+            i = self.ids[nome]
+            return int(self.indptr[i + 1] - self.indptr[i])
+        return zip(self.nomes, self.graus().tolist())
+
+    def memoria(self):
+        """Bytes ocupados: arrays, lista de nomes (com as strings) e dicionário nome → id, se montado."""
+        total = sum(a.nbytes for a in (self.indices, self.codigos_aresta, self.indptr, self.codigos_no))
+        total += sys.getsizeof(self.nomes) + sum(map(sys.getsizeof, self.nomes))
+        if self._ids is not None:
+            total += sys.getsizeof(self._ids)
+        return total
+
+    # ---------- exportação ----------
+    def para_networkx(self):
+        """GrafoRede equivalente (cada aresta com a sua cópia dos atributos, como no networkx)."""
+        G = _classe_grafo_rede()()
+        G.graph.update(self.graph)
+        nomes, tabela_nos = self.nomes, self.tabela_nos
+        with _SemColetaDeLixo():
+            G._node.update(zip(nomes, (tabela_nos[c].copy() for c in self.codigos_no.tolist())))
+            adjacencia = G._adj
+            adjacencia.update((nome, {}) for nome in nomes)
+            for u, v, atributos in self.arestas():
+                dados = atributos.copy()
+                adjacencia[u][v] = dados
+                adjacencia[v][u] = dados
+        return G
+
+
+class _VisaoNos(Mapping):
+    """G.nodes de um GrafoCSR: G.nodes[n] (atributos), n in G.nodes e G.nodes(data=...), como no networkx."""
+
+    def __init__(self, grafo):
+        self._grafo = grafo
+
+    def __getitem__(self, nome):
+        return self._grafo.atributos_no(nome)
+
+    def __iter__(self):
+        return iter(self._grafo.nomes)
+
+    def __len__(self):
+        return len(self._grafo.nomes)
+
+    def __contains__(self, nome):
+        return nome in self._grafo.ids
+
+    def __call__(self, data=False, default=None):
+        return self if data is False else _VisaoDadosNos(self._grafo, data, default)
+
+
+class _VisaoDadosNos:
+    """G.nodes(data=True ou nome do atributo): pares (nó, valor) e consulta dados[n]."""
+
+    def __init__(self, grafo, data, default):
+        self._grafo, self._data, self._default = grafo, data, default
+
+    def _valor(self, atributos):
+        return atributos if self._data is True else atributos.get(self._data, self._default)
+
+    def __iter__(self):
+        valores = [self._valor(atributos) for atributos in self._grafo.tabela_nos]
+        return zip(self._grafo.nomes, map(valores.__getitem__, self._grafo.codigos_no.tolist()))
+
+    def __len__(self):
+        return len(self._grafo.nomes)
+
+    def __contains__(self, nome):
+        return nome in self._grafo.ids
+
+    def __getitem__(self, nome):
+        return self._valor(self._grafo.atributos_no(nome))
+
+
+class _VisaoArestas:
+    """G.edges de um GrafoCSR: iteração (com data=...), len e G.edges[u, v] (atributos)."""
+
+    def __init__(self, grafo, data=False, default=None):
+        self._grafo, self._data, self._default = grafo, data, default
+
+    def __call__(self, data=False, default=None):
+        return _VisaoArestas(self._grafo, data, default)
+
+    def __iter__(self):
+        grafo, data = self._grafo, self._data
+        origens, destinos = grafo._arestas_ids()[:2]
+        pontas = (map(grafo.nomes.__getitem__, origens.tolist()), map(grafo.nomes.__getitem__, destinos.tolist()))
+        if data is False:
+            return zip(*pontas)
+        valores = [atributos if data is True else atributos.get(data, self._default)
+                   for atributos in grafo.tabela_enlaces]
+        return zip(*pontas, map(valores.__getitem__, grafo._arestas_ids()[2].tolist()))
+
+    def __len__(self):
+        return self._grafo.num_arestas
+
+    def __contains__(self, aresta):
+        return self._grafo.has_edge(*aresta)
+
+    def __getitem__(self, aresta):
+        atributos = self._grafo.enlace(*aresta)
+        if atributos is None:
+            raise KeyError(f"A aresta {aresta[0]}-{aresta[1]} não está no grafo.")
+        return atributos
+
+
+class _VisaoAdjacencia(Mapping):
+    """G._adj de um GrafoCSR: nó → vizinhos (_VizinhosCSR)."""
+
+    def __init__(self, grafo):
+        self._grafo = grafo
+
+    def __getitem__(self, nome):
+        return self._grafo[nome]
+
+    def __iter__(self):
+        return iter(self._grafo.nomes)
+
+    def __len__(self):
+        return len(self._grafo.nomes)
+
+    def __contains__(self, nome):
+        return nome in self._grafo.ids
+
+
+class _VizinhosCSR(Mapping):
+    """G[u] de um GrafoCSR: vizinho → atributos do enlace, sobre a linha u do CSR."""
+
+    def __init__(self, grafo, i):
+        self._grafo, self._i = grafo, i
+
+    def __getitem__(self, nome):
+        grafo = self._grafo
+        j = grafo.ids.get(nome)
+        k = -1 if j is None else grafo._posicao_aresta(self._i, j)
+        if k < 0:
+            raise KeyError(nome)
+        return grafo.tabela_enlaces[grafo.codigos_aresta[k]]
+
+    def __iter__(self):
+        return map(self._grafo.nomes.__getitem__, self._grafo.vizinhos_ids(self._i).tolist())
+
+    def __len__(self):
+        return int(self._grafo.indptr[self._i + 1] - self._grafo.indptr[self._i])
+
+    def items(self):
+        grafo = self._grafo
+        inicio, fim = grafo.indptr[self._i], grafo.indptr[self._i + 1]
+        return zip(map(grafo.nomes.__getitem__, grafo.indices[inicio:fim].tolist()),
+                   map(grafo.tabela_enlaces.__getitem__, grafo.codigos_aresta[inicio:fim].tolist()))
+
+
+class _EnlacesCSR(Sequence):
+    """
+    Lista "Enlaces" (u, v, atributos) de um GrafoCSR, montada a partir de arrays
+    de pares de ids e códigos de atributo: os do snapshot (mapeados) ou, sem
+    eles, as arestas do próprio núcleo, calculadas no primeiro acesso.
+    """
+
+    def __init__(self, grafo, pares=None, codigos=None):
+        self.grafo = grafo
+        self._pares, self._codigos = pares, codigos
+
+    def _arrays(self):
+        if self._pares is None:
+            origens, destinos, self._codigos = self.grafo._arestas_ids()
+            self._pares = np.column_stack((origens, destinos))
+        return self._pares, self._codigos
+
+    def __len__(self):
+        return self.grafo.num_arestas if self._pares is None else len(self._pares)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        pares, codigos = self._arrays()
+        u, v = pares[i].tolist()
+        return self.grafo.nomes[u], self.grafo.nomes[v], self.grafo.tabela_enlaces[codigos[i]]
+
+    def __iter__(self):
+        pares, codigos = self._arrays()
+        nomes = self.grafo.nomes
+        return zip(map(nomes.__getitem__, pares[:, 0].tolist()), map(nomes.__getitem__, pares[:, 1].tolist()),
+                   map(self.grafo.tabela_enlaces.__getitem__, codigos.tolist()))
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Sequence) or isinstance(outro, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(outro) and all(a == b for a, b in zip(self, outro))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<Enlaces: {len(self)} enlaces do GrafoCSR>"
+
+
+def benchmark_nucleo(num_hosts=200_000, semente=0):
+    """
+    Bytes por host da topologia, medidos com tracemalloc: antes, grafo networkx
+    + lista "Enlaces" com uma tupla por enlace; agora, o GrafoCSR que
+    construir_rede entrega (com e sem o dicionário nome → id). Confere também
+    a exportação para o networkx.
+    """
+    import gc
+    import tracemalloc
+
+    pequena = construir_rede(gerar_especificacao(4, 3, 5, semente))[0]
+    exportado = pequena.para_networkx()
+    if dict(exportado.nodes(data=True)) != dict(pequena.nodes(data=True)) or \
+            {frozenset((u, v)): d for u, v, d in exportado.edges(data=True)} != \
+            {frozenset((u, v)): d for u, v, d in pequena.edges(data=True)}:
+        raise AssertionError("GrafoCSR.para_networkx não reproduz o grafo original.")
+
+    especificacao = gerar_especificacao(max(num_hosts // 20_000, 1), 20, 1000, semente)
+    inicio = time.perf_counter()
+    construir_rede(especificacao)
+    t_construcao = time.perf_counter() - inicio
+    gc.collect()
+    tracemalloc.start()
+    rede = construir_rede(especificacao)
+    G = rede[0]
+    hosts = sum(info["capacidade"] for info in rede[1].values())
+    # O dicionário nome → id veio compartilhado com a tabela de endereços: solto
+    # junto com ela, para medir o núcleo sem ele e depois com ele
+    G._ids = None
+    del rede
+    gc.collect()
+    nucleo = tracemalloc.get_traced_memory()[0]
+    contagem = G.memoria()
+    G.ids
+    gc.collect()
+    com_ids = tracemalloc.get_traced_memory()[0]
+    grafo_nx = G.para_networkx()
+    enlaces = list(G.enlaces())
+    gc.collect()
+    # O networkx reaproveita as strings dos nomes, que ele também teria de guardar
+    legado = tracemalloc.get_traced_memory()[0] - com_ids + sum(map(sys.getsizeof, G.nomes))
+    tracemalloc.stop()
+
+    print(f"Rede com {hosts} hosts, {len(G)} nós e {G.num_arestas} arestas (construir_rede: {t_construcao:.2f} s):")
+    print(f"  Antes: networkx + \"Enlaces\":  {legado / hosts:8.1f} bytes/host")
+    print(f"  Agora: GrafoCSR:              {nucleo / hosts:8.1f} bytes/host "
+          f"({contagem / hosts:.1f} pela contagem de memoria())")
+    print(f"         + dicionário nome → id: {com_ids / hosts:7.1f} bytes/host")
+    inicio = time.perf_counter()
+    G.para_networkx()
+    print(f"  Exportação para networkx: {time.perf_counter() - inicio:.2f} s")
+    del grafo_nx, enlaces
+
+
+###############################################
+# TABELAS DE ROTEAMENTO (FIB) – LONGEST PREFIX MATCH
+###############################################
+ENTREGA_LOCAL = "<entrega local>"  # próximo salto: destino no mesmo segmento (L2)
+
+
+class TabelaRoteamento:
+    """
+    FIB com busca pelo prefixo mais longo, armazenada em uma trie binária
+    compactada (Patricia). Os nós ficam em arrays paralelos (chave, comprimento,
+    filhos, índice do próximo salto), o que permite a consulta em lote com NumPy.
+    Cada consulta percorre no máximo um nó por bit do prefixo: O(comprimento).
+    """
+
+    def __init__(self, rotas=()):
+        self._chave = array("I", [0])
+        self._comp = array("B", [0])
+        self._filho0 = array("i", [-1])
+        self._filho1 = array("i", [-1])
+        self._valor = array("i", [-1])  # índice em self.proximos_saltos (-1 = sem rota)
+        self.proximos_saltos = []
+        self._indice_salto = {}
+        self._livres = []
+        self._arrays_lote = None
+        self.num_rotas = 0
+        for prefixo, comprimento, proximo in rotas:
+            self.inserir(prefixo, comprimento, proximo)
+
+    def _novo_no(self, chave, comp, valor):
+        if self._livres:
+            no = self._livres.pop()
+            self._chave[no], self._comp[no], self._valor[no] = chave, comp, valor
+            self._filho0[no] = self._filho1[no] = -1
+            return no
+        self._chave.append(chave)
+        self._comp.append(comp)
+        self._filho0.append(-1)
+        self._filho1.append(-1)
+        self._valor.append(valor)
+        return len(self._chave) - 1
+
+    def _filhos(self, bit):
+        return self._filho1 if bit else self._filho0
+
+    def _id_salto(self, proximo):
+        if proximo not in self._indice_salto:
+            self._indice_salto[proximo] = len(self.proximos_saltos)
+            self.proximos_saltos.append(proximo)
+        return self._indice_salto[proximo]
+
+    def inserir(self, prefixo, comprimento, proximo):
+        """Insere (ou substitui) a rota prefixo/comprimento → proximo."""
+        if isinstance(prefixo, str):
+            prefixo = ip_para_int(prefixo)
+        prefixo &= prefixo_para_mascara(comprimento)
+        valor = self._id_salto(proximo)
+        self._arrays_lote = None
+        no = 0
+        while True:
+            if self._comp[no] == comprimento:
+                if self._valor[no] < 0:
+                    self.num_rotas += 1
+                self._valor[no] = valor
+                return
+            bit = (prefixo >> (31 - self._comp[no])) & 1
+            filhos = self._filhos(bit)
+            filho = filhos[no]
+            if filho < 0:
+                filhos[no] = self._novo_no(prefixo, comprimento, valor)
+                self.num_rotas += 1
+                return
+            comp_filho = self._comp[filho]
+            limite = min(comp_filho, comprimento)
+            diferenca = self._chave[filho] ^ prefixo
+            comum = min(32 - diferenca.bit_length(), limite)
+            if comum == comp_filho:
+                no = filho
+                continue
+            # O novo prefixo diverge (ou termina) no meio da aresta: divide a aresta
+            if comum == comprimento:
+                novo = self._novo_no(prefixo, comprimento, valor)
+            else:
+                novo = self._novo_no(prefixo & prefixo_para_mascara(comum), comum, -1)
+                folha = self._novo_no(prefixo, comprimento, valor)
+                self._filhos((prefixo >> (31 - comum)) & 1)[novo] = folha
+            self._filhos((self._chave[filho] >> (31 - self._comp[novo])) & 1)[novo] = filho
+            filhos[no] = novo
+            self.num_rotas += 1
+            return
+
+    def remover(self, prefixo, comprimento):
+        """Remove a rota prefixo/comprimento; retorna False se ela não existia."""
+        if isinstance(prefixo, str):
+            prefixo = ip_para_int(prefixo)
+        prefixo &= prefixo_para_mascara(comprimento)
+        pai, no = -1, 0
+        while self._comp[no] < comprimento:
+            filho = self._filhos((prefixo >> (31 - self._comp[no])) & 1)[no]
+            if filho < 0 or self._comp[filho] > comprimento or \
+                    (self._chave[filho] ^ prefixo) >> (32 - self._comp[filho]):
+                return False
+            pai, no = no, filho
+        if self._comp[no] != comprimento or self._valor[no] < 0:
+            return False
+        self._valor[no] = -1
+        self._arrays_lote = None
+        self.num_rotas -= 1
+        # Poda: nó sem rota e sem filhos sai da árvore; com um só filho, é contraído
+        if no != 0:
+            f0, f1 = self._filho0[no], self._filho1[no]
+            if f0 < 0 or f1 < 0:
+                filhos_pai = self._filho0 if self._filho0[pai] == no else self._filho1
+                filhos_pai[pai] = f0 if f0 >= 0 else f1
+                self._livres.append(no)
+        return True
+
+    def consultar(self, endereco):
+        """Próximo salto para o endereço (str ou inteiro), ou None se não houver rota."""
+        if isinstance(endereco, str):
+            endereco = ip_para_int(endereco)
+        chave, comp, filho0, filho1, valor = self._chave, self._comp, self._filho0, self._filho1, self._valor
+        no = 0
+        melhor = valor[0]
+        while comp[no] < 32:
+            filho = (filho1 if (endereco >> (31 - comp[no])) & 1 else filho0)[no]
+            if filho < 0 or (endereco ^ chave[filho]) >> (32 - comp[filho]):
+                break
+            no = filho
+            if valor[no] >= 0:
+                melhor = valor[no]
+        return self.proximos_saltos[melhor] if melhor >= 0 else None
+
+    def consultar_lote(self, enderecos, como_indices=False):
+        """
+        Consulta vários endereços de uma vez. A descida na trie é feita nível a
+        nível para todos os endereços ao mesmo tempo (no máximo 32 passos NumPy).
+        Retorna a lista de próximos saltos ou, com como_indices=True, um array
+        de índices em self.proximos_saltos (-1 = sem rota).
+        """
+        enderecos = np.asarray(enderecos, dtype=np.uint32).astype(np.int64)
+        if self._arrays_lote is None:
+            # Cópias NumPy dos arrays da trie, refeitas só depois de inserções/remoções
+            self._arrays_lote = (np.array(self._chave, dtype=np.int64), np.array(self._comp, dtype=np.int64),
+                                 np.array(self._filho0, dtype=np.int32), np.array(self._filho1, dtype=np.int32),
+                                 np.array(self._valor, dtype=np.int32))
+        chave, comp, filho0, filho1, valor = self._arrays_lote
+
+        melhor = np.full(len(enderecos), valor[0], dtype=np.int32)
+        no = np.zeros(len(enderecos), dtype=np.int32)
+        ativos = np.arange(len(enderecos))
+        while len(ativos):
+            atual = no[ativos]
+            end = enderecos[ativos]
+            ativos, atual, end = ativos[comp[atual] < 32], atual[comp[atual] < 32], end[comp[atual] < 32]
+            bit = (end >> (31 - comp[atual])) & 1
+            filho = np.where(bit == 1, filho1[atual], filho0[atual])
+            ok = filho >= 0
+            ativos, filho, end = ativos[ok], filho[ok], end[ok]
+            ok = ((end ^ chave[filho]) >> (32 - comp[filho])) == 0
+            ativos, filho = ativos[ok], filho[ok]
+            no[ativos] = filho
+            com_rota = valor[filho] >= 0
+            melhor[ativos[com_rota]] = valor[filho[com_rota]]
+        if como_indices:
+            return melhor
+        saltos = self.proximos_saltos
+        return [saltos[i] if i >= 0 else None for i in melhor.tolist()]
+
+    def rotas(self):
+        """Itera sobre (prefixo, comprimento, próximo salto) em ordem de prefixo."""
+        pilha = [0]
+        while pilha:
+            no = pilha.pop()
+            if self._valor[no] >= 0:
+                yield self._chave[no], self._comp[no], self.proximos_saltos[self._valor[no]]
+            for filho in (self._filho1[no], self._filho0[no]):
+                if filho >= 0:
+                    pilha.append(filho)
+
+    def __len__(self):
+        return self.num_rotas
+
+    def __repr__(self):
+        return f"TabelaRoteamento({self.num_rotas} rotas)"
+
+
+def construir_fibs(subredes, enderecos_ip, roteadores):
+    """
+    Monta as FIBs a partir das subredes alocadas:
+      - Roteador aN: cada subrede própria → Switch de borda; 0.0.0.0/0 → Switch Central.
+      - Switch Central: cada subrede → roteador responsável; /32 de cada roteador → roteador.
+      - Switch de borda: a própria subrede → entrega local; 0.0.0.0/0 → roteador.
+      - Hosts: 0.0.0.0/0 → switch da subrede (uma tabela compartilhada por subrede).
+    Retorna {dispositivo: TabelaRoteamento}.
+    """
+    fibs = {}
+    central = TabelaRoteamento()
+    central.inserir(enderecos_ip.inteiro("Switch Central"), 32, ENTREGA_LOCAL)
+    for roteador in roteadores:
+        central.inserir(enderecos_ip.inteiro(roteador), 32, roteador)
+        fib = TabelaRoteamento([(0, 0, "Switch Central")])
+        fib.inserir(enderecos_ip.inteiro(roteador), 32, ENTREGA_LOCAL)
+        fibs[roteador] = fib
+    for subrede, info in subredes.items():
+        switch_borda = f"Switch {subrede}"
+        central.inserir(info["rede"], info["prefixo"], info["roteador"])
+        fibs[info["roteador"]].inserir(info["rede"], info["prefixo"], switch_borda)
+        fibs[switch_borda] = TabelaRoteamento([(0, 0, info["roteador"]),
+                                               (info["rede"], info["prefixo"], ENTREGA_LOCAL)])
+        fib_hosts = TabelaRoteamento([(0, 0, switch_borda)])
+        fibs.update(dict.fromkeys(info["hosts"], fib_hosts))
+    fibs["Switch Central"] = central
+    return fibs
+
+
+def encaminhar(fibs, enderecos_ip, origem, destino, max_saltos=64):
+    """
+    Caminho de origem até destino decidido salto a salto por consultas LPM às
+    FIBs, usando apenas o endereço IP do destino. Retorna None se não houver rota.
+    """
+    destino_ip = enderecos_ip.inteiro(destino)
+    caminho = [origem]
+    no = origem
+    for _ in range(max_saltos):
+        if no == destino:
+            return caminho
+        fib = fibs.get(no)
+        proximo = fib.consultar(destino_ip) if fib is not None else None
+        if proximo == ENTREGA_LOCAL:
+            proximo = enderecos_ip.nome_por_ip(destino_ip)
+        if proximo is None:
+            return None
+        caminho.append(proximo)
+        no = proximo
+    return None
+
+
+def benchmark_fib(tamanhos=(10**5, 10**6), consultas=10**5, semente=0):
+    """
+    Mede inserções e consultas por segundo em FIBs com 10^5 a 10^6 rotas
+    aleatórias (prefixos /8 a /30), consulta a consulta e em lote.
+    """
+    rng = random.Random(semente)
+    for tamanho in tamanhos:
+        rotas = []
+        for _ in range(tamanho):
+            comprimento = rng.randint(8, 30)
+            rotas.append((rng.getrandbits(32) & prefixo_para_mascara(comprimento), comprimento, rng.randrange(64)))
+        inicio = time.perf_counter()
+        fib = TabelaRoteamento(rotas)
+        t_insercao = time.perf_counter() - inicio
+
+        enderecos = [rng.getrandbits(32) for _ in range(consultas)]
+        inicio = time.perf_counter()
+        for endereco in enderecos:
+            fib.consultar(endereco)
+        t_unitaria = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        fib.consultar_lote(enderecos, como_indices=True)
+        t_lote = time.perf_counter() - inicio
+
+        print(f"FIB com {tamanho} rotas ({len(fib)} distintas, {len(fib._chave)} nós):")
+        print(f"  Inserção: {tamanho / t_insercao:,.0f} rotas/s")
+        print(f"  Consulta unitária: {consultas / t_unitaria:,.0f} consultas/s")
+        print(f"  Consulta em lote: {consultas / t_lote:,.0f} consultas/s")
+
+
+###############################################
+# ÍNDICE DE PERCURSOS (LCA) PARA PING E TRACEROUTE
+###############################################
+def _classe_grafo_rede():
+    """
+    Cria (uma única vez) a classe GrafoRede, que herda de nx.Graph; fica dentro
+    de uma função para que o networkx só seja importado quando for usado.
+    """
+    global GrafoRede
+    if "GrafoRede" in globals():
+        return GrafoRede
+
+    class GrafoRede(nx.Graph):
+        """
+        nx.Graph que avisa os índices derivados (observadores) sobre cada alteração
+        estrutural, para que eles se corrijam ou se invalidem sozinhos.
+        """
+
+        def __init__(self, incoming_graph_data=None, **attr):
+            self.observadores = weakref.WeakSet()
+            self.indice_percursos = None
+            super().__init__(incoming_graph_data, **attr)
+
+        def _notificar(self, operacao, *args):
+            for observador in list(self.observadores):
+                observador.notificar(operacao, *args)
+
+        def add_node(self, node_for_adding, **attr):
+            novo = node_for_adding not in self._node
+            super().add_node(node_for_adding, **attr)
+            if novo and self.observadores:
+                self._notificar("add_node", node_for_adding)
+
+        def add_nodes_from(self, nodes_for_adding, **attr):
+            if not self.observadores:
+                return super().add_nodes_from(nodes_for_adding, **attr)
+            nodes_for_adding = list(nodes_for_adding)
+            super().add_nodes_from(nodes_for_adding, **attr)
+            for n in nodes_for_adding:
+                self._notificar("add_node", n if n in self._node else n[0])
+
+        def add_edge(self, u_of_edge, v_of_edge, **attr):
+            super().add_edge(u_of_edge, v_of_edge, **attr)
+            if self.observadores:
+                self._notificar("add_edge", u_of_edge, v_of_edge)
+
+        def add_edges_from(self, ebunch_to_add, **attr):
+            if not self.observadores:
+                return super().add_edges_from(ebunch_to_add, **attr)
+            ebunch_to_add = list(ebunch_to_add)
+            super().add_edges_from(ebunch_to_add, **attr)
+            for e in ebunch_to_add:
+                self._notificar("add_edge", e[0], e[1])
+
+        def remove_node(self, n):
+            super().remove_node(n)
+            if self.observadores:
+                self._notificar("remove_node", n)
+
+        def remove_nodes_from(self, nodes):
+            if not self.observadores:
+                return super().remove_nodes_from(nodes)
+            for n in list(nodes):
+                if n in self._node:
+                    self.remove_node(n)
+
+        def remove_edge(self, u, v):
+            super().remove_edge(u, v)
+            if self.observadores:
+                self._notificar("remove_edge", u, v)
+
+        def remove_edges_from(self, ebunch):
+            if not self.observadores:
+                return super().remove_edges_from(ebunch)
+            for e in list(ebunch):
+                if self.has_edge(e[0], e[1]):
+                    self.remove_edge(e[0], e[1])
+
+        def clear(self):
+            super().clear()
+            self._notificar("clear")
+
+        def clear_edges(self):
+            super().clear_edges()
+            self._notificar("clear")
+
+    GrafoRede.__qualname__ = "GrafoRede"  # pickle encontra a classe no nível do módulo
+    return GrafoRede
+
+
+def __getattr__(nome):
+    # Acesso externo a projeto.GrafoRede antes de qualquer rede ser montada
+    if nome == "GrafoRede":
+        return _classe_grafo_rede()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+class IndicePercursos:
+    """
+    Índice de caminhos para topologias em árvore (Switch Central → roteador →
+    switch de borda → host), montado uma única vez em O(n):
+      - ponteiros para o pai, profundidade e componente de cada nó;
+      - menor ancestral comum (LCA) por passeio de Euler + sparse table sobre
+        blocos (mínimos de prefixo/sufixo dentro de cada bloco), com consulta O(1).
+    alcancavel() é O(1) e caminho() é O(comprimento do caminho).
+
+    Se o grafo for um GrafoRede, o índice se registra como observador: inserções
+    e remoções de folhas (hosts) são corrigidas na hora; qualquer outra alteração
+    invalida o índice, que é remontado na próxima consulta. Sobre um GrafoCSR
+    (imutável) o índice usa os mesmos ids do núcleo e percorre os arrays CSR.
+    Se o grafo tiver ciclos, as consultas recorrem ao networkx.
+    """
+
+    BLOCO = 16
+
+    def __init__(self, G):
+        self.G = G
+        self._valido = False
+        if "GrafoRede" in globals() and isinstance(G, GrafoRede):
+            G.observadores.add(self)
+        self._construir()
+
+    # ---------- construção ----------
+    def _construir(self):
+        G = self.G
+        if isinstance(G, GrafoCSR):
+            nomes, ids = G.nomes, G.ids
+            pai, prof, comp, num_filhos, euler, num_comp, arvore = self._percorrer_csr(G, ids)
+        else:
+            nomes = list(G.nodes)
+            ids = {nome: i for i, nome in enumerate(nomes)}
+            pai, prof, comp, num_filhos, euler, num_comp, arvore = self._percorrer(G, nomes, ids)
+
+        self.nomes, self.ids = nomes, ids
+        self.pai, self.prof, self.comp, self.num_filhos = pai, prof, comp, num_filhos
+        self.num_componentes = num_comp
+        self.arvore = arvore
+        self._corrigidos = {}   # nome → [pai, profundidade, componente, nº de filhos] de nós inseridos depois
+        self._removidos = set()
+        self._acumulados = {}
+        self._networkx = None
+        self._montar_rmq(euler)
+        self._valido = True
+
+    @staticmethod
+    def _percorrer(G, nomes, ids):
+        """DFS nó a nó (grafo do networkx): pai, profundidade, componente e passeio de Euler."""
+        adj = G._adj
+
+        def vizinhos(i):
+            return map(ids.__getitem__, adj[nomes[i]])
+        n = len(nomes)
+        pai = array("i", [-1]) * n
+        prof = array("i", [0]) * n
+        comp = array("i", [-1]) * n
+        num_filhos = array("i", [0]) * n
+        euler = array("i")
+        arvore = True
+
+        raizes = (["Switch Central"] if "Switch Central" in ids else []) + nomes
+        num_comp = 0
+        for raiz in raizes:
+            r = ids[raiz]
+            if comp[r] >= 0:
+                continue
+            comp[r] = num_comp
+            euler.append(r)
+            pilha = [(r, vizinhos(r))]
+            while pilha:
+                no, pendentes = pilha[-1]
+                for v in pendentes:
+                    if v == pai[no]:
+                        continue
+                    if comp[v] >= 0:
+                        arvore = False  # aresta de retorno: o grafo tem ciclo
+                        continue
+                    pai[v] = no
+                    prof[v] = prof[no] + 1
+                    comp[v] = num_comp
+                    num_filhos[no] += 1
+                    euler.append(v)
+                    pilha.append((v, vizinhos(v)))
+                    break
+                else:
+                    pilha.pop()
+                    if pilha:
+                        euler.append(pilha[-1][0])
+            num_comp += 1
+        return pai, prof, comp, num_filhos, euler, num_comp, arvore
+
+    @staticmethod
+    def _percorrer_csr(G, ids):
+        """
+        O mesmo percurso de _percorrer direto sobre os arrays do GrafoCSR, um
+        nível de BFS por vez. O passeio de Euler sai dos tamanhos das subárvores:
+        o nó v aparece primeiro na posição p(v) = p(pai) + 1 + 2·(tamanhos dos
+        irmãos de id menor), e o pai reaparece logo após a subárvore de v.
+        """
+        n = len(G.nomes)
+        indptr, indices = G.indptr.astype(np.int64), G.indices
+        graus = np.diff(indptr)
+        pai = np.full(n, -1, dtype=np.int32)
+        prof = np.zeros(n, dtype=np.int32)
+        comp = np.full(n, -1, dtype=np.int32)
+        raizes, niveis = [], []
+        raiz = ids.get("Switch Central", 0)
+        num_comp = 0
+        while n:
+            comp[raiz] = num_comp
+            raizes.append(raiz)
+            fronteira, profundidade = np.array([raiz], dtype=np.int64), 0
+            while len(fronteira):
+                niveis.append(fronteira)
+                contagem = graus[fronteira]
+                total = int(contagem.sum())
+                origem = np.repeat(fronteira, contagem)
+                inicio = np.repeat(indptr[fronteira] - (np.cumsum(contagem) - contagem), contagem)
+                vizinhos = indices[inicio + np.arange(total)].astype(np.int64)
+                novos = comp[vizinhos] < 0
+                # Com ciclos, um nó pode ser alcançado por dois pais no mesmo nível: fica o primeiro
+                fronteira, primeiro = np.unique(vizinhos[novos], return_index=True)
+                profundidade += 1
+                pai[fronteira] = origem[novos][primeiro]
+                prof[fronteira] = profundidade
+                comp[fronteira] = num_comp
+            num_comp += 1
+            restantes = np.flatnonzero(comp < 0)
+            if not len(restantes):
+                break
+            raiz = int(restantes[0])
+
+        # Tamanho das subárvores, das folhas para as raízes
+        tamanho = np.ones(n, dtype=np.int64)
+        for nivel in reversed(niveis):
+            if pai[nivel[0]] >= 0:
+                np.add.at(tamanho, pai[nivel], tamanho[nivel])
+        filhos = np.flatnonzero(pai >= 0)
+        num_filhos = np.bincount(pai[filhos], minlength=n).astype(np.int32)
+        # Deslocamento de cada filho dentro do passeio do pai (irmãos em ordem de id, como no CSR)
+        ordem = filhos[np.argsort(pai[filhos], kind="stable")]
+        largura = 2 * tamanho[ordem]
+        acumulado = np.cumsum(largura) - largura
+        novo_grupo = np.flatnonzero(np.r_[True, pai[ordem][1:] != pai[ordem][:-1]]) if len(ordem) else ordem
+        deslocamento = np.zeros(n, dtype=np.int64)
+        deslocamento[ordem] = acumulado - np.repeat(acumulado[novo_grupo], np.diff(np.r_[novo_grupo, len(ordem)]))
+
+        primeira = np.zeros(n, dtype=np.int64)
+        raizes = np.array(raizes, dtype=np.int64)
+        passeio_raiz = 2 * tamanho[raizes] - 1
+        primeira[raizes] = np.cumsum(passeio_raiz) - passeio_raiz
+        for nivel in niveis:
+            if pai[nivel[0]] >= 0:
+                primeira[nivel] = primeira[pai[nivel]] + 1 + deslocamento[nivel]
+        euler = np.empty(2 * n - num_comp, dtype=np.int32)
+        euler[primeira] = np.arange(n, dtype=np.int32)
+        euler[primeira[filhos] + 2 * tamanho[filhos] - 1] = pai[filhos]
+
+        arvore = G.number_of_edges() == n - num_comp
+        return (array("i", pai.tobytes()), array("i", prof.tobytes()), array("i", comp.tobytes()),
+                array("i", num_filhos.tobytes()), euler, num_comp, arvore)
+
+    def _montar_rmq(self, euler):
+        """RMQ sobre o passeio de Euler; cada chave é (profundidade << 32) | id do nó."""
+        B = self.BLOCO
+        euler = np.frombuffer(euler, dtype=np.int32).astype(np.int64)
+        primeira = np.full(len(self.nomes), -1, dtype=np.int64)
+        # primeira ocorrência de cada nó: percorre de trás para frente, a última escrita vence
+        primeira[euler[::-1]] = np.arange(len(euler) - 1, -1, -1)
+        chaves = (np.frombuffer(self.prof, dtype=np.int32).astype(np.int64)[euler] << 32) | euler
+        num_blocos = -(-len(chaves) // B)
+        blocos = np.full(num_blocos * B, np.iinfo(np.int64).max, dtype=np.int64)
+        blocos[:len(chaves)] = chaves
+        blocos = blocos.reshape(num_blocos, B)
+        self._prefixo = np.minimum.accumulate(blocos, axis=1).ravel()
+        self._sufixo = np.minimum.accumulate(blocos[:, ::-1], axis=1)[:, ::-1].ravel()
+        tabela = [blocos.min(axis=1)]
+        k = 1
+        while (1 << k) <= num_blocos:
+            anterior = tabela[-1]
+            tabela.append(np.minimum(anterior[:-(1 << (k - 1))], anterior[1 << (k - 1):]))
+            k += 1
+        self._tabela = tabela
+        self._chaves = chaves
+        self.primeira = primeira
+
+    def _garantir(self):
+        if not self._valido:
+            self._construir()
+
+    def _grafo_networkx(self):
+        """O grafo para os algoritmos do networkx (exportado uma vez, se for um GrafoCSR)."""
+        if not isinstance(self.G, GrafoCSR):
+            return self.G
+        if self._networkx is None:
+            self._networkx = self.G.para_networkx()
+        return self._networkx
+
+    # ---------- correções incrementais ----------
+    def _invalidar(self):
+        self._valido = False
+        self._acumulados = {}
+
+    def _conhecido(self, nome):
+        return nome not in self._removidos and (nome in self._corrigidos or nome in self.ids)
+
+    def _dados(self, nome):
+        """(pai, profundidade, componente) de um nó conhecido."""
+        if nome in self._corrigidos:
+            return tuple(self._corrigidos[nome][:3])
+        i = self.ids[nome]
+        p = self.pai[i]
+        return (self.nomes[p] if p >= 0 else None), self.prof[i], self.comp[i]
+
+    def _e_folha(self, nome):
+        if nome in self._corrigidos:
+            return self._corrigidos[nome][3] == 0
+        return self.num_filhos[self.ids[nome]] == 0
+
+    def _ajustar_filhos(self, nome, delta):
+        if nome in self._corrigidos:
+            self._corrigidos[nome][3] += delta
+        else:
+            self.num_filhos[self.ids[nome]] += delta
+
+    def notificar(self, operacao, *args):
+        if not self._valido:
+            return
+        if operacao == "add_node":
+            nome, = args
+            if not self._conhecido(nome):
+                self._removidos.discard(nome)
+                self._corrigidos[nome] = [None, 0, self.num_componentes, 0]
+                self.num_componentes += 1
+        elif operacao == "add_edge":
+            u, v = args
+            for folha, pai in ((u, v), (v, u)):
+                if self._conhecido(folha) and self._dados(folha)[0] == pai:
+                    # Aresta da árvore já indexada: só os atributos mudaram, e com
+                    # eles os pesos somados por acumulado_raiz
+                    self._acumulados = {}
+                    return
+            for folha, pai in ((u, v), (v, u)):
+                if self.G.degree(folha) == 1 and self._conhecido(pai) and \
+                        (not self._conhecido(folha) or self._dados(folha)[0] is None):
+                    _, prof_pai, comp_pai = self._dados(pai)
+                    self._removidos.discard(folha)
+                    self._corrigidos[folha] = [pai, prof_pai + 1, comp_pai, 0]
+                    self._ajustar_filhos(pai, +1)
+                    return
+            self._invalidar()
+        elif operacao == "remove_node":
+            nome, = args
+            if self._conhecido(nome) and self._e_folha(nome):
+                pai = self._dados(nome)[0]
+                if pai is not None:
+                    self._ajustar_filhos(pai, -1)
+                self._corrigidos.pop(nome, None)
+                self._removidos.add(nome)
+            else:
+                self._invalidar()
+        elif operacao == "remove_edge":
+            u, v = args
+            for folha, pai in ((u, v), (v, u)):
+                if self._conhecido(folha) and self._dados(folha)[0] == pai and self._e_folha(folha):
+                    self._ajustar_filhos(pai, -1)
+                    self._corrigidos[folha] = [None, 0, self.num_componentes, 0]
+                    self.num_componentes += 1
+                    return
+            self._invalidar()
+        else:
+            self._invalidar()
+
+    # ---------- consultas ----------
+    def _rmq(self, l, r):
+        B = self.BLOCO
+        bl, br = l // B, r // B
+        if bl == br:
+            return int(self._chaves[l:r + 1].min())
+        res = min(self._sufixo[l], self._prefixo[r])
+        if br - bl > 1:
+            a, b = bl + 1, br - 1
+            k = (b - a + 1).bit_length() - 1
+            res = min(res, self._tabela[k][a], self._tabela[k][b - (1 << k) + 1])
+        return int(res)
+
+    def alcancavel(self, u, v):
+        self._garantir()
+        if not (self._conhecido(u) and self._conhecido(v)):
+            return False
+        if not self.arvore:
+            return nx.has_path(self._grafo_networkx(), u, v)
+        return self._dados(u)[2] == self._dados(v)[2]
+
+    def lca(self, u, v):
+        """Menor ancestral comum de u e v (None se estiverem em componentes diferentes)."""
+        if not self.alcancavel(u, v):
+            return None
+        # Folhas corrigidas: sobe até um nó do índice original (nunca passa do LCA)
+        while u != v and (u in self._corrigidos or v in self._corrigidos):
+            pu, du, _ = self._dados(u)
+            pv, dv, _ = self._dados(v)
+            if u in self._corrigidos and (v not in self._corrigidos or du >= dv):
+                u = pu
+            else:
+                v = pv
+        if u == v:
+            return u
+        l, r = int(self.primeira[self.ids[u]]), int(self.primeira[self.ids[v]])
+        if l > r:
+            l, r = r, l
+        return self.nomes[self._rmq(l, r) & 0xFFFFFFFF]
+
+    def caminho(self, u, v):
+        """Lista de nós de u até v (inclusive), ou None se não houver caminho."""
+        self._garantir()
+        if not self.arvore:
+            return nx.shortest_path(self._grafo_networkx(), u, v) if self.alcancavel(u, v) else None
+        w = self.lca(u, v)
+        if w is None:
+            return None
+        subida, descida = [], []
+        while u != w:
+            subida.append(u)
+            u = self._dados(u)[0]
+        while v != w:
+            descida.append(v)
+            v = self._dados(v)[0]
+        subida.append(w)
+        subida.extend(reversed(descida))
+        return subida
+
+    def distancia(self, u, v):
+        """Número de saltos entre u e v (None se inalcançável)."""
+        self._garantir()
+        if not self.arvore:
+            return nx.shortest_path_length(self._grafo_networkx(), u, v) if self.alcancavel(u, v) else None
+        w = self.lca(u, v)
+        if w is None:
+            return None
+        return self._dados(u)[1] + self._dados(v)[1] - 2 * self._dados(w)[1]
+
+    # ---------- consultas em lote (NumPy) ----------
+    def preparar_lote(self):
+        """
+        Garante um índice sem correções pendentes (as consultas em lote trabalham
+        só com os arrays), remontando-o se houve inserções/remoções de folhas.
+        """
+        self._garantir()
+        if self._corrigidos or self._removidos:
+            self._construir()
+
+    def ids_de(self, nomes):
+        """Array de ids dos nós (-1 para nomes desconhecidos)."""
+        ids = self.ids
+        return np.fromiter((ids.get(nome, -1) for nome in nomes), dtype=np.int64, count=len(nomes))
+
+    def _rmq_lote(self, l, r):
+        B = self.BLOCO
+        bl, br = l // B, r // B
+        res = np.minimum(self._sufixo[l], self._prefixo[r])
+        meio = np.nonzero(br - bl > 1)[0]
+        if len(meio):
+            a, b = bl[meio] + 1, br[meio] - 1
+            k = np.frexp((b - a + 1).astype(np.float64))[1] - 1
+            for nivel in np.unique(k):
+                sel = k == nivel
+                tabela = self._tabela[nivel]
+                idx = meio[sel]
+                res[idx] = np.minimum(res[idx], np.minimum(tabela[a[sel]], tabela[b[sel] - (1 << int(nivel)) + 1]))
+        mesmo = np.nonzero(bl == br)[0]
+        if len(mesmo):
+            ll, rr = l[mesmo], r[mesmo]
+            minimo = self._chaves[ll]
+            ultimo = len(self._chaves) - 1
+            for d in range(1, B):
+                pos = ll + d
+                minimo = np.where(pos <= rr, np.minimum(minimo, self._chaves[np.minimum(pos, ultimo)]), minimo)
+            res[mesmo] = minimo
+        return res
+
+    def lca_lote(self, u, v):
+        """LCA para arrays de ids u e v (-1 onde não há caminho ou o id é inválido)."""
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        lca = np.full(len(u), -1, dtype=np.int64)
+        validos = (u >= 0) & (v >= 0)
+        comp = np.frombuffer(self.comp, dtype=np.int32)
+        validos[validos] = comp[u[validos]] == comp[v[validos]]
+        idx = np.nonzero(validos)[0]
+        if len(idx):
+            l, r = self.primeira[u[idx]], self.primeira[v[idx]]
+            l, r = np.minimum(l, r), np.maximum(l, r)
+            lca[idx] = self._rmq_lote(l, r) & 0xFFFFFFFF
+        return lca
+
+    def distancia_lote(self, u, v):
+        """Número de saltos para arrays de ids (-1 onde inalcançável)."""
+        lca = self.lca_lote(u, v)
+        prof = np.frombuffer(self.prof, dtype=np.int32).astype(np.int64)
+        ok = lca >= 0
+        saltos = np.full(len(lca), -1, dtype=np.int64)
+        saltos[ok] = prof[np.asarray(u)[ok]] + prof[np.asarray(v)[ok]] - 2 * prof[lca[ok]]
+        return saltos
+
+    def peso_ate_pai(self, peso):
+        """
+        peso(dados_da_aresta) da aresta de cada nó até o pai, como array indexado
+        por id (0 nas raízes). Num GrafoCSR, peso é chamado uma vez por código
+        de atributo, não uma vez por aresta.
+        """
+        self.preparar_lote()
+        G, n = self.G, len(self.nomes)
+        pai = np.frombuffer(self.pai, dtype=np.int32)
+        pesos = np.zeros(n, dtype=np.float64)
+        if isinstance(G, GrafoCSR):
+            origens = np.repeat(np.arange(n, dtype=np.int32), np.diff(G.indptr))
+            ate_pai = np.nonzero(G.indices == pai[origens])[0]
+            por_codigo = np.array([peso(atributos) for atributos in G.tabela_enlaces], dtype=np.float64)
+            pesos[origens[ate_pai]] = por_codigo[G.codigos_aresta[ate_pai]]
+        else:
+            nomes, adj = self.nomes, G._adj
+            for i, p in enumerate(pai.tolist()):
+                if p >= 0:
+                    pesos[i] = peso(adj[nomes[i]][nomes[p]])
+        return pesos
+
+    def acumulado_raiz(self, peso):
+        """
+        Soma de peso(dados_da_aresta) de cada nó até a raiz do seu componente,
+        como array indexado por id (calculada uma vez por função peso).
+        """
+        self.preparar_lote()
+        if peso in self._acumulados:
+            return self._acumulados[peso]
+        acumulado = self.peso_ate_pai(peso)
+        pai = np.frombuffer(self.pai, dtype=np.int32)
+        prof = np.frombuffer(self.prof, dtype=np.int32)
+        # Um nível de profundidade por vez: os pais já têm o acumulado final
+        ordem = np.argsort(prof, kind="stable")
+        limites = np.cumsum(np.bincount(prof))
+        for inicio, fim in zip(limites[:-1].tolist(), limites[1:].tolist()):
+            nivel = ordem[inicio:fim]
+            acumulado[nivel] += acumulado[pai[nivel]]
+        self._acumulados[peso] = acumulado
+        return acumulado
+
+    def soma_caminhos(self, peso, u, v, lca):
+        """
+        Soma de peso(dados_da_aresta) no caminho de cada par (u, v) de arrays de
+        ids, dado o ancestral comum de lca_lote. Lotes grandes usam acumulado_raiz
+        (O(n) uma vez por peso); poucos pares sobem pelos ponteiros de pai, sem
+        percorrer o grafo inteiro.
+        """
+        if peso in self._acumulados or 64 * len(u) > len(self.nomes):
+            acumulado = self.acumulado_raiz(peso)
+            return acumulado[u] + acumulado[v] - 2 * acumulado[lca]
+        self.preparar_lote()
+        G, nomes, pai = self.G, self.nomes, self.pai
+        somas = np.zeros(len(u), dtype=np.float64)
+        for k, (a, b, w) in enumerate(zip(u.tolist(), v.tolist(), lca.tolist())):
+            for x in (a, b):
+                while x != w:
+                    p = pai[x]
+                    if isinstance(G, GrafoCSR):
+                        dados = G.tabela_enlaces[G.codigos_aresta[G._posicao_aresta(x, p)]]
+                    else:
+                        dados = G._adj[nomes[x]][nomes[p]]
+                    somas[k] += peso(dados)
+                    x = p
+        return somas
+
+
+def obter_indice_percursos(G):
+    """
+    Índice de percursos associado ao grafo (criado na primeira chamada e mantido
+    em dia pelas notificações do GrafoRede; um GrafoCSR nunca muda). Para um
+    nx.Graph comum retorna None, pois alterações nele não podem ser detectadas.
+    """
+    if not isinstance(G, GrafoCSR) and ("GrafoRede" not in globals() or not isinstance(G, GrafoRede)):
+        return None
+    if G.indice_percursos is None:
+        G.indice_percursos = IndicePercursos(G)
+    return G.indice_percursos
+
+
+###############################################
+# REDE MUTÁVEL (ALTERAÇÕES INCREMENTAIS)
+###############################################
+class Rede:
+    """
+    Dona de todas as estruturas paralelas da rede (G, subredes, enderecos_ip,
+    máscaras, subredes por roteador, roteadores, switches de borda,
+    especificações, FIBs e índice de percursos), para que elas não se
+    desencontrem. Hosts, subredes, roteadores e enlaces podem ser incluídos ou
+    removidos depois da construção; cada operação corrige só o que mudou
+    (endereços, rotas das FIBs, índice de percursos, lista "Enlaces" e os
+    totais de especificacoes_rede) em O(tamanho da alteração).
+
+      rede = Rede.construir({"roteadores": 2, "subredes": {"e1": 10}})
+      rede.adicionar_host("e1")
+      rede.mover_subrede("e1", "a2")
+      G, subredes, enderecos_ip, ... = rede.como_tupla()
+
+    O GrafoCSR de construir_rede é imutável: a Rede o troca por um GrafoRede
+    (para_networkx) e materializa "Enlaces" como lista. Os índices auxiliares
+    (posições nas listas, próximo endereço livre de cada bloco, etc.) são
+    montados sob demanda, uma única vez, na primeira operação que precisa deles. Remoções trocam o item removido pelo último da lista, de
+    modo que a ordem de hosts, enlaces e switches de borda pode mudar.
+    """
+
+    def __init__(self, G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador,
+                 roteadores, switches_borda, especificacoes_rede, fibs=None):
+        if isinstance(G, GrafoCSR):
+            # As alterações precisam de estruturas mutáveis: o núcleo vira GrafoRede e "Enlaces" uma lista
+            G = G.para_networkx()
+            especificacoes_rede["Enlaces"] = list(especificacoes_rede.get("Enlaces", ()))
+        self.G = G
+        self.subredes = subredes
+        self.enderecos_ip = enderecos_ip
+        self.mascaras_subrede = mascaras_subrede
+        self.subredes_por_roteador = subredes_por_roteador
+        self.roteadores = roteadores
+        self.switches_borda = switches_borda
+        self.especificacoes_rede = especificacoes_rede
+        self.fibs = construir_fibs(subredes, enderecos_ip, roteadores) if fibs is None else fibs
+        self._posicoes = {}          # chave da lista → {item: posição}
+        self._proximo_ip = {}        # subrede (None = backbone) → [próximo endereço nunca usado, último utilizável]
+        self._ips_livres = {}        # subrede (None = backbone) → endereços devolvidos
+        self._blocos_livres = {}     # prefixo → redes de blocos devolvidos
+        self._alocador = None
+        self._atributos = {}         # tipo ou (tipo, capacidade, mtu) → dicionário compartilhado por "Enlaces"
+
+    @classmethod
+    def construir(cls, especificacao, verbose=False):
+        """Monta a rede com construir_rede (especificação, arquivo ou snapshot)."""
+        return cls(*construir_rede(especificacao, verbose=verbose))
+
+    def como_tupla(self):
+        """A tupla de configurar_rede/construir_rede, com as mesmas estruturas (não cópias)."""
+        return (self.G, self.subredes, self.enderecos_ip, self.mascaras_subrede, self.subredes_por_roteador,
+                self.roteadores, self.switches_borda, self.especificacoes_rede)
+
+    @property
+    def indice(self):
+        """Índice de percursos do grafo (mantido em dia pelas notificações do GrafoRede)."""
+        return obter_indice_percursos(self.G)
+
+    # ---------- listas com remoção O(1) ----------
+    @staticmethod
+    def _chave_item(chave, item):
+        return (item[0], item[1]) if chave == "enlaces" else item
+
+    def _lista(self, chave):
+        if chave == "enlaces":
+            return self.especificacoes_rede["Enlaces"]
+        if chave == "roteadores":
+            return self.roteadores
+        if chave == "borda":
+            return self.switches_borda
+        tipo, nome = chave
+        return self.subredes[nome]["hosts"] if tipo == "hosts" else self.subredes_por_roteador[nome]
+
+    def _indice_lista(self, chave):
+        if chave not in self._posicoes:
+            self._posicoes[chave] = {self._chave_item(chave, item): i for i, item in enumerate(self._lista(chave))}
+        return self._posicoes[chave]
+
+    def _anexar(self, chave, item):
+        lista = self._lista(chave)
+        lista.append(item)
+        if chave in self._posicoes:
+            self._posicoes[chave][self._chave_item(chave, item)] = len(lista) - 1
+
+    def _retirar(self, chave, item):
+        """Remove o item trocando-o pelo último da lista; retorna False se ele não estava lá."""
+        posicoes = self._indice_lista(chave)
+        i = posicoes.pop(item, None)
+        if i is None:
+            return False
+        lista = self._lista(chave)
+        ultimo = lista.pop()
+        if i < len(lista):
+            lista[i] = ultimo
+            posicoes[self._chave_item(chave, ultimo)] = i
+        return True
+
+    def _retirar_enlace(self, u, v):
+        if not self._retirar("enlaces", (u, v)):
+            self._retirar("enlaces", (v, u))
+
+    # ---------- endereços ----------
+    def _bloco_backbone(self):
+        """Bloco do Switch Central e dos roteadores, como _montar_rede o recortou."""
+        ips = self.enderecos_ip
+        rede = ips.inteiro("Switch Central") - 1
+        prefixo = prefixo_para_capacidade(1 + len(self.roteadores))
+        bloco = BlocoIP(rede & prefixo_para_mascara(prefixo), prefixo)
+        if all(ips.inteiro(r) in bloco for r in self.roteadores):
+            return bloco
+        return None
+
+    def _faixa(self, subrede):
+        """[próximo endereço nunca usado, último utilizável] do bloco da subrede (None = backbone)."""
+        if subrede not in self._proximo_ip:
+            ips = self.enderecos_ip
+            if subrede is None:
+                bloco = self._bloco_backbone()
+                membros = ["Switch Central"] + self.roteadores
+            else:
+                info = self.subredes[subrede]
+                bloco = BlocoIP(info["rede"], info["prefixo"])
+                membros = [f"Switch {subrede}"] + info["hosts"]
+            if bloco is None:
+                self._proximo_ip[subrede] = [1, 0]  # backbone desconhecido: só blocos novos
+            else:
+                usados = [ips.inteiro(nome) for nome in membros if ips.inteiro(nome) in bloco]
+                self._proximo_ip[subrede] = [max(usados, default=bloco.rede) + 1, bloco.broadcast - 1]
+        return self._proximo_ip[subrede]
+
+    def _alocar_ip(self, subrede):
+        livres = self._ips_livres.get(subrede)
+        if livres:
+            return livres.pop()
+        faixa = self._faixa(subrede)
+        if faixa[0] > faixa[1]:
+            if subrede is not None:
+                info = self.subredes[subrede]
+                raise ValueError(f"Subrede '{subrede}' ({int_para_ip(info['rede'])}/{info['prefixo']}) sem endereços livres.")
+            # Os roteadores só precisam de um /32 no Switch Central: o backbone cresce em um novo bloco
+            bloco = self._reservar_bloco(prefixo_para_capacidade(1 + len(self.roteadores)))
+            faixa[:] = [bloco.rede + 1, bloco.broadcast - 1]
+        faixa[0] += 1
+        return faixa[0] - 1
+
+    def _liberar_ip(self, subrede, endereco):
+        self._ips_livres.setdefault(subrede, []).append(endereco)
+
+    def _reservar_bloco(self, prefixo):
+        """Bloco livre /prefixo: um devolvido por remover_subrede ou um novo, após todos os existentes."""
+        if self._blocos_livres.get(prefixo):
+            return BlocoIP(self._blocos_livres[prefixo].pop(), prefixo)
+        if self._alocador is None:
+            alocador = AlocadorIP(self.especificacoes_rede["Endereço de Rede"])
+            fins = [info["rede"] + (1 << (32 - info["prefixo"])) for info in self.subredes.values()]
+            fins.extend(self.enderecos_ip.inteiro(nome) + 1 for nome in ["Switch Central"] + self.roteadores)
+            backbone = self._bloco_backbone()
+            if backbone is not None:
+                fins.append(backbone.broadcast + 1)
+            alocador.cursor = max(fins, default=alocador.cursor)
+            self._alocador = alocador
+        return self._alocador.reservar(prefixo)
+
+    # ---------- enlaces ----------
+    def _compartilhado(self, tipo_enlace, capacidade, mtu):
+        chave = (tipo_enlace, capacidade, mtu)
+        if chave not in self._atributos:
+            self._atributos[chave] = {'tipo_enlace': tipo_enlace, 'capacidade': capacidade, 'mtu': mtu}
+        return self._atributos[chave]
+
+    def _atributos_hierarquia(self, tipo_enlace):
+        """
+        Dicionário de atributos dos enlaces da hierarquia de um tipo; reaproveita o
+        de "Enlaces" (mesmo MTU e capacidade) na primeira vez que é pedido.
+        """
+        capacidade = CAPACIDADE_ENLACE_PADRAO[tipo_enlace]
+        if tipo_enlace not in self._atributos:
+            for _, _, atributos in self.especificacoes_rede["Enlaces"]:
+                if atributos.get('tipo_enlace') == tipo_enlace and atributos.get('capacidade') == capacidade:
+                    self._atributos[tipo_enlace] = atributos
+                    break
+            else:
+                self._atributos[tipo_enlace] = self._compartilhado(tipo_enlace, capacidade, MTU_PADRAO)
+        return self._atributos[tipo_enlace]
+
+    def _ligar(self, u, v, atributos):
+        self.G.add_edge(u, v, **atributos)
+        self._anexar("enlaces", (u, v, atributos))
+
+    def _desligar_no(self, nome):
+        """Tira o nó do grafo e todos os seus enlaces da lista "Enlaces"."""
+        for vizinho in list(self.G._adj[nome]):
+            self._retirar_enlace(nome, vizinho)
+        self.G.remove_node(nome)
+
+    def _estrutural(self, u, v):
+        """O enlace faz parte da hierarquia usada pelas FIBs (central–roteador, roteador–switch, switch–host)?"""
+        for a, b in ((u, v), (v, u)):
+            if a == "Switch Central" and b in self.subredes_por_roteador:
+                return True
+            if a.startswith("Switch ") and a[7:] in self.subredes:
+                subrede = a[7:]
+                if self.subredes[subrede]["roteador"] == b or b in self._indice_lista(("hosts", subrede)):
+                    return True
+        return False
+
+    def adicionar_enlace(self, u, v, tipo_enlace='Par Trançado', capacidade='100 Mbps', mtu=MTU_PADRAO):
+        """
+        Enlace extra entre dois dispositivos existentes (redundância). As FIBs não
+        mudam; um ciclo faz o índice de percursos cair na busca do networkx.
+        """
+        for nome in (u, v):
+            if nome not in self.G:
+                raise ValueError(f"Dispositivo inexistente: '{nome}'.")
+        if self.G.has_edge(u, v):
+            raise ValueError(f"Já existe um enlace entre '{u}' e '{v}'.")
+        self._ligar(u, v, self._compartilhado(tipo_enlace, capacidade, mtu))
+
+    def remover_enlace(self, u, v):
+        """Remove um enlace extra; os enlaces da hierarquia saem com o host, a subrede ou o roteador."""
+        if not self.G.has_edge(u, v):
+            raise ValueError(f"Não existe enlace entre '{u}' e '{v}'.")
+        if self._estrutural(u, v):
+            raise ValueError(f"O enlace '{u}' <--> '{v}' é usado pelo roteamento; "
+                             "use remover_host, remover_subrede, mover_subrede ou remover_roteador.")
+        self.G.remove_edge(u, v)
+        self._retirar_enlace(u, v)
+
+    # ---------- hosts ----------
+    def _subrede_do_host(self, host):
+        if host in self.G and self.G._node[host].get('tipo') == 'Host':
+            for vizinho in self.G._adj[host]:
+                subrede = vizinho[7:] if vizinho.startswith("Switch ") else None
+                if subrede in self.subredes and host in self._indice_lista(("hosts", subrede)):
+                    return subrede
+        raise ValueError(f"Host inexistente: '{host}'.")
+
+    def adicionar_host(self, subrede, nome=None):
+        """Inclui um host na subrede, com o próximo endereço livre do bloco dela. Retorna o nome."""
+        if subrede not in self.subredes:
+            raise ValueError(f"Subrede inexistente: '{subrede}'.")
+        info = self.subredes[subrede]
+        if nome is None:
+            j = len(info["hosts"]) + 1
+            while f"Host {subrede}-{j}" in self.G:
+                j += 1
+            nome = f"Host {subrede}-{j}"
+        elif nome in self.G:
+            raise ValueError(f"Já existe um dispositivo chamado '{nome}'.")
+        endereco = self._alocar_ip(subrede)
+        switch_borda = f"Switch {subrede}"
+        hosts = info["hosts"]
+        fib_hosts = self.fibs[hosts[0]] if hosts else TabelaRoteamento([(0, 0, switch_borda)])
+
+        self.G.add_node(nome, tipo='Host')
+        self._ligar(switch_borda, nome, self._atributos_hierarquia('Par Trançado'))
+        self.enderecos_ip[nome] = endereco
+        self.fibs[nome] = fib_hosts
+        self._anexar(("hosts", subrede), nome)
+        info["capacidade"] += 1
+        if info["capacidade"] == 1:
+            self._anexar("borda", switch_borda)
+        self._atualizar_totais()
+        return nome
+
+    def remover_host(self, host):
+        subrede = self._subrede_do_host(host)
+        info = self.subredes[subrede]
+        self._liberar_ip(subrede, self.enderecos_ip.inteiro(host))
+        self._desligar_no(host)
+        del self.enderecos_ip[host]
+        del self.fibs[host]
+        self._retirar(("hosts", subrede), host)
+        info["capacidade"] -= 1
+        if info["capacidade"] == 0:
+            self._retirar("borda", f"Switch {subrede}")
+        self._atualizar_totais()
+
+    # ---------- subredes ----------
+    def adicionar_subrede(self, nome, roteador, capacidade=0, reserva=0):
+        """
+        Cria a subrede sob o roteador, com um bloco que comporta o switch de borda,
+        `capacidade` hosts e mais `reserva` endereços para hosts futuros.
+        """
+        if nome in self.subredes:
+            raise ValueError(f"Nome de subrede repetido: '{nome}'.")
+        if roteador not in self.subredes_por_roteador:
+            raise ValueError(f"Roteador inexistente: '{roteador}'.")
+        switch_borda = f"Switch {nome}"
+        if switch_borda in self.G:
+            raise ValueError(f"Já existe um dispositivo chamado '{switch_borda}'.")
+        bloco = self._reservar_bloco(prefixo_para_capacidade(1 + capacidade + reserva))
+        mascara = int_para_ip(bloco.mascara)
+        self.subredes[nome] = {
+            "hosts": [],
+            "roteador": roteador,
+            "mask": mascara,
+            "capacidade": 0,
+            "rede": bloco.rede,
+            "prefixo": bloco.prefixo
+        }
+        self.mascaras_subrede[nome] = mascara
+        self._anexar(("subredes", roteador), nome)
+        self._proximo_ip[nome] = [bloco.rede + 2, bloco.broadcast - 1]
+
+        self.G.add_node(switch_borda, tipo='Switch de Borda')
+        self._ligar(roteador, switch_borda, self._atributos_hierarquia('Par Trançado'))
+        self.enderecos_ip[switch_borda] = bloco.rede + 1
+        self.fibs["Switch Central"].inserir(bloco.rede, bloco.prefixo, roteador)
+        self.fibs[roteador].inserir(bloco.rede, bloco.prefixo, switch_borda)
+        self.fibs[switch_borda] = TabelaRoteamento([(0, 0, roteador), (bloco.rede, bloco.prefixo, ENTREGA_LOCAL)])
+        self._atualizar_totais()
+        for _ in range(capacidade):
+            self.adicionar_host(nome)
+        return nome
+
+    def remover_subrede(self, nome):
+        """Remove a subrede com seus hosts e devolve o bloco para novas subredes do mesmo tamanho."""
+        if nome not in self.subredes:
+            raise ValueError(f"Subrede inexistente: '{nome}'.")
+        info = self.subredes[nome]
+        for host in list(info["hosts"]):
+            self.remover_host(host)
+        switch_borda = f"Switch {nome}"
+        roteador = info["roteador"]
+        self._desligar_no(switch_borda)
+        del self.enderecos_ip[switch_borda]
+        del self.fibs[switch_borda]
+        self.fibs["Switch Central"].remover(info["rede"], info["prefixo"])
+        self.fibs[roteador].remover(info["rede"], info["prefixo"])
+        self._retirar(("subredes", roteador), nome)
+        del self.subredes[nome]
+        del self.mascaras_subrede[nome]
+        self._proximo_ip.pop(nome, None)
+        self._ips_livres.pop(nome, None)
+        self._posicoes.pop(("hosts", nome), None)
+        self._blocos_livres.setdefault(info["prefixo"], []).append(info["rede"])
+        self._atualizar_totais()
+
+    def mover_subrede(self, nome, roteador):
+        """Passa a subrede (com o mesmo bloco de endereços) para outro roteador."""
+        if nome not in self.subredes:
+            raise ValueError(f"Subrede inexistente: '{nome}'.")
+        if roteador not in self.subredes_por_roteador:
+            raise ValueError(f"Roteador inexistente: '{roteador}'.")
+        info = self.subredes[nome]
+        antigo = info["roteador"]
+        if antigo == roteador:
+            return
+        G = self.G
+        switch_borda = f"Switch {nome}"
+        atributos = G._adj[switch_borda][antigo]
+        # O índice de percursos só corrige folhas no lugar: os hosts saem e voltam
+        # depois de o switch trocar de pai, em O(hosts da subrede) em vez de O(rede)
+        arestas_hosts = [(switch_borda, host, dados) for host, dados in G._adj[switch_borda].items() if host != antigo]
+        G.remove_edges_from(arestas_hosts)
+        G.remove_edge(antigo, switch_borda)
+        G.add_edge(roteador, switch_borda, **atributos)
+        G.add_edges_from(arestas_hosts)
+
+        compartilhado = self._atributos_hierarquia('Par Trançado')
+        self._retirar_enlace(antigo, switch_borda)
+        self._anexar("enlaces", (roteador, switch_borda, compartilhado))
+        self.fibs["Switch Central"].inserir(info["rede"], info["prefixo"], roteador)
+        self.fibs[antigo].remover(info["rede"], info["prefixo"])
+        self.fibs[roteador].inserir(info["rede"], info["prefixo"], switch_borda)
+        self.fibs[switch_borda].inserir(0, 0, roteador)
+        self._retirar(("subredes", antigo), nome)
+        self._anexar(("subredes", roteador), nome)
+        info["roteador"] = roteador
+
+    # ---------- roteadores ----------
+    def adicionar_roteador(self, nome=None):
+        """Inclui um roteador de agregação ligado ao Switch Central. Retorna o nome."""
+        if nome is None:
+            i = len(self.roteadores) + 1
+            while f"a{i}" in self.G:
+                i += 1
+            nome = f"a{i}"
+        elif nome in self.G:
+            raise ValueError(f"Já existe um dispositivo chamado '{nome}'.")
+        endereco = self._alocar_ip(None)
+        self.G.add_node(nome, tipo='Roteador de Agregação')
+        self._ligar("Switch Central", nome, self._atributos_hierarquia('Fibra Óptica'))
+        self.enderecos_ip[nome] = endereco
+        self.fibs["Switch Central"].inserir(endereco, 32, nome)
+        self.fibs[nome] = TabelaRoteamento([(0, 0, "Switch Central"), (endereco, 32, ENTREGA_LOCAL)])
+        self._anexar("roteadores", nome)
+        self.subredes_por_roteador[nome] = []
+        self._atualizar_totais()
+        return nome
+
+    def remover_roteador(self, nome, destino=None):
+        """
+        Remove o roteador. Suas subredes passam para `destino`; sem destino, o
+        roteador precisa estar sem subredes.
+        """
+        if nome not in self.subredes_por_roteador:
+            raise ValueError(f"Roteador inexistente: '{nome}'.")
+        if self.subredes_por_roteador[nome]:
+            if destino is None:
+                raise ValueError(f"O roteador '{nome}' ainda tem subredes; informe um destino para elas.")
+            if destino == nome or destino not in self.subredes_por_roteador:
+                raise ValueError(f"Roteador de destino inválido: '{destino}'.")
+            for subrede in list(self.subredes_por_roteador[nome]):
+                self.mover_subrede(subrede, destino)
+        endereco = self.enderecos_ip.inteiro(nome)
+        self._desligar_no(nome)
+        self._liberar_ip(None, endereco)
+        del self.enderecos_ip[nome]
+        del self.fibs[nome]
+        self.fibs["Switch Central"].remover(endereco, 32)
+        self._retirar("roteadores", nome)
+        del self.subredes_por_roteador[nome]
+        self._posicoes.pop(("subredes", nome), None)
+        self._atualizar_totais()
+
+    def _atualizar_totais(self):
+        especificacoes = self.especificacoes_rede
+        especificacoes["Total de Roteadores"] = len(self.roteadores)
+        especificacoes["Total de Subredes"] = len(self.subredes)
+        especificacoes["Total de Hosts"] = len(self.enderecos_ip)
+
+    def __repr__(self):
+        return (f"Rede({len(self.roteadores)} roteadores, {len(self.subredes)} subredes, "
+                f"{len(self.enderecos_ip)} dispositivos)")
+
+
+def _conferir_rede(rede, amostra=200, semente=0):
+    """Lista de inconsistências entre as estruturas da Rede (vazia se tudo confere)."""
+    G, subredes, enderecos_ip = rede.G, rede.subredes, rede.enderecos_ip
+    especificacoes = rede.especificacoes_rede
+    problemas = []
+    if len(enderecos_ip) != G.number_of_nodes() or any(nome not in G for nome in enderecos_ip):
+        problemas.append("enderecos_ip")
+    enlaces = especificacoes["Enlaces"]
+    if len(enlaces) != G.number_of_edges() or any(not G.has_edge(u, v) for u, v, _ in enlaces):
+        problemas.append("Enlaces")
+    if (especificacoes["Total de Roteadores"], especificacoes["Total de Subredes"], especificacoes["Total de Hosts"]) != \
+            (len(rede.roteadores), len(subredes), len(enderecos_ip)):
+        problemas.append("totais")
+    if sorted(rede.switches_borda) != sorted(f"Switch {s}" for s, info in subredes.items() if info["hosts"]):
+        problemas.append("switches_borda")
+    if any(info["capacidade"] != len(info["hosts"]) for info in subredes.values()):
+        problemas.append("capacidade")
+    if len(set(enderecos_ip.values())) != len(enderecos_ip):
+        problemas.append("endereços repetidos")
+    # Rotas das FIBs, índice de percursos e busca do networkx devem dar o mesmo caminho
+    rng = random.Random(semente)
+    hosts = [n for n, tipo in G.nodes(data='tipo') if tipo == 'Host']
+    for _ in range(amostra if len(hosts) > 1 else 0):
+        origem, destino = rng.sample(hosts, 2)
+        esperado = nx.shortest_path(G, origem, destino)
+        if encaminhar(rede.fibs, enderecos_ip, origem, destino) != esperado or \
+                rede.indice.caminho(origem, destino) != esperado:
+            problemas.append(f"caminho {origem} → {destino}")
+            break
+    return problemas
+
+
+def benchmark_mutacao(num_hosts=200_000, operacoes=2000, semente=0):
+    """
+    Tempo por alteração incremental (hosts, subredes, roteadores) em uma rede
+    grande, comparado a remontar tudo, e conferência das estruturas no final.
+    """
+    rng = random.Random(semente)
+    especificacao = gerar_especificacao(max(num_hosts // 2000, 2), 20, 100, semente)
+    inicio = time.perf_counter()
+    rede = Rede.construir(especificacao)
+    rede.indice.caminho("Host e1-1", "Host e2-1")
+    t_construcao = time.perf_counter() - inicio
+    print(f"Rede com {rede.G.number_of_nodes()} nós montada (FIBs e índice) em {t_construcao:.2f} s")
+
+    def medir(rotulo, funcao, repeticoes=operacoes):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        decorrido = time.perf_counter() - inicio
+        print(f"  {rotulo:<22} {decorrido / repeticoes * 1e6:9.1f} µs/op "
+              f"({t_construcao * repeticoes / decorrido:,.0f}× mais rápido que remontar)")
+
+    nomes_subredes = list(rede.subredes)
+    novos_hosts, novas_subredes, novos_roteadores = [], [], []
+    medir("adicionar_host", lambda: novos_hosts.append(rede.adicionar_host(rng.choice(nomes_subredes))))
+    medir("remover_host", lambda: rede.remover_host(novos_hosts.pop()))
+    medir("adicionar_roteador", lambda: novos_roteadores.append(rede.adicionar_roteador()), operacoes // 10)
+    medir("adicionar_subrede", lambda: novas_subredes.append(
+        rede.adicionar_subrede(f"n{len(novas_subredes)}", rng.choice(novos_roteadores), capacidade=10)), operacoes // 10)
+    medir("mover_subrede", lambda: rede.mover_subrede(rng.choice(novas_subredes), rng.choice(rede.roteadores)),
+          operacoes // 10)
+    medir("remover_subrede", lambda: rede.remover_subrede(novas_subredes.pop()), operacoes // 10)
+    medir("remover_roteador", lambda: rede.remover_roteador(novos_roteadores.pop(), destino="a1"), operacoes // 10)
+
+    inicio = time.perf_counter()
+    rede.indice.caminho("Host e1-1", "Host e2-1")
+    print(f"  Primeira consulta ao índice depois das alterações: {(time.perf_counter() - inicio) * 1e3:.2f} ms")
+    problemas = _conferir_rede(rede)
+    print(f"  Consistência: {'OK' if not problemas else 'FALHOU em ' + ', '.join(problemas)}")
+    if problemas:
+        raise AssertionError(f"Estruturas da rede divergiram: {problemas}")
+
+
+###############################################
+# LAYOUT HIERÁRQUICO DA TOPOLOGIA (COM CACHE EM DISCO)
+###############################################
+TIPOS_NO_DESENHO = ('Switch Central', 'Roteador de Agregação', 'Switch de Borda', 'Host', 'Hosts Agregados', 'Outro')
+TIPOS_ENLACE_DESENHO = ('Fibra Óptica', 'Par Trançado', 'Outro')
+CORES_NO = {
+    'Switch Central': '#FF6347',         # Tomato
+    'Roteador de Agregação': '#FFA500',  # Laranja
+    'Switch de Borda': '#32CD32',        # Verde Limão
+    'Host': '#87CEFA',                   # Azul Céu Claro
+    'Hosts Agregados': '#4682B4',        # Azul Aço
+    'Outro': '#D3D3D3',                  # Cinza Claro
+}
+ESTILO_ENLACE = {'Fibra Óptica': ('#8A2BE2', 3), 'Par Trançado': ('#1E90FF', 2)}
+LIMITE_HOSTS_DESENHO = 8       # acima disso os hosts da subrede viram um nó só
+LIMITE_ROTULOS = 300           # acima disso os nós são desenhados sem nome
+LIMITE_NOS_INTERATIVO = 2000   # acima disso a topologia é gravada em arquivo, não mostrada
+VERSAO_LAYOUT = 1
+PASTA_CACHE_LAYOUT = os.environ.get("PROJETO2_CACHE_LAYOUT",
+                                    os.path.join(os.path.expanduser("~"), ".cache", "projeto2_redes"))
+
+
+def hash_topologia(G, limite_hosts=LIMITE_HOSTS_DESENHO):
+    """Hash (hex) dos nós, tipos e enlaces do grafo: chave do cache de layouts."""
+    import hashlib
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{VERSAO_LAYOUT}|{limite_hosts}|".encode())
+    h.update("\x1f".join(f"{no}\x1e{tipo}" for no, tipo in G.nodes(data='tipo')).encode())
+    h.update(b"\x1d")
+    h.update("\x1f".join(f"{u}\x1e{v}\x1e{tipo}" for u, v, tipo in G.edges(data='tipo_enlace')).encode())
+    return h.hexdigest()
+
+
+def _calcular_layout(G, limite_hosts):
+    tipo_de = dict(G.nodes(data='tipo'))
+    # Hosts de subredes grandes são representados por um nó agregado
+    agregado = {}
+    for no, tipo in list(tipo_de.items()):
+        if tipo == 'Host':
+            continue
+        hosts = [v for v in G[no] if tipo_de.get(v) == 'Host']
+        if len(hosts) > limite_hosts:
+            grupo = f"{no} ({len(hosts)} hosts)"
+            for host in hosts:
+                agregado[host] = grupo
+            tipo_de[grupo] = 'Hosts Agregados'
+
+    # BFS a partir do Switch Central (ou do primeiro nó de cada componente)
+    ids, nomes, pai, prof = {}, [], [], []
+    raizes = [no for no, tipo in tipo_de.items() if tipo == 'Switch Central' and no in G]
+    for inicio in itertools.chain(raizes, G):
+        inicio = agregado.get(inicio, inicio)
+        if inicio in ids:
+            continue
+        ids[inicio] = len(nomes)
+        nomes.append(inicio)
+        pai.append(-1)
+        prof.append(0)
+        fila = deque([inicio])
+        while fila:
+            u = fila.popleft()
+            iu = ids[u]
+            if tipo_de.get(u) == 'Hosts Agregados':
+                continue
+            for v in G[u]:
+                v = agregado.get(v, v)
+                if v not in ids:
+                    ids[v] = len(nomes)
+                    nomes.append(v)
+                    pai.append(iu)
+                    prof.append(prof[iu] + 1)
+                    fila.append(v)
+
+    # Largura (em folhas) de cada subárvore, de baixo para cima (a ordem BFS já é topológica)
+    n = len(nomes)
+    largura = [0] * n
+    for i in range(n - 1, -1, -1):
+        if largura[i] == 0:
+            largura[i] = 1
+        if pai[i] >= 0:
+            largura[pai[i]] += largura[i]
+    # x: cada nó ocupa o intervalo das suas folhas e fica no meio dele
+    cursor = [0.0] * n
+    x = np.zeros(n)
+    deslocamento = 0.0
+    for i in range(n):
+        p = pai[i]
+        if p < 0:
+            inicio, deslocamento = deslocamento, deslocamento + largura[i]
+        else:
+            inicio = cursor[p]
+            cursor[p] += largura[i]
+        cursor[i] = inicio
+        x[i] = inicio + largura[i] / 2
+
+    arestas = {}
+    codigo_enlace = {tipo: i for i, tipo in enumerate(TIPOS_ENLACE_DESENHO)}
+    for u, v, tipo_enlace in G.edges(data='tipo_enlace'):
+        a, b = ids[agregado.get(u, u)], ids[agregado.get(v, v)]
+        if a != b:
+            arestas.setdefault((min(a, b), max(a, b)), codigo_enlace.get(tipo_enlace, len(TIPOS_ENLACE_DESENHO) - 1))
+    codigo_no = {tipo: i for i, tipo in enumerate(TIPOS_NO_DESENHO)}
+    return {
+        "nomes": nomes,
+        "tipos": np.array([codigo_no.get(tipo_de.get(no), len(TIPOS_NO_DESENHO) - 1) for no in nomes], dtype=np.int8),
+        "xy": np.column_stack((x, -np.array(prof, dtype=np.float64))),
+        "arestas": np.array(list(arestas), dtype=np.int64).reshape(-1, 2),
+        "tipos_enlace": np.array(list(arestas.values()), dtype=np.int8),
+    }
+
+
+def layout_hierarquico(G, limite_hosts=None, cache=True):
+    """
+    Layout determinístico em árvore, calculado em O(n) sobre a hierarquia
+    Switch Central → roteadores → switches de borda → hosts: cada nível em uma
+    linha e cada nó centrado sobre as folhas da sua subárvore. Subredes com mais
+    de `limite_hosts` hosts viram um único nó. Retorna um dicionário com nomes,
+    tipos (códigos em TIPOS_NO_DESENHO), coordenadas xy e arestas (pares de
+    índices + códigos em TIPOS_ENLACE_DESENHO). Com cache=True o resultado é
+    guardado em PASTA_CACHE_LAYOUT, pela chave hash_topologia(G).
+    """
+    limite_hosts = LIMITE_HOSTS_DESENHO if limite_hosts is None else limite_hosts
+    caminho = None
+    if cache:
+        caminho = os.path.join(PASTA_CACHE_LAYOUT, f"layout-{hash_topologia(G, limite_hosts)}.npz")
+        try:
+            with np.load(caminho, allow_pickle=False) as dados:
+                desenho = {chave: dados[chave] for chave in dados.files}
+            desenho["nomes"] = desenho["nomes"].tolist()
+            return desenho
+        except (OSError, ValueError, KeyError):
+            pass
+    desenho = _calcular_layout(G, limite_hosts)
+    if caminho is not None:
+        try:
+            os.makedirs(PASTA_CACHE_LAYOUT, exist_ok=True)
+            temporario = caminho + f".{os.getpid()}.tmp.npz"
+            np.savez(temporario, **{**desenho, "nomes": np.array(desenho["nomes"], dtype=str)})
+            os.replace(temporario, caminho)
+        except OSError:
+            pass  # sem permissão de escrita: o layout só não fica em cache
+    return desenho
+
+
+def benchmark_layout(num_hosts=1_000_000, semente=0):
+    """Tempo do layout hierárquico (sem e com cache) e do desenho em PNG de uma rede grande."""
+    import tempfile
+    especificacao = gerar_especificacao(max(num_hosts // 20_000, 1), 20, 1000, semente)
+    G = construir_rede(especificacao)[0]
+    print(f"Rede com {G.number_of_nodes()} nós:")
+    inicio = time.perf_counter()
+    desenho = layout_hierarquico(G, cache=False)
+    print(f"  Layout (sem cache):  {time.perf_counter() - inicio:.2f} s ({len(desenho['nomes'])} nós desenhados)")
+    global PASTA_CACHE_LAYOUT
+    pasta_original = PASTA_CACHE_LAYOUT
+    with tempfile.TemporaryDirectory() as pasta:
+        PASTA_CACHE_LAYOUT = pasta
+        try:
+            layout_hierarquico(G)
+            inicio = time.perf_counter()
+            layout_hierarquico(G)
+            print(f"  Layout (em cache):   {time.perf_counter() - inicio:.2f} s")
+            inicio = time.perf_counter()
+            desenhar_topologia(G, arquivo=os.path.join(pasta, "topologia.png"))
+            print(f"  Desenho em PNG:      {time.perf_counter() - inicio:.2f} s")
+        finally:
+            PASTA_CACHE_LAYOUT = pasta_original
+
+
+###############################################
+# FUNÇÃO PARA DESENHAR A TOPOLOGIA DA REDE (MELHORADA)
+###############################################
+def desenhar_topologia(G, arquivo=None, limite_hosts=None, cache=True):
+    """
+    Desenha a topologia com o layout hierárquico (layout_hierarquico). Subredes
+    com mais de `limite_hosts` hosts aparecem como um único nó "N hosts".
+    Com `arquivo` (.png, .svg, .pdf...) a figura é salva sem abrir janela;
+    sem ele, plt.show() é chamado. Retorna o caminho salvo (ou None).
+    """
+    import matplotlib.pyplot as plt
+    desenho = layout_hierarquico(G, limite_hosts, cache)
+    nomes, tipos, xy = desenho["nomes"], desenho["tipos"], desenho["xy"]
+    n = len(nomes)
+    largura = max(float(xy[:, 0].max()) - float(xy[:, 0].min()), 1.0) if n else 1.0
+    fig, ax = plt.subplots(figsize=(min(max(16, largura * 0.6), 80), 12))
+    tamanho_no = 2000 if n <= 40 else max(2000 * 40 / n, 30)
+
+    # Arestas em uma LineCollection por tipo de enlace (uma chamada de desenho para milhares)
+    from matplotlib.collections import LineCollection
+    arestas, tipos_enlace = desenho["arestas"], desenho["tipos_enlace"]
+    for codigo, tipo_enlace in enumerate(TIPOS_ENLACE_DESENHO):
+        selecionadas = arestas[tipos_enlace == codigo]
+        if len(selecionadas):
+            cor, espessura = ESTILO_ENLACE.get(tipo_enlace, ('gray', 1.5))
+            ax.add_collection(LineCollection(xy[selecionadas], colors=cor, linewidths=espessura,
+                                             alpha=0.8, zorder=1))
+
+    for codigo, tipo in enumerate(TIPOS_NO_DESENHO):
+        selecionados = tipos == codigo
+        if selecionados.any():
+            ax.scatter(xy[selecionados, 0], xy[selecionados, 1], s=tamanho_no, c=CORES_NO.get(tipo, '#D3D3D3'),
+                       edgecolors='black', linewidths=1.5, zorder=2)
+    if n <= LIMITE_ROTULOS:
+        for nome, (x, y) in zip(nomes, xy):
+            ax.text(x, y, nome, ha='center', va='center', fontsize=10 if n <= 40 else 7,
+                    fontweight='bold', family='sans-serif', zorder=3)
+
+    # Legenda personalizada
+    import matplotlib.patches as mpatches
+    from matplotlib.lines import Line2D
+    presentes = set(tipos.tolist())
+    legend_elements = [
+        mpatches.Patch(facecolor=CORES_NO[tipo], edgecolor='black', label=tipo)
+        for codigo, tipo in enumerate(TIPOS_NO_DESENHO) if codigo < 4 or codigo in presentes
+    ] + [
+        Line2D([0], [0], color='#8A2BE2', lw=3, label='Fibra Óptica'),
+        Line2D([0], [0], color='#1E90FF', lw=2, label='Par Trançado')
+    ]
+    ax.legend(handles=legend_elements, loc='upper left', fontsize=12,
+              frameon=True, facecolor='white', edgecolor='black')
+
+    ax.set_title("Topologia de Rede - Árvore Hierárquica", fontsize=16, fontweight='bold')
+    ax.margins(0.05, 0.1)
+    ax.axis('off')
+    fig.tight_layout()
+    if arquivo is None:
+        plt.show()
+        return None
+    fig.savefig(arquivo)
+    plt.close(fig)
+    return arquivo
+
+
+def _tela_disponivel():
+    """Há uma janela onde desenhar? (backends não interativos: Agg, SVG, PDF...)"""
+    import matplotlib.pyplot as plt
+    return plt.get_backend().lower() not in ("agg", "svg", "pdf", "ps", "cairo", "pgf", "template")
+
+
+def exibir_topologia(G, arquivo_padrao="topologia.png"):
+    """
+    Mostra a topologia em uma janela se houver tela e o grafo for pequeno;
+    caso contrário grava em `arquivo_padrao`, para nunca bloquear o programa.
+    """
+    if _tela_disponivel() and G.number_of_nodes() <= LIMITE_NOS_INTERATIVO:
+        desenhar_topologia(G)
+    else:
+        desenhar_topologia(G, arquivo=arquivo_padrao)
+        print(f"Topologia salva em '{arquivo_padrao}'.")
+
+
+###############################################
+# RELATÓRIOS SOB DEMANDA (FILTROS, PAGINAÇÃO E EXPORTAÇÃO)
+###############################################
+LINHAS_POR_PAGINA = 50
+FORMATOS_RELATORIO = ("jsonl", "csv")
+# Colunas de cada relatório, para o CSV ter cabeçalho mesmo sem nenhuma linha
+COLUNAS_RELATORIO = {
+    "enderecos": ("dispositivo", "ip", "tipo"),
+    "subredes": ("subrede", "roteador", "rede", "mascara", "capacidade", "hosts"),
+    "enlaces": ("de", "para", "tipo_enlace", "capacidade", "mtu"),
+}
+
+
+def _paginar(nomes, pagina, por_pagina):
+    """Só a página pedida (a partir de 1): fatia de lista ou islice de um iterável."""
+    if not por_pagina:
+        return nomes
+    inicio = (max(pagina, 1) - 1) * por_pagina
+    if isinstance(nomes, list):
+        return nomes[inicio:inicio + por_pagina]
+    return itertools.islice(nomes, inicio, inicio + por_pagina)
+
+
+def _validar_roteador(subredes, roteador):
+    if roteador is not None and all(info["roteador"] != roteador for info in subredes.values()):
+        raise ValueError(f"Roteador '{roteador}' não encontrado nas subredes da rede.")
+
+
+def _dispositivos_de(subredes, subrede=None, roteador=None):
+    """
+    Dispositivos da subrede (switch de borda e hosts) e/ou do roteador (ele, e os
+    switches e hosts das suas subredes); None se não houver filtro.
+    """
+    if subrede is None and roteador is None:
+        return None
+    if subredes is None:
+        raise ValueError("Filtrar por subrede ou roteador exige o dicionário de subredes.")
+    if subrede is not None and subrede not in subredes:
+        raise ValueError(f"Subrede '{subrede}' não encontrada na rede.")
+    _validar_roteador(subredes, roteador)
+    dispositivos = {roteador} if roteador is not None and subrede is None else set()
+    for nome in ([subrede] if subrede is not None else subredes):
+        info = subredes[nome]
+        if roteador is None or info["roteador"] == roteador:
+            dispositivos.add(f"Switch {nome}")
+            dispositivos.update(info["hosts"])
+    return dispositivos
+
+
+def linhas_enderecos(enderecos_ip, G=None, subredes=None, subrede=None, roteador=None, tipo=None,
+                     pagina=1, por_pagina=None, ordenar=True):
+    """
+    Linhas da tabela de endereços ({"dispositivo", "ip"} e, com G, "tipo"),
+    geradas sob demanda. A ordem alfabética vem do índice de ordenação da
+    TabelaEnderecos (sem ordenar a tabela a cada chamada); com ordenar=False,
+    a ordem é a de criação. Filtros: subrede, roteador e tipo de dispositivo
+    (este exige G). Com por_pagina, só a página `pagina` (a partir de 1) é gerada.
+    """
+    if tipo is not None and G is None:
+        raise ValueError("Filtrar por tipo de dispositivo exige o grafo da rede.")
+    selecionados = _dispositivos_de(subredes, subrede, roteador)
+    if selecionados is None:
+        nomes = (enderecos_ip.ordenados() if hasattr(enderecos_ip, "ordenados") else sorted(enderecos_ip)) \
+            if ordenar else iter(enderecos_ip)
+    else:
+        selecionados = {nome for nome in selecionados if nome in enderecos_ip}
+        if ordenar and len(selecionados) * 16 < len(enderecos_ip):
+            nomes = sorted(selecionados)  # poucos dispositivos: mais barato que percorrer o índice
+        else:
+            base = (enderecos_ip.ordenados() if hasattr(enderecos_ip, "ordenados") else sorted(enderecos_ip)) \
+                if ordenar else enderecos_ip
+            nomes = (nome for nome in base if nome in selecionados)
+    tipos = G.nodes(data="tipo") if G is not None else None
+    if tipo is not None:
+        nomes = (nome for nome in nomes if tipos[nome] == tipo)
+    return _gerar_linhas_enderecos(_paginar(nomes, pagina, por_pagina), enderecos_ip, tipos)
+
+
+def _gerar_linhas_enderecos(nomes, enderecos_ip, tipos):
+    for nome in nomes:
+        if tipos is None:
+            yield {"dispositivo": nome, "ip": enderecos_ip[nome]}
+        else:
+            yield {"dispositivo": nome, "ip": enderecos_ip[nome], "tipo": tipos[nome]}
+
+
+def linhas_subredes(subredes, roteador=None, pagina=1, por_pagina=None):
+    """Uma linha por subrede: roteador, bloco CIDR, máscara, capacidade e hosts."""
+    _validar_roteador(subredes, roteador)
+    nomes = (nome for nome, info in subredes.items() if roteador is None or info["roteador"] == roteador)
+    return _gerar_linhas_subredes(_paginar(nomes, pagina, por_pagina), subredes)
+
+
+def _gerar_linhas_subredes(nomes, subredes):
+    for nome in nomes:
+        info = subredes[nome]
+        yield {"subrede": nome, "roteador": info["roteador"],
+               "rede": f"{int_para_ip(info['rede'])}/{info['prefixo']}" if "rede" in info else None,
+               "mascara": info["mask"], "capacidade": info["capacidade"], "hosts": len(info["hosts"])}
+
+
+def linhas_enlaces(especificacoes_rede, subredes=None, subrede=None, roteador=None, tipo_enlace=None,
+                   pagina=1, por_pagina=None):
+    """
+    Uma linha por enlace da lista "Enlaces" ({"de", "para", "tipo_enlace",
+    "capacidade", "mtu"}), com os mesmos filtros de linhas_enderecos e por tipo de enlace.
+    """
+    selecionados = _dispositivos_de(subredes, subrede, roteador)
+    enlaces = (enlace for enlace in especificacoes_rede.get("Enlaces", ())
+               if (selecionados is None or enlace[0] in selecionados or enlace[1] in selecionados)
+               and (tipo_enlace is None or enlace[2].get("tipo_enlace") == tipo_enlace))
+    for u, v, atributos in _paginar(enlaces, pagina, por_pagina):
+        yield {"de": u, "para": v, "tipo_enlace": atributos.get("tipo_enlace"),
+               "capacidade": atributos.get("capacidade"), "mtu": atributos.get("mtu")}
+
+
+def resumo_configuracao(especificacoes_rede):
+    """Especificações da rede com a lista "Enlaces" resumida em totais (geral e por tipo)."""
+    resumo = {chave: valor for chave, valor in especificacoes_rede.items() if chave != "Enlaces"}
+    por_tipo = Counter(atributos.get("tipo_enlace") for _, _, atributos in especificacoes_rede.get("Enlaces", ()))
+    resumo["Total de Enlaces"] = sum(por_tipo.values())
+    for tipo, quantidade in por_tipo.items():
+        resumo[f"Enlaces ({tipo})"] = quantidade
+    return resumo
+
+
+def exportar_relatorio(linhas, destino, formato="jsonl", tamanho_buffer=1 << 20, lote=10_000, colunas=None):
+    """
+    Grava as linhas (dicionários) em JSON Lines ou CSV, em blocos de `lote`
+    linhas, por um arquivo com buffer de `tamanho_buffer` bytes. `destino` é um
+    caminho ou um arquivo de texto já aberto (ex.: sys.stdout). As colunas do
+    CSV são as chaves da primeira linha; sem linhas, o CSV recebe só o
+    cabeçalho de `colunas` (se dadas). Retorna o número de linhas gravadas.
+    """
+    if formato not in FORMATOS_RELATORIO:
+        raise ValueError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS_RELATORIO)})")
+    import csv
+    arquivo = destino
+    if isinstance(destino, (str, os.PathLike)):
+        arquivo = open(destino, "w", encoding="utf-8", newline="", buffering=tamanho_buffer)
+    try:
+        linhas = iter(linhas)
+        escritor = None
+        total = 0
+        for bloco in iter(lambda: list(itertools.islice(linhas, lote)), []):
+            if formato == "jsonl":
+                _escrever_jsonl(arquivo, bloco)
+            else:
+                if escritor is None:
+                    escritor = csv.DictWriter(arquivo, fieldnames=list(bloco[0]), lineterminator="\n")
+                    escritor.writeheader()
+                escritor.writerows(bloco)
+            total += len(bloco)
+        if formato == "csv" and escritor is None and colunas:
+            csv.DictWriter(arquivo, fieldnames=list(colunas), lineterminator="\n").writeheader()
+    finally:
+        if arquivo is not destino:
+            arquivo.close()
+    return total
+
+
+def imprimir_paginas(linhas, formatar, por_pagina=None, lote=10_000):
+    """
+    Imprime as linhas com uma escrita no stdout por página (ou por bloco de
+    `lote` linhas, sem paginação). Entre as páginas, Enter avança e q encerra.
+    Retorna o número de linhas impressas.
+    """
+    linhas = iter(linhas)
+    tamanho = por_pagina or lote
+    proximo = list(itertools.islice(linhas, tamanho))
+    total = 0
+    while proximo:
+        bloco, proximo = proximo, list(itertools.islice(linhas, tamanho))
+        sys.stdout.write("".join(map(formatar, bloco)))
+        total += len(bloco)
+        if por_pagina and proximo:
+            sys.stdout.flush()
+            if input("-- Enter: próxima página, q: encerrar -- ").strip().lower() == "q":
+                break
+    return total
+
+
+def _perguntar_filtros():
+    """Lê filtros do menu no formato 'subrede=e1, roteador=a1, tipo=Host' (vazio = sem filtro)."""
+    texto = input("Filtros (ex.: subrede=e1, roteador=a1, tipo=Host; Enter = todos): ").strip()
+    filtros = {}
+    for item in filter(None, (parte.strip() for parte in texto.split(","))):
+        chave, _, valor = item.partition("=")
+        chave = chave.strip().lower()
+        if chave not in ("subrede", "roteador", "tipo") or not valor.strip():
+            raise ValueError(f"Filtro inválido: '{item}' (use subrede=, roteador= ou tipo=).")
+        filtros[chave] = valor.strip()
+    return filtros
+
+
+def benchmark_relatorios(hosts=10**6, por_pagina=LINHAS_POR_PAGINA, semente=0):
+    """
+    Tabela de endereços de uma rede grande: ordenação a cada chamada × índice de
+    ordenação, páginas, filtros e exportação CSV/JSONL (conferindo o conteúdo).
+    """
+    import tempfile
+    import csv
+    import io
+    G, subredes, enderecos_ip, _, _, _, _, especificacoes_rede = construir_rede(
+        gerar_especificacao(100, 10, max(hosts // 1000, 1), semente=semente))
+    print(f"Tabela com {len(enderecos_ip)} endereços")
+    inicio = time.perf_counter()
+    saida = io.StringIO()
+    for dispositivo, ip in sorted(enderecos_ip.items())[:por_pagina]:
+        saida.write(f"{dispositivo:<25} {ip:<15}\n")
+    print(f"  Ordenando a tabela a cada chamada (1ª página):  {(time.perf_counter() - inicio) * 1e3:9.1f} ms")
+    inicio = time.perf_counter()
+    enderecos_ip.ordenados()
+    print(f"  Montagem do índice de ordenação (uma vez):      {(time.perf_counter() - inicio) * 1e3:9.1f} ms")
+    for pagina in (1, len(enderecos_ip) // por_pagina):
+        inicio = time.perf_counter()
+        linhas = list(linhas_enderecos(enderecos_ip, G, pagina=pagina, por_pagina=por_pagina))
+        print(f"  Página {pagina:>6} pelo índice:                    {(time.perf_counter() - inicio) * 1e3:9.3f} ms")
+    inicio = time.perf_counter()
+    linhas = list(linhas_enderecos(enderecos_ip, G, subredes, subrede="e500"))
+    print(f"  Filtro por subrede ({len(linhas)} linhas):            {(time.perf_counter() - inicio) * 1e3:9.3f} ms")
+    inicio = time.perf_counter()
+    quantidade = sum(1 for _ in linhas_enderecos(enderecos_ip, G, subredes, roteador="a7"))
+    print(f"  Filtro por roteador ({quantidade} linhas):        {(time.perf_counter() - inicio) * 1e3:9.1f} ms")
+
+    novo = "Host e1-zz"
+    enderecos_ip[novo] = "10.255.255.254"
+    if enderecos_ip.ordenados() != sorted(enderecos_ip):
+        raise AssertionError("Índice de ordenação desatualizado após inclusão.")
+    del enderecos_ip[novo]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for formato in FORMATOS_RELATORIO:
+            caminho = os.path.join(pasta, f"enderecos.{formato}")
+            inicio = time.perf_counter()
+            total = exportar_relatorio(linhas_enderecos(enderecos_ip, G), caminho, formato)
+            decorrido = time.perf_counter() - inicio
+            print(f"  Exportação {formato.upper():5s}: {total / decorrido:12,.0f} linhas/s "
+                  f"({os.path.getsize(caminho) / 1e6:.1f} MB)")
+            with open(caminho, encoding="utf-8", newline="") as arquivo:
+                lidas = list(csv.DictReader(arquivo)) if formato == "csv" else [json.loads(l) for l in arquivo]
+            if [linha["dispositivo"] for linha in lidas] != enderecos_ip.ordenados() or \
+                    any(linha["ip"] != enderecos_ip[linha["dispositivo"]] for linha in lidas[::997]):
+                raise AssertionError(f"Exportação {formato} não confere com a tabela.")
+    inicio = time.perf_counter()
+    resumo = resumo_configuracao(especificacoes_rede)
+    print(f"  Resumo da configuração ({resumo['Total de Enlaces']} enlaces): "
+          f"{(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+
+###############################################
+# FUNÇÕES DE EXIBIÇÃO DE CONFIGURAÇÃO E IPs
+###############################################
+def exibir_enderecos_ip(enderecos_ip, G=None, subredes=None, subrede=None, roteador=None, tipo=None,
+                        por_pagina=None):
+    """Tabela de endereços em ordem alfabética, com filtros opcionais e paginação (ver linhas_enderecos)."""
+    linhas = linhas_enderecos(enderecos_ip, G, subredes, subrede, roteador, tipo)
+    print("\n==== Tabela de Endereços IP ====")
+    print(f"{'Dispositivo':<25} {'Endereço IP':<15}")
+    print("-" * 40)
+    imprimir_paginas(linhas, lambda linha: f"{linha['dispositivo']:<25} {linha['ip']:<15}\n", por_pagina)
+    print("-" * 40)
+
+
+def exibir_configuracao_rede(subredes, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede, enderecos_ip, por_pagina=None):
+    print("\n==== Configuração da Rede ====")
+    for chave, valor in resumo_configuracao(especificacoes_rede).items():
+        print(f"{chave}: {valor}")
+    print("\n---- Endereços IP ----")
+    exibir_enderecos_ip(enderecos_ip, por_pagina=por_pagina)
+
+
+###############################################
+# FUNÇÕES DE PING E TRACEROUTE
+###############################################
+def _alcancavel(G, origem, destino):
+    """Teste de alcançabilidade: O(1) pelo índice de percursos, ou BFS no networkx."""
+    indice = obter_indice_percursos(G)
+    if indice is not None:
+        return indice.alcancavel(origem, destino)
+    return nx.has_path(G, origem, destino)
+
+
+def ping(G, enderecos_ip, origem, destino, contagem=4, intervalo=1.0, tamanho=56, semente=None, eventos=False):
+    """
+    Ping simulado com `contagem` sondas de `tamanho` bytes a cada `intervalo` s.
+    Por padrão as sondas vêm do modelo de latência em bloco (sondar: atraso por
+    salto pelo tipo, capacidade e tamanho, mais fila e perda do tráfego de
+    fundo), o mesmo da CLI, do servidor e do ping em lote. Com eventos=True os
+    echo requests/replies ICMP atravessam o simulador de eventos, datagrama a
+    datagrama, em uma rede sem outro tráfego: o RTT sai igual ao de sondar com
+    trafego_fundo=False. Retorna o resumo no estilo do ping do Linux.
+    """
+    if origem not in enderecos_ip or destino not in enderecos_ip:
+        return f"Ping de {origem} para {destino}: Falha (host inexistente)\n"
+    if not _alcancavel(G, origem, destino):
+        return f"Ping de {origem} para {destino}: Falha (sem rota disponível)\n"
+    if eventos:
+        rtts = SimuladorEventos(G, enderecos_ip, semente=semente).ping(origem, destino, contagem, intervalo, tamanho)
+        rtt_ms = np.full(contagem, np.nan)
+        rtt_ms[:len(rtts)] = np.array(rtts) * 1e3
+        resumo = estatisticas_rtt(rtt_ms)
+    else:
+        resumo = sondar(G, origem, destino, contagem, intervalo, tamanho, semente)
+    return formatar_ping(origem, destino, enderecos_ip, resumo, tamanho)
+
+
+def traceroute(G, enderecos_ip, origem, destino, fibs=None):
+    """
+    Traceroute simulado. Com fibs (ver construir_fibs), cada salto é decidido pela
+    consulta LPM ao endereço IP do destino; sem elas, o caminho vem do índice de
+    percursos do grafo (ou do menor caminho no networkx, para um nx.Graph comum).
+    """
+    if origem not in enderecos_ip or destino not in enderecos_ip:
+        return f"Traceroute de {origem} para {destino}: Sem rota disponível\n"
+    indice = obter_indice_percursos(G)
+    if fibs is not None:
+        caminho = encaminhar(fibs, enderecos_ip, origem, destino)
+    elif indice is not None:
+        caminho = indice.caminho(origem, destino)
+    elif nx.has_path(G, origem, destino):
+        caminho = nx.shortest_path(G, origem, destino)
+    else:
+        caminho = None
+    if caminho is not None:
+        resultado = "Traceroute:\n"
+        for i, node in enumerate(caminho):
+            resultado += f"  {i+1}. {node} ({enderecos_ip.get(node)})\n"
+        return resultado
+    else:
+        return f"Traceroute de {origem} para {destino}: Sem rota disponível\n"
+
+
+###############################################
+# MODELO DE LATÊNCIA DO PING (SONDAS EM BLOCO)
+###############################################
+# Por tipo de enlace: atraso médio de fila em cada salto (ms, distribuição
+# exponencial) e probabilidade de perda de um pacote ao atravessar o enlace
+FILA_MEDIA_MS = {'Fibra Óptica': 0.002, 'Par Trançado': 0.02}
+FILA_MEDIA_PADRAO_MS = 0.05
+PERDA_ENLACE = {'Fibra Óptica': 1e-6, 'Par Trançado': 1e-4}
+PERDA_ENLACE_PADRAO = 1e-3
+CABECALHOS_ICMP_BYTES = 28  # IPv4 (20) + ICMP echo (8), somados ao payload da sonda
+
+
+def _caminho(G, origem, destino):
+    """Caminho pelo índice de percursos (ou pelo networkx, para um nx.Graph comum); None sem rota."""
+    indice = obter_indice_percursos(G)
+    if indice is not None:
+        return indice.caminho(origem, destino)
+    return nx.shortest_path(G, origem, destino) if nx.has_path(G, origem, destino) else None
+
+
+def estatisticas_rtt(rtt_ms):
+    """
+    Resumo de um array de RTTs em ms (nan = sonda perdida), calculado em bloco:
+    enviados, recebidos, perda (%), mín/méd/máx/mdev (como o ping do Linux) e p50/p95/p99.
+    """
+    rtt_ms = np.asarray(rtt_ms, dtype=np.float64)
+    recebidos = rtt_ms[~np.isnan(rtt_ms)]
+    resumo = {"enviados": len(rtt_ms), "recebidos": len(recebidos),
+              "perda_pct": round(100 * (1 - len(recebidos) / len(rtt_ms)), 3) if len(rtt_ms) else 0.0}
+    if not len(recebidos):
+        return {**resumo, **dict.fromkeys(("min", "avg", "max", "mdev", "p50", "p95", "p99"))}
+    p50, p95, p99 = np.percentile(recebidos, (50, 95, 99)).tolist()
+    media = float(recebidos.mean())
+    return {**resumo, "min": round(float(recebidos.min()), 3), "avg": round(media, 3),
+            "max": round(float(recebidos.max()), 3),
+            "mdev": round(float(np.sqrt(max(np.mean(recebidos ** 2) - media ** 2, 0.0))), 3),
+            "p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3)}
+
+
+def sondar(G, origem, destino, contagem=100, intervalo=1.0, tamanho=56, semente=None, perda=None,
+           trafego_fundo=True):
+    """
+    Modelo de latência do ping, com todas as sondas calculadas em bloco (NumPy).
+    Em cada salto, nos dois sentidos:
+      - serialização: (tamanho + 28 bytes de cabeçalhos) × 8 / capacidade do enlace;
+      - propagação: pelo tipo de enlace (mesmo modelo físico do SimuladorEventos);
+      - fila: exponencial com média FILA_MEDIA_MS[tipo] (a soma dos saltos de um
+        mesmo tipo é sorteada de uma vez como uma gama);
+      - perda: PERDA_ENLACE[tipo] (ou `perda`, igual para todos os saltos).
+    Sondas enviadas com intervalo menor que a serialização no enlace mais lento
+    se acumulam na fila dele. Jitter e perda vêm de dois fluxos independentes
+    derivados da `semente` (resultados reprodutíveis).
+    Fila e perda representam o tráfego de fundo, que o SimuladorEventos não tem
+    (lá só as sondas ocupam os enlaces). Com trafego_fundo=False elas saem do
+    modelo (salvo `perda` explícita) e o RTT é o do SimuladorEventos.ping na
+    rede ociosa.
+    Retorna estatisticas_rtt(...) mais "caminho", "saltos", "rtt_ms"
+    (float[contagem], nan = perdida) e "instantes_s" (envio de cada sonda).
+    """
+    caminho = _caminho(G, origem, destino)
+    instantes = np.arange(contagem) * intervalo
+    if caminho is None:
+        rtt = np.full(contagem, np.nan)
+        return {"caminho": None, "saltos": -1, **estatisticas_rtt(rtt), "rtt_ms": rtt, "instantes_s": instantes}
+
+    bits = (tamanho + CABECALHOS_ICMP_BYTES) * 8
+    base_s = gargalo_s = 0.0
+    sobrevivencia = 1.0
+    filas = Counter()
+    adj = G._adj
+    for u, v in zip(caminho, caminho[1:]):
+        dados = adj[u][v]
+        tipo = dados.get('tipo_enlace')
+        serializacao = bits / capacidade_para_bps(dados.get('capacidade', '100 Mbps'))
+        base_s += serializacao + atraso_propagacao_s(tipo)
+        gargalo_s = max(gargalo_s, serializacao)
+        if trafego_fundo:
+            filas[FILA_MEDIA_MS.get(tipo, FILA_MEDIA_PADRAO_MS)] += 2  # ida e volta
+        if perda is not None:
+            sobrevivencia *= (1 - perda) ** 2
+        elif trafego_fundo:
+            sobrevivencia *= (1 - PERDA_ENLACE.get(tipo, PERDA_ENLACE_PADRAO)) ** 2
+
+    fluxo_jitter, fluxo_perda = (np.random.default_rng(s) for s in np.random.SeedSequence(semente).spawn(2))
+    rtt = np.full(contagem, 2 * base_s * 1e3)
+    for media, quantidade in filas.items():
+        rtt += fluxo_jitter.gamma(quantidade, media, contagem)
+    if intervalo < gargalo_s:
+        rtt += np.arange(contagem) * (gargalo_s - intervalo) * 1e3
+    rtt[fluxo_perda.random(contagem) >= sobrevivencia] = np.nan
+    return {"caminho": caminho, "saltos": len(caminho) - 1, **estatisticas_rtt(rtt),
+            "rtt_ms": rtt, "instantes_s": instantes}
+
+
+def formatar_ping(origem, destino, enderecos_ip, resumo, tamanho):
+    """Texto no estilo do ping do Linux para um resumo de estatisticas_rtt/sondar."""
+    texto = (f"Ping de {origem} ({enderecos_ip.get(origem)}) para {destino} ({enderecos_ip.get(destino)}), "
+             f"{tamanho} bytes de dados:\n"
+             f"  Pacotes: {resumo['enviados']} enviados, {resumo['recebidos']} recebidos, "
+             f"{resumo['perda_pct']:g}% perda\n")
+    if resumo["recebidos"]:
+        texto += (f"  rtt mín/méd/máx/mdev = {resumo['min']:.3f}/{resumo['avg']:.3f}/"
+                  f"{resumo['max']:.3f}/{resumo['mdev']:.3f} ms\n"
+                  f"  p50/p95/p99 = {resumo['p50']:.3f}/{resumo['p95']:.3f}/{resumo['p99']:.3f} ms\n")
+    return texto
+
+
+def benchmark_latencia(sondas=(10**3, 10**5, 10**6), semente=0):
+    """Sondas/s do modelo em bloco × o ping salto a salto do simulador de eventos."""
+    G, subredes, enderecos_ip = construir_rede(gerar_especificacao(4, 2, 10, semente))[:3]
+    origem, destino = subredes["e1"]["hosts"][0], subredes["e8"]["hosts"][0]
+    inicio = time.perf_counter()
+    rtts = SimuladorEventos(G, enderecos_ip).ping(origem, destino, 1000, intervalo=0.01)
+    t_eventos = time.perf_counter() - inicio
+    ocioso = sondar(G, origem, destino, 1000, intervalo=0.01, semente=semente, trafego_fundo=False)
+    if not np.allclose(ocioso["rtt_ms"], np.array(rtts) * 1e3, rtol=1e-9):
+        raise AssertionError("sondar sem tráfego de fundo diverge do ping do simulador de eventos.")
+    print(f"Ping {origem} → {destino} ({len(_caminho(G, origem, destino)) - 1} saltos)")
+    print(f"  Simulador de eventos: {1000 / t_eventos:12,.0f} sondas/s (RTT médio {np.mean(rtts) * 1e3:.3f} ms, "
+          f"igual ao modelo em bloco sem tráfego de fundo)")
+    for quantidade in sondas:
+        inicio = time.perf_counter()
+        resumo = sondar(G, origem, destino, quantidade, intervalo=0.01, semente=semente)
+        decorrido = time.perf_counter() - inicio
+        print(f"  Modelo em bloco, {quantidade:>9,} sondas: {quantidade / decorrido:12,.0f} sondas/s "
+              f"(méd {resumo['avg']:.3f} ms, p99 {resumo['p99']:.3f} ms, perda {resumo['perda_pct']:g}%)")
+    a = sondar(G, origem, destino, 1000, semente=semente)["rtt_ms"]
+    b = sondar(G, origem, destino, 1000, semente=semente)["rtt_ms"]
+    if not np.array_equal(a, b, equal_nan=True):
+        raise AssertionError("Sondas com a mesma semente deram resultados diferentes.")
+
+
+###############################################
+# PING E TRACEROUTE EM LOTE (MATRIZES DE PARES DE HOSTS)
+###############################################
+# Pesos por enlace para IndicePercursos.acumulado_raiz, no mesmo modelo de
+# sondar (funções fixas, para o acumulado de cada uma ser calculado uma vez)
+def _segundos_por_bit(dados):
+    return 1 / capacidade_para_bps(dados.get('capacidade', '100 Mbps'))
+
+
+def _propagacao_s(dados):
+    return atraso_propagacao_s(dados.get('tipo_enlace'))
+
+
+def _log_sobrevivencia(dados):
+    return np.log1p(-PERDA_ENLACE.get(dados.get('tipo_enlace'), PERDA_ENLACE_PADRAO))
+
+
+_PESOS_FILA = {}
+
+
+def _peso_fila(media):
+    """Peso que conta os saltos cuja fila tem média `media` (uma função por média)."""
+    if media not in _PESOS_FILA:
+        _PESOS_FILA[media] = lambda dados: float(
+            FILA_MEDIA_MS.get(dados.get('tipo_enlace'), FILA_MEDIA_PADRAO_MS) == media)
+    return _PESOS_FILA[media]
+
+
+def _indice_lote(G):
+    indice = obter_indice_percursos(G)
+    if indice is None:
+        indice = IndicePercursos(G)
+    indice.preparar_lote()
+    if not indice.arvore:
+        raise ValueError("Consultas em lote exigem uma topologia em árvore.")
+    return indice
+
+
+def _ids_pares(indice, pares):
+    """Converte pares (lista de tuplas de nomes ou array N×2 de ids) em dois arrays de ids."""
+    if isinstance(pares, np.ndarray) and np.issubdtype(pares.dtype, np.integer):
+        return pares[:, 0].astype(np.int64), pares[:, 1].astype(np.int64)
+    if not len(pares):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    origens, destinos = zip(*pares)
+    return indice.ids_de(origens), indice.ids_de(destinos)
+
+
+def pares_entre_subredes(G, subredes, subrede_origem, subrede_destino):
+    """
+    Todos os pares (host de X, host de Y) como array N×2 de ids do índice de
+    percursos, pronto para ping_lote/traceroute_lote (sem criar tuplas por par).
+    """
+    indice = _indice_lote(G)
+    origens = indice.ids_de(subredes[subrede_origem]["hosts"])
+    destinos = indice.ids_de(subredes[subrede_destino]["hosts"])
+    return np.column_stack((np.repeat(origens, len(destinos)), np.tile(destinos, len(origens))))
+
+
+def ping_lote(G, pares, semente=None, tamanho=56, perda=None, trafego_fundo=True):
+    """
+    Ping simulado (uma sonda) para muitos pares de uma vez, com o mesmo modelo
+    de latência de sondar: serialização, propagação, fila e perda em cada enlace,
+    nos dois sentidos (fila e perda só com trafego_fundo, como em sondar). As somas por caminho vêm do índice de percursos
+    (IndicePercursos.soma_caminhos), tudo em bloco.
+    Retorna {"alcancavel": bool[N], "saltos": int[N] (-1 = sem rota),
+             "latencia_ms": float[N] (nan = sem rota ou sonda perdida)}.
+    """
+    indice = _indice_lote(G)
+    u, v = _ids_pares(indice, pares)
+    saltos = indice.distancia_lote(u, v)
+    alcancavel = saltos >= 0
+    latencia = np.full(len(saltos), np.nan)
+    ok = np.nonzero(alcancavel)[0]
+    if len(ok):
+        a, b = u[ok], v[ok]
+        lca = indice.lca_lote(a, b)
+
+        def no_caminho(peso):
+            return indice.soma_caminhos(peso, a, b, lca)
+
+        bits = (tamanho + CABECALHOS_ICMP_BYTES) * 8
+        latencia_ok = 2e3 * (bits * no_caminho(_segundos_por_bit) + no_caminho(_propagacao_s))
+        fluxo_jitter, fluxo_perda = (np.random.default_rng(s) for s in np.random.SeedSequence(semente).spawn(2))
+        if trafego_fundo:
+            for media in sorted({*FILA_MEDIA_MS.values(), FILA_MEDIA_PADRAO_MS}):
+                latencia_ok += fluxo_jitter.gamma(2 * np.rint(no_caminho(_peso_fila(media))), media)
+        if perda is not None:
+            sobrevivencia = (1 - perda) ** (2 * saltos[ok])
+        elif trafego_fundo:
+            sobrevivencia = np.exp(2 * no_caminho(_log_sobrevivencia))
+        else:
+            sobrevivencia = 1.0
+        latencia_ok[fluxo_perda.random(len(ok)) >= sobrevivencia] = np.nan
+        latencia[ok] = np.round(latencia_ok, 3)
+    return {"alcancavel": alcancavel, "saltos": saltos, "latencia_ms": latencia}
+
+
+def traceroute_lote(G, pares):
+    """
+    Traceroute para muitos pares: número de saltos em bloco (array) e a lista de
+    nós de cada caminho (None onde não há rota).
+    """
+    indice = _indice_lote(G)
+    u, v = _ids_pares(indice, pares)
+    saltos = indice.distancia_lote(u, v)
+    lca = indice.lca_lote(u, v)
+    nomes, pai = indice.nomes, indice.pai
+    caminhos = []
+    for a, b, w in zip(u.tolist(), v.tolist(), lca.tolist()):
+        if w < 0:
+            caminhos.append(None)
+            continue
+        subida, descida = [], []
+        while a != w:
+            subida.append(nomes[a])
+            a = pai[a]
+        while b != w:
+            descida.append(nomes[b])
+            b = pai[b]
+        subida.append(nomes[w])
+        subida.extend(reversed(descida))
+        caminhos.append(subida)
+    return {"alcancavel": saltos >= 0, "saltos": saltos, "caminhos": caminhos}
+
+
+def ping_lote_subredes(G, subredes):
+    """Opção do menu: ping entre todos os hosts de duas subredes, com resumo."""
+    subrede_origem = input("Subrede de origem (ex.: e1): ").strip()
+    subrede_destino = input("Subrede de destino (ex.: e2): ").strip()
+    for subrede in (subrede_origem, subrede_destino):
+        if subrede not in subredes:
+            print(f"Subrede '{subrede}' não encontrada na rede.\n")
+            return
+    pares = pares_entre_subredes(G, subredes, subrede_origem, subrede_destino)
+    if not len(pares):
+        print("Nenhum par de hosts entre as subredes informadas.\n")
+        return
+    resultado = ping_lote(G, pares)
+    alcancaveis = resultado["alcancavel"]
+    print(f"\nPing em lote {subrede_origem} × {subrede_destino}: {len(pares)} pares")
+    print(f"  Alcançáveis: {alcancaveis.sum()} ({100 * alcancaveis.mean():.1f}%)")
+    if alcancaveis.any():
+        latencias = resultado["latencia_ms"][alcancaveis]
+        respondidas = latencias[~np.isnan(latencias)]
+        print(f"  Saltos: mín {resultado['saltos'][alcancaveis].min()}, máx {resultado['saltos'][alcancaveis].max()}")
+        print(f"  Sondas perdidas: {len(latencias) - len(respondidas)}")
+        if len(respondidas):
+            print(f"  Latência: média {respondidas.mean():.3f} ms, máx {respondidas.max():.3f} ms")
+        print()
+
+
+###############################################
+# SIMULADOR DE EVENTOS DISCRETOS (DATAGRAMAS SALTO A SALTO)
+###############################################
+# Modelo físico dos enlaces: propagação a 2/3 da velocidade da luz e comprimento
+# típico de cada meio (backbone em fibra, cabeamento horizontal em par trançado)
+VELOCIDADE_PROPAGACAO_M_S = 2e8
+COMPRIMENTO_ENLACE_M = {'Fibra Óptica': 2000, 'Par Trançado': 100}
+COMPRIMENTO_ENLACE_PADRAO_M = 100
+# Dispositivos de camada 3: decrementam o TTL ao encaminhar
+TIPOS_ROTEADOR = ('Switch Central', 'Roteador de Agregação')
+
+_PREFIXOS_BPS = {'': 1, 'k': 1e3, 'm': 1e6, 'g': 1e9, 't': 1e12}
+
+
+def capacidade_para_bps(capacidade):
+    """Converte a capacidade de um enlace ("100 Mbps", "1 Gbps", 1e9...) em bits/s."""
+    if isinstance(capacidade, (int, float)):
+        return float(capacidade)
+    texto = capacidade.strip().lower().replace(" ", "")
+    numero = texto.rstrip("abcdefghijklmnopqrstuvwxyz/")
+    unidade = texto[len(numero):]
+    for sufixo in ("/s", "bps", "b", "bit"):
+        if unidade.endswith(sufixo):
+            unidade = unidade[:-len(sufixo)]
+    if unidade not in _PREFIXOS_BPS or not numero:
+        raise ValueError(f"Capacidade de enlace inválida: {capacidade!r}")
+    return float(numero) * _PREFIXOS_BPS[unidade]
+
+
+def atraso_propagacao_s(tipo_enlace):
+    """Atraso de propagação (s) de um enlace, a partir do seu tipo."""
+    return COMPRIMENTO_ENLACE_M.get(tipo_enlace, COMPRIMENTO_ENLACE_PADRAO_M) / VELOCIDADE_PROPAGACAO_M_S
+
+
+class Enlace:
+    """
+    Um sentido de um enlace (u → v) com transmissor FIFO e fila finita.
+    Políticas de descarte:
+      - 'fifo': drop-tail quando a fila (sem contar o pacote em transmissão) está cheia;
+      - 'red': Random Early Detection sobre a média móvel (EWMA) do tamanho da fila.
+    Guarda séries temporais (janelas de `intervalo` s) de bits transmitidos,
+    ocupação máxima da fila e descartes, para localizar gargalos. Datagramas
+    maiores que o `mtu` são fragmentados pelo simulador antes de entrar no enlace.
+    """
+    __slots__ = ("origem", "destino", "bps", "propagacao", "capacidade_fila", "politica",
+                 "red_min", "red_max", "red_pmax", "red_peso", "media_fila", "rng",
+                 "_saidas", "livre_em", "intervalo", "mtu", "bits", "fila_maxima", "descartes_janela",
+                 "pacotes", "bits_transmitidos", "descartes")
+
+    def __init__(self, origem, destino, bps, propagacao, capacidade_fila=100, politica="fifo",
+                 intervalo=1e-3, rng=None, red_min=None, red_max=None, red_pmax=0.1, red_peso=0.002,
+                 mtu=MTU_PADRAO):
+        if politica not in ("fifo", "red"):
+            raise ValueError(f"Política de fila desconhecida: {politica!r}")
+        self.origem, self.destino = origem, destino
+        self.bps = bps
+        self.propagacao = propagacao
+        self.capacidade_fila = capacidade_fila
+        self.politica = politica
+        self.red_min = capacidade_fila / 4 if red_min is None else red_min
+        self.red_max = capacidade_fila * 3 / 4 if red_max is None else red_max
+        self.red_pmax = red_pmax
+        self.red_peso = red_peso
+        self.media_fila = 0.0
+        self.rng = rng or random.Random(0)
+        self._saidas = deque()  # fim de transmissão de cada pacote ainda no enlace
+        self.livre_em = 0.0
+        self.intervalo = intervalo
+        self.mtu = mtu
+        self.bits = array("d")
+        self.fila_maxima = array("I")
+        self.descartes_janela = array("I")
+        self.pacotes = 0
+        self.bits_transmitidos = 0
+        self.descartes = 0
+
+    def _janela(self, serie, instante):
+        janela = int(instante / self.intervalo)
+        if janela >= len(serie):
+            serie.extend([0] * (janela + 1 - len(serie)))
+        return janela
+
+    def ocupacao(self, instante):
+        """Pacotes no enlace (na fila + em transmissão) no instante dado."""
+        saidas = self._saidas
+        while saidas and saidas[0] <= instante:
+            saidas.popleft()
+        return len(saidas)
+
+    def transmitir(self, instante, bits):
+        """
+        Enfileira um pacote de `bits` bits chegando em `instante`. Retorna o
+        instante de chegada na outra ponta, ou None se o pacote foi descartado.
+        """
+        na_fila = max(self.ocupacao(instante) - 1, 0)
+        if self.politica == "red":
+            self.media_fila += self.red_peso * (na_fila - self.media_fila)
+            media = self.media_fila
+            descartar = na_fila >= self.capacidade_fila or media >= self.red_max or (
+                media > self.red_min and
+                self.rng.random() < self.red_pmax * (media - self.red_min) / (self.red_max - self.red_min))
+        else:
+            descartar = na_fila >= self.capacidade_fila
+        if descartar:
+            self.descartes += 1
+            self.descartes_janela[self._janela(self.descartes_janela, instante)] += 1
+            return None
+
+        inicio = instante if instante > self.livre_em else self.livre_em
+        fim = inicio + bits / self.bps
+        self.livre_em = fim
+        self._saidas.append(fim)
+        self.pacotes += 1
+        self.bits_transmitidos += bits
+        # Bits creditados às janelas cobertas pela transmissão [inicio, fim)
+        serie, intervalo = self.bits, self.intervalo
+        janela = self._janela(serie, inicio)
+        limite = (janela + 1) * intervalo
+        while fim > limite:
+            serie[janela] += (limite - inicio) * self.bps
+            inicio = limite
+            janela = self._janela(serie, inicio)
+            limite += intervalo
+        serie[janela] += (fim - inicio) * self.bps
+        ocupacao = len(self._saidas)
+        janela = self._janela(self.fila_maxima, instante)
+        if ocupacao > self.fila_maxima[janela]:
+            self.fila_maxima[janela] = ocupacao
+        return fim + self.propagacao
+
+    def utilizacao(self):
+        """Série temporal de utilização (0..1) por janela, como array NumPy."""
+        return np.frombuffer(self.bits, dtype=np.float64) / (self.bps * self.intervalo)
+
+    def __repr__(self):
+        return f"Enlace({self.origem!r} → {self.destino!r}, {self.bps / 1e6:g} Mbps, {self.politica})"
+
+
+class Fluxo:
+    """Fonte de tráfego origem → destino (taxa constante ou Poisson) e suas estatísticas."""
+
+    def __init__(self, origem, destino, taxa_bps, tamanho=1500, inicio=0.0, duracao=1.0,
+                 protocolo='UDP', poisson=False):
+        self.origem, self.destino = origem, destino
+        self.taxa_bps = taxa_bps
+        self.tamanho = tamanho
+        self.inicio, self.duracao = inicio, duracao
+        self.protocolo = protocolo
+        self.poisson = poisson
+        self.enviados = 0
+        self.entregues = 0
+        self.descartados = 0
+        self.bytes_entregues = 0
+
+    @property
+    def vazao_bps(self):
+        """Vazão média entregue durante a duração do fluxo."""
+        return self.bytes_entregues * 8 / self.duracao if self.duracao else 0.0
+
+    def __repr__(self):
+        return (f"Fluxo({self.origem!r} → {self.destino!r}: {self.enviados} enviados, "
+                f"{self.entregues} entregues, {self.vazao_bps / 1e6:.2f} Mbps)")
+
+
+class SimuladorEventos:
+    """
+    Simulador de eventos discretos com fila de prioridade (heapq). Cada IPDatagram
+    enviado percorre a rota salto a salto; em cada enlace (u → v, um objeto
+    Enlace) o tempo é:
+        espera na fila + serialização (bits / capacidade) + propagação.
+    Filas cheias (ou o RED, com politica_fila='red') descartam pacotes, e
+    roteadores decrementam o TTL e descartam o datagrama quando ele chega a 0.
+    Datagramas maiores que o MTU do próximo enlace são fragmentados (ou
+    descartados, se DF=1) e remontados no host de destino por um Remontador.
+    Com captura=EscritorPcap(...), toda transmissão é gravada no pcap com o
+    instante simulado.
+    Os eventos são tuplas (instante, seq, tipo, a, b) para manter o custo por
+    evento baixo (milhões de eventos por execução).
+    """
+
+    CHEGADA = 0
+    CHAMADA = 1
+
+    def __init__(self, G, enderecos_ip=None, fibs=None, tamanho_fila=100, politica_fila="fifo",
+                 intervalo_serie=1e-3, semente=None, tempo_remontagem=TEMPO_REMONTAGEM_S, captura=None):
+        self.G = G
+        self.enderecos_ip = enderecos_ip
+        self.fibs = fibs
+        self.tamanho_fila = tamanho_fila
+        self.politica_fila = politica_fila
+        self.intervalo_serie = intervalo_serie
+        self.rng = random.Random(semente)
+        self.fluxos = []
+        self.agora = 0.0
+        self._eventos = []
+        self._seq = itertools.count()
+        self._pacotes = {}
+        self._proximo_id = 0
+        self._rotas = {}
+        self.enlaces = {}
+        self.tempo_remontagem = tempo_remontagem
+        self.remontadores = {}
+        self.fragmentados = 0
+        self.captura = captura  # EscritorPcap opcional: registra cada transmissão
+        self.fronteira = frozenset()  # nós onde um pacote pode passar para outra partição (SimuladorParalelo)
+        self._roteadores = {n for n, tipo in G.nodes(data='tipo') if tipo in TIPOS_ROTEADOR}
+        self.eventos_processados = 0
+        self.entregues = 0
+        self.descartes = Counter()
+        self.latencias = array("d")
+
+    # ---------- infraestrutura ----------
+    def _rota(self, origem, destino):
+        chave = (origem, destino)
+        if chave not in self._rotas:
+            if self.fibs is not None:
+                caminho = encaminhar(self.fibs, self.enderecos_ip, origem, destino)
+            else:
+                indice = obter_indice_percursos(self.G)
+                if indice is not None:
+                    caminho = indice.caminho(origem, destino)
+                elif nx.has_path(self.G, origem, destino):
+                    caminho = nx.shortest_path(self.G, origem, destino)
+                else:
+                    caminho = None
+            self._rotas[chave] = tuple(caminho) if caminho else None
+        return self._rotas[chave]
+
+    def enlace(self, u, v):
+        """Objeto Enlace do sentido u → v (criado no primeiro uso a partir dos atributos da aresta)."""
+        enlace = self.enlaces.get((u, v))
+        if enlace is None:
+            dados = self.G.edges[u, v]
+            enlace = Enlace(u, v, capacidade_para_bps(dados.get('capacidade', '100 Mbps')),
+                            atraso_propagacao_s(dados.get('tipo_enlace')),
+                            self.tamanho_fila, self.politica_fila, self.intervalo_serie, self.rng,
+                            mtu=int(dados.get('mtu', MTU_PADRAO)))
+            self.enlaces[(u, v)] = enlace
+        return enlace
+
+    def agendar(self, instante, funcao, *args):
+        """Agenda funcao(*args) para o instante dado (s)."""
+        heapq.heappush(self._eventos, (instante, next(self._seq), self.CHAMADA, funcao, args))
+
+    # ---------- envio e encaminhamento ----------
+    def enviar(self, origem, destino, datagrama, instante=None, ao_entregar=None, ao_descartar=None):
+        """
+        Injeta um IPDatagram na rede a partir de `origem` com destino `destino`.
+        ao_entregar(datagrama, instante, latencia) e ao_descartar(datagrama, instante, motivo)
+        são chamados no fim da vida do datagrama. Retorna o id do pacote.
+        """
+        instante = self.agora if instante is None else instante
+        pid = self._proximo_id
+        self._proximo_id += 1
+        caminho = self._rota(origem, destino)
+        if caminho is None:
+            self.descartes["sem rota"] += 1
+            if ao_descartar:
+                ao_descartar(datagrama, instante, "sem rota")
+            return pid
+        # Checksum completo só na origem; a cada salto ele é corrigido incrementalmente
+        datagrama.checksum = datagrama.compute_checksum()
+        self._pacotes[pid] = [datagrama, caminho, instante, ao_entregar, ao_descartar]
+        heapq.heappush(self._eventos, (instante, next(self._seq), self.CHEGADA, pid, 0))
+        return pid
+
+    def _descartar(self, pid, instante, motivo):
+        datagrama, _, _, _, ao_descartar = self._pacotes.pop(pid)
+        self.descartes[motivo] += 1
+        if ao_descartar:
+            ao_descartar(datagrama, instante, motivo)
+
+    def _chegada(self, instante, pid, salto):
+        pacote = self._pacotes[pid]
+        datagrama, caminho = pacote[0], pacote[1]
+        no = caminho[salto]
+        if salto == len(caminho) - 1:
+            del self._pacotes[pid]
+            if datagrama.flags & 1 or datagrama.fragment_offset:
+                remontador = self.remontadores.get(no)
+                if remontador is None:
+                    remontador = self.remontadores[no] = Remontador(self.tempo_remontagem)
+                datagrama = remontador.receber(datagrama, instante)
+                if datagrama is None:
+                    return
+            latencia = instante - pacote[2]
+            self.entregues += 1
+            self.latencias.append(latencia)
+            if pacote[3]:
+                pacote[3](datagrama, instante, latencia)
+            return
+        if salto > 0 and no in self._roteadores:
+            # TTL 1 (ou 0, se injetado assim) chegaria a 0 neste salto: descarta
+            if datagrama.ttl <= 1:
+                self._descartar(pid, instante, "ttl expirado")
+                return
+            datagrama.decrement_ttl()
+        proximo = caminho[salto + 1]
+        enlace = self.enlaces.get((no, proximo)) or self.enlace(no, proximo)
+        if datagrama.total_length > enlace.mtu:
+            self._fragmentar(pid, instante, salto, enlace)
+            return
+        if self.captura is not None:
+            self.captura.escrever_datagrama(datagrama, instante)
+        chegada = enlace.transmitir(instante, datagrama.total_length * 8)
+        if chegada is None:
+            self._descartar(pid, instante, "fila cheia" if enlace.politica == "fifo" else "descarte RED")
+            return
+        if proximo in self.fronteira and self._atravessar(pid, chegada, salto + 1):
+            return
+        heapq.heappush(self._eventos, (chegada, next(self._seq), self.CHEGADA, pid, salto + 1))
+
+    def _atravessar(self, pid, chegada, salto):
+        """
+        Chamado quando o pacote vai chegar a um nó da fronteira; retorna True se
+        ele saiu deste simulador (ver _SimuladorParticao). Aqui nunca sai.
+        """
+        return False
+
+    def _fragmentar(self, pid, instante, salto, enlace):
+        """
+        Divide o datagrama do pacote `pid` para caber no MTU do enlace. O primeiro
+        fragmento segue com o mesmo pid; os demais ganham pids novos com a mesma
+        rota e callbacks. ao_descartar é chamado uma vez só por datagrama original.
+        """
+        pacote = self._pacotes[pid]
+        datagrama = pacote[0]
+        if datagrama.flags & 2:
+            self._descartar(pid, instante, "fragmentação necessária")
+            return
+        fragmentos = fragmentar(datagrama, enlace.mtu)
+        self.fragmentados += 1
+        ao_descartar = pacote[4]
+        if ao_descartar:
+            avisado = []
+
+            def ao_descartar(fragmento, t, motivo, original=ao_descartar):
+                if not avisado:
+                    avisado.append(True)
+                    original(datagrama, t, motivo)
+            pacote[4] = ao_descartar
+        pacote[0] = fragmentos[0]
+        pids = [pid]
+        for fragmento in fragmentos[1:]:
+            novo = self._proximo_id
+            self._proximo_id += 1
+            self._pacotes[novo] = [fragmento, pacote[1], pacote[2], pacote[3], ao_descartar]
+            pids.append(novo)
+        motivo = "fila cheia" if enlace.politica == "fifo" else "descarte RED"
+        for novo, fragmento in zip(pids, fragmentos):
+            if self.captura is not None:
+                self.captura.escrever_datagrama(fragmento, instante)
+            chegada = enlace.transmitir(instante, fragmento.total_length * 8)
+            if chegada is None:
+                self._descartar(novo, instante, motivo)
+            elif not (enlace.destino in self.fronteira and self._atravessar(novo, chegada, salto + 1)):
+                heapq.heappush(self._eventos, (chegada, next(self._seq), self.CHEGADA, novo, salto + 1))
+
+    def executar(self, ate=float("inf")):
+        """Processa eventos em ordem de tempo até esvaziar a fila (ou até `ate`)."""
+        eventos, pop = self._eventos, heapq.heappop
+        chegada, tipo_chegada = self._chegada, self.CHEGADA
+        processados = 0
+        while eventos and eventos[0][0] <= ate:
+            instante, _, tipo, a, b = pop(eventos)
+            self.agora = instante
+            processados += 1
+            if tipo == tipo_chegada:
+                chegada(instante, a, b)
+            else:
+                a(*b)
+        self.eventos_processados += processados
+        return processados
+
+    # ---------- aplicações ----------
+    def ping(self, origem, destino, contagem=4, intervalo=1.0, tamanho=56, ttl=64):
+        """
+        Envia `contagem` ICMP echo requests (payload de `tamanho` bytes, mais
+        os 8 do cabeçalho ICMP, como em sondar); cada request entregue gera o
+        echo reply no sentido inverso. Retorna a lista de RTTs (s) das
+        respostas recebidas.
+        """
+        src_ip, dest_ip = self.enderecos_ip[origem], self.enderecos_ip[destino]
+        rtts = []
+
+        def responder(request, instante, latencia, enviado_em):
+            reply = IPDatagram(dest_ip, src_ip, request.payload, 'ICMP', ttl=ttl, flags='DF')
+            self.enviar(destino, origem, reply, instante,
+                        ao_entregar=lambda d, t, l: rtts.append(t - enviado_em))
+
+        for i in range(contagem):
+            enviado_em = self.agora + i * intervalo
+            request = IPDatagram(src_ip, dest_ip, b'\x00' * (tamanho + CABECALHOS_ICMP_BYTES - 20), 'ICMP',
+                                 ttl=ttl, flags='DF')
+            self.enviar(origem, destino, request, enviado_em,
+                        ao_entregar=lambda d, t, l, e=enviado_em: responder(d, t, l, e))
+        self.executar()
+        return rtts
+
+    def adicionar_fluxo(self, origem, destino, taxa_bps, tamanho=1500, inicio=0.0, duracao=1.0,
+                        protocolo='UDP', poisson=False, ttl=64):
+        """
+        Registra um fluxo que envia datagramas de `tamanho` bytes (total) à taxa
+        `taxa_bps` entre inicio e inicio + duracao. Retorna o objeto Fluxo, cujas
+        estatísticas são atualizadas durante executar().
+        """
+        fluxo = Fluxo(origem, destino, taxa_bps, tamanho, inicio, duracao, protocolo, poisson)
+        self.fluxos.append(fluxo)
+        src_ip, dest_ip = self.enderecos_ip[origem], self.enderecos_ip[destino]
+        payload = b'\x00' * max(tamanho - 20, 0)
+        periodo = tamanho * 8 / taxa_bps
+        fim = inicio + duracao
+
+        def entregue(datagrama, instante, latencia):
+            fluxo.entregues += 1
+            fluxo.bytes_entregues += datagrama.total_length
+
+        def descartado(datagrama, instante, motivo):
+            fluxo.descartados += 1
+
+        def emitir(instante):
+            fluxo.enviados += 1
+            datagrama = IPDatagram(src_ip, dest_ip, payload, protocolo, ttl=ttl)
+            self.enviar(origem, destino, datagrama, instante, entregue, descartado)
+            proximo = instante + (self.rng.expovariate(1 / periodo) if poisson else periodo)
+            if proximo < fim:
+                self.agendar(proximo, emitir, proximo)
+
+        self.agendar(inicio, emitir, inicio)
+        return fluxo
+
+    def gargalos(self, quantidade=10):
+        """
+        Enlaces mais carregados, ordenados pela utilização média no período
+        simulado: lista de (Enlace, utilização média, utilização de pico, descartes).
+        """
+        janelas = max(int(self.agora / self.intervalo_serie) + 1, 1)
+        resultado = []
+        for enlace in self.enlaces.values():
+            serie = enlace.utilizacao()
+            pico = float(serie.max()) if len(serie) else 0.0
+            resultado.append((enlace, float(serie.sum()) / janelas, pico, enlace.descartes))
+        resultado.sort(key=lambda item: (item[1], item[3]), reverse=True)
+        return resultado[:quantidade]
+
+
+def benchmark_simulador(num_pacotes=200_000, semente=0):
+    """Mede eventos/s do simulador com tráfego aleatório entre hosts."""
+    G, subredes, enderecos_ip = construir_rede(gerar_especificacao(8, 8, 50, semente=semente))[:3]
+    hosts = [h for info in subredes.values() for h in info["hosts"]]
+    rng = random.Random(semente)
+    sim = SimuladorEventos(G, enderecos_ip)
+    inicio = time.perf_counter()
+    for i in range(num_pacotes):
+        origem, destino = rng.sample(hosts, 2)
+        sim.enviar(origem, destino, IPDatagram(enderecos_ip[origem], enderecos_ip[destino], b'x' * 512, 'UDP'), i * 1e-5)
+    t_envio = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    eventos = sim.executar()
+    t_execucao = time.perf_counter() - inicio
+    latencias = np.frombuffer(sim.latencias, dtype=np.float64)
+    print(f"Simulador: {num_pacotes} datagramas, {eventos} eventos")
+    print(f"  Criação/injeção: {num_pacotes / t_envio:,.0f} datagramas/s")
+    print(f"  Execução: {eventos / t_execucao:,.0f} eventos/s ({t_execucao:.2f} s)")
+    print(f"  Entregues: {sim.entregues}, descartados: {dict(sim.descartes)}")
+    print(f"  Latência: média {latencias.mean() * 1e3:.3f} ms, máx {latencias.max() * 1e3:.3f} ms")
+
+
+###############################################
+# SIMULAÇÃO POR FLUXOS (MATRIZ DE TRÁFEGO E MAX-MIN)
+###############################################
+MODELOS_TRAFEGO = ("uniforme", "gravidade", "hotspot")
+# Capacidades comerciais de enlace consideradas no dimensionamento dos uplinks (bits/s)
+CAPACIDADES_COMERCIAIS_BPS = (1e8, 1e9, 1e10, 2.5e10, 4e10, 1e11, 4e11)
+
+
+def formatar_bps(bps):
+    """Formata bits/s no estilo das capacidades dos enlaces ("100 Mbps", "2.5 Gbps")."""
+    for prefixo, fator in (("T", 1e12), ("G", 1e9), ("M", 1e6), ("k", 1e3)):
+        if bps >= fator:
+            return f"{bps / fator:g} {prefixo}bps"
+    return f"{bps:g} bps"
+
+
+def _demanda_para_bps(valor, padrao):
+    if valor is None or valor == "":
+        return padrao
+    if isinstance(valor, str) and valor.strip().lower() == "inf":
+        return np.inf
+    return capacidade_para_bps(valor)
+
+
+def matriz_trafego(G, subredes, modelo="uniforme", fluxos=10_000, demanda_bps=1e6, semente=None,
+                   hotspots=4, fracao_hotspot=0.5, arquivo=None):
+    """
+    Matriz de tráfego host → host em forma esparsa (uma entrada por fluxo), com
+    os ids do índice de percursos:
+      - "uniforme": origem e destino sorteados uniformemente entre os hosts;
+      - "gravidade": cada host recebe um "peso" log-normal e o tráfego entre i e j
+        é proporcional a peso_i × peso_j (poucos hosts concentram o volume);
+      - "hotspot": fracao_hotspot dos fluxos vai para `hotspots` hosts sorteados
+        (servidores), o restante é uniforme;
+      - arquivo: uma demanda por linha, objeto JSON {"origem", "destino", "demanda"}
+        ou 'origem<TAB>destino<TAB>demanda' (demanda em bits/s ou "10 Mbps";
+        sem demanda, vale demanda_bps; "inf" = fluxo elástico); origem e
+        destino devem ser hosts diferentes.
+    Nos modelos sintéticos a demanda de cada fluxo é exponencial com média demanda_bps.
+    Retorna {"origens": int64[N], "destinos": int64[N], "demanda_bps": float64[N]}.
+    """
+    indice = _indice_lote(G)
+    if arquivo is not None:
+        origens, destinos, demandas = [], [], []
+        for consulta in _ler_consultas(arquivo, ("origem", "destino", "demanda")):
+            origens.append(consulta["origem"])
+            destinos.append(consulta["destino"])
+            demandas.append(_demanda_para_bps(consulta.get("demanda"), demanda_bps))
+        u, v = indice.ids_de(origens), indice.ids_de(destinos)
+        desconhecidos = sorted({nome for nome, i in zip(origens + destinos, np.concatenate((u, v)).tolist()) if i < 0})
+        if desconhecidos:
+            raise ValueError(f"Hosts desconhecidos na matriz de tráfego: {', '.join(desconhecidos[:5])}"
+                             + (" ..." if len(desconhecidos) > 5 else ""))
+        # Como nos modelos sintéticos, origem e destino são sempre hosts diferentes
+        # (um fluxo sem enlaces não teria taxa a alocar)
+        repetidos = sorted({origens[i] for i in np.nonzero(u == v)[0].tolist()})
+        if repetidos:
+            raise ValueError(f"Fluxos com origem igual ao destino na matriz de tráfego: {', '.join(repetidos[:5])}"
+                             + (" ..." if len(repetidos) > 5 else ""))
+        return {"origens": u, "destinos": v, "demanda_bps": np.array(demandas, dtype=np.float64)}
+
+    if modelo not in MODELOS_TRAFEGO:
+        raise ValueError(f"Modelo de tráfego desconhecido: {modelo!r} (use {', '.join(MODELOS_TRAFEGO)})")
+    hosts = indice.ids_de([h for info in subredes.values() for h in info["hosts"]])
+    if len(hosts) < 2:
+        raise ValueError("A matriz de tráfego exige pelo menos dois hosts.")
+    rng = np.random.default_rng(semente)
+    H = len(hosts)
+    if modelo == "gravidade":
+        peso = rng.lognormal(0.0, 1.0, H)
+        peso /= peso.sum()
+        origem = rng.choice(H, fluxos, p=peso)
+        destino = rng.choice(H, fluxos, p=peso)
+        repetido = origem == destino
+        destino[repetido] = (destino[repetido] + 1) % H
+    else:
+        origem = rng.integers(H, size=fluxos)
+        destino = rng.integers(H - 1, size=fluxos)
+        destino += destino >= origem
+        if modelo == "hotspot":
+            servidores = rng.choice(H, min(hotspots, H), replace=False)
+            para_servidor = rng.random(fluxos) < fracao_hotspot
+            destino[para_servidor] = servidores[rng.integers(len(servidores), size=int(para_servidor.sum()))]
+            repetido = origem == destino
+            origem[repetido] = (origem[repetido] + 1) % H
+    return {"origens": hosts[origem], "destinos": hosts[destino],
+            "demanda_bps": rng.exponential(demanda_bps, fluxos)}
+
+
+def _rotear_fluxos(indice, u, v):
+    """
+    Incidência fluxo × enlace dirigido (pares de arrays): cada enlace da árvore é
+    identificado pelo nó filho, 2·filho no sentido de subida (filho → pai) e
+    2·filho + 1 na descida. Sobe de u e de v até o LCA, um nível por iteração.
+    """
+    lca = indice.lca_lote(u, v)
+    pai = np.frombuffer(indice.pai, dtype=np.int32).astype(np.int64)
+    fluxos, enlaces = [], []
+    for ponta, sentido in ((u, 0), (v, 1)):
+        idx = np.nonzero(lca >= 0)[0]
+        atual = ponta[idx]
+        while len(idx):
+            anda = atual != lca[idx]
+            idx, atual = idx[anda], atual[anda]
+            fluxos.append(idx)
+            enlaces.append(2 * atual + sentido)
+            atual = pai[atual]
+    return lca >= 0, np.concatenate(fluxos), np.concatenate(enlaces)
+
+
+def _capacidade_bps(dados):
+    return capacidade_para_bps(dados.get('capacidade', '100 Mbps'))
+
+
+def _capacidades_enlaces(indice):
+    """Capacidade (bits/s) de cada enlace dirigido, no mesmo esquema de ids de _rotear_fluxos."""
+    return np.repeat(indice.peso_ate_pai(_capacidade_bps), 2)
+
+
+def alocar_max_min(fluxo, enlace, capacidade, demanda, ativo=None):
+    """
+    Taxas max-min justas por preenchimento progressivo, sobre a incidência
+    esparsa fluxo × enlace (arrays `fluxo`/`enlace` com uma entrada por enlace
+    atravessado; só participam os fluxos com enlaces e `ativo`, se informado). Em vez de subir todas as taxas em passos iguais, cada rodada
+    congela um grupo inteiro de fluxos:
+      - os que cabem na menor parcela justa dos seus enlaces ficam com a demanda;
+      - senão, os que passam por um enlace gargalo (parcela justa igual à menor
+        parcela de todos os seus fluxos) ficam com essa parcela.
+    Congelar um fluxo abaixo da parcela de um enlace nunca reduz a parcela dos
+    demais, então as rodadas são poucas (uma por nível de gargalo distinto).
+    Retorna (taxas float64[N], número de rodadas).
+    """
+    N, L = len(demanda), len(capacidade)
+    taxa = np.zeros(N)
+    participa = np.zeros(N, dtype=bool)
+    participa[fluxo] = True
+    ativo = participa & (demanda > 0) & (True if ativo is None else ativo)
+    residual = capacidade.astype(np.float64).copy()
+    # Incidência dos fluxos ainda ativos, ordenada por fluxo e por enlace;
+    # as entradas dos fluxos congelados saem dos arrays a cada rodada
+    manter = ativo[fluxo]
+    fluxo, enlace = fluxo[manter], enlace[manter]
+    ordem = np.argsort(fluxo, kind="stable")
+    fluxo_f, enlace_f = fluxo[ordem], enlace[ordem]
+    ordem = np.argsort(enlace, kind="stable")
+    fluxo_l, enlace_l = fluxo[ordem], enlace[ordem]
+    gargalo_fluxo = np.full(N, np.inf)
+    rodadas = 0
+    while len(fluxo_f):
+        rodadas += 1
+        inicio_f = np.flatnonzero(np.concatenate(([True], fluxo_f[1:] != fluxo_f[:-1])))
+        fluxos = fluxo_f[inicio_f]
+        num = np.bincount(enlace_f, minlength=L)
+        parcela = np.full(L, np.inf)
+        ocupados = num > 0
+        parcela[ocupados] = np.maximum(residual[ocupados], 0) / num[ocupados]
+        gargalo = np.minimum.reduceat(parcela[enlace_f], inicio_f)
+
+        cabe = demanda[fluxos] <= gargalo
+        if cabe.any():
+            congelados = fluxos[cabe]
+            taxa[congelados] = demanda[congelados]
+        else:
+            gargalo_fluxo[fluxos] = gargalo
+            inicio_l = np.flatnonzero(np.concatenate(([True], enlace_l[1:] != enlace_l[:-1])))
+            menor = np.full(L, np.inf)
+            menor[enlace_l[inicio_l]] = np.minimum.reduceat(gargalo_fluxo[fluxo_l], inicio_l)
+            no_gargalo = ocupados & (parcela <= menor * (1 + 1e-12))
+            selecionados = np.logical_or.reduceat(no_gargalo[enlace_f], inicio_f)
+            congelados = fluxos[selecionados]
+            taxa[congelados] = gargalo[selecionados]
+        congelado = np.zeros(N, dtype=bool)
+        congelado[congelados] = True
+        saem = congelado[fluxo_f]
+        residual -= np.bincount(enlace_f[saem], weights=taxa[fluxo_f[saem]], minlength=L)
+        fluxo_f, enlace_f = fluxo_f[~saem], enlace_f[~saem]
+        saem = congelado[fluxo_l]
+        fluxo_l, enlace_l = fluxo_l[~saem], enlace_l[~saem]
+    return taxa, rodadas
+
+
+def simular_fluxos(G, matriz):
+    """
+    Simulação em nível de fluxo (fluida): cada demanda da matriz de tráfego segue
+    o caminho da árvore e recebe sua taxa max-min justa. Retorna, além das taxas,
+    a carga oferecida (soma das demandas) e a vazão alocada por enlace dirigido:
+      {"taxa_bps", "demanda_bps", "alcancavel": por fluxo;
+       "oferta_bps", "carga_bps", "capacidade_bps": por enlace;
+       "incidencia": (fluxo, enlace) de _rotear_fluxos; "rodadas", "indice"}.
+    """
+    indice = _indice_lote(G)
+    u, v = np.asarray(matriz["origens"]), np.asarray(matriz["destinos"])
+    demanda = np.asarray(matriz["demanda_bps"], dtype=np.float64)
+    alcancavel, fluxo, enlace = _rotear_fluxos(indice, u, v)
+    capacidade = _capacidades_enlaces(indice)
+    taxa, rodadas = alocar_max_min(fluxo, enlace, capacidade, demanda, alcancavel)
+    finitas = np.isfinite(demanda[fluxo])
+    return {"taxa_bps": taxa, "demanda_bps": demanda, "alcancavel": alcancavel,
+            "oferta_bps": np.bincount(enlace[finitas], weights=demanda[fluxo[finitas]], minlength=len(capacidade)),
+            "carga_bps": np.bincount(enlace, weights=taxa[fluxo], minlength=len(capacidade)),
+            "capacidade_bps": capacidade, "rodadas": rodadas, "indice": indice,
+            "incidencia": (fluxo, enlace)}
+
+
+def carga_enlaces(resultado, quantidade=10):
+    """Os `quantidade` enlaces dirigidos mais carregados (utilização da vazão alocada)."""
+    capacidade, carga, oferta = resultado["capacidade_bps"], resultado["carga_bps"], resultado["oferta_bps"]
+    utilizacao = np.divide(carga, capacidade, out=np.zeros_like(carga), where=capacidade > 0)
+    nomes, pai = resultado["indice"].nomes, resultado["indice"].pai
+    linhas = []
+    for e in np.argsort(-utilizacao, kind="stable")[:quantidade].tolist():
+        filho, pai_no = nomes[e // 2], nomes[pai[e // 2]]
+        linhas.append({"de": filho if e % 2 == 0 else pai_no, "para": pai_no if e % 2 == 0 else filho,
+                       "capacidade": formatar_bps(capacidade[e]), "oferta_bps": round(float(oferta[e])),
+                       "carga_bps": round(float(carga[e])), "utilizacao_pct": round(100 * float(utilizacao[e]), 2)})
+    return linhas
+
+
+def dimensionar_uplinks(resultado, utilizacao_alvo=0.7):
+    """
+    Para cada uplink roteador de agregação ↔ Switch Central: carga oferecida e
+    vazão alocada em cada sentido, utilização e a menor capacidade comercial que
+    atende a maior das duas ofertas com utilização até utilizacao_alvo.
+    """
+    indice = resultado["indice"]
+    if "Switch Central" not in indice.ids:
+        return []
+    central = indice.ids["Switch Central"]
+    pai = np.frombuffer(indice.pai, dtype=np.int32)
+    capacidade, carga, oferta = resultado["capacidade_bps"], resultado["carga_bps"], resultado["oferta_bps"]
+    linhas = []
+    for r in np.nonzero(pai == central)[0].tolist():
+        subida, descida = 2 * r, 2 * r + 1
+        pico = max(oferta[subida], oferta[descida])
+        sugestao = next((c for c in CAPACIDADES_COMERCIAIS_BPS if c * utilizacao_alvo >= pico), None)
+        linhas.append({"roteador": indice.nomes[r], "capacidade": formatar_bps(capacidade[subida]),
+                       "oferta_subida_bps": round(float(oferta[subida])),
+                       "oferta_descida_bps": round(float(oferta[descida])),
+                       "vazao_subida_bps": round(float(carga[subida])),
+                       "vazao_descida_bps": round(float(carga[descida])),
+                       "utilizacao_pct": round(100 * float(max(carga[subida], carga[descida]) / capacidade[subida]), 2),
+                       "sugestao": formatar_bps(sugestao) if sugestao else "acima de "
+                       + formatar_bps(CAPACIDADES_COMERCIAIS_BPS[-1])})
+    return linhas
+
+
+def resumo_fluxos(resultado):
+    """Totais de uma simulação por fluxos: demanda, vazão e fluxos limitados pela rede."""
+    demanda, taxa, alcancavel = resultado["demanda_bps"], resultado["taxa_bps"], resultado["alcancavel"]
+    finitas = alcancavel & np.isfinite(demanda)
+    limitados = int((alcancavel & (taxa < demanda * (1 - 1e-9))).sum())
+    return {"fluxos": len(demanda), "alcancaveis": int(alcancavel.sum()),
+            "demanda_total_bps": round(float(demanda[finitas].sum())),
+            "vazao_total_bps": round(float(taxa.sum())), "limitados": limitados,
+            "atendimento_pct": round(100 * float(taxa[finitas].sum() / demanda[finitas].sum()), 2)
+            if finitas.any() and demanda[finitas].sum() > 0 else None,
+            "rodadas": resultado["rodadas"]}
+
+
+def _conferir_max_min(resultado):
+    """
+    Confere a alocação pela definição de max-min: nenhum enlace acima da
+    capacidade, e todo fluxo ou recebe a demanda ou atravessa um enlace saturado
+    onde nenhum outro fluxo recebe mais que ele.
+    """
+    taxa, demanda, capacidade, carga = (resultado[chave] for chave in
+                                        ("taxa_bps", "demanda_bps", "capacidade_bps", "carga_bps"))
+    fluxo, enlace = resultado["incidencia"]
+    if np.any(carga > capacidade * (1 + 1e-9) + 1e-6):
+        raise AssertionError("Enlace com vazão alocada acima da capacidade.")
+    saturado = carga >= capacidade * (1 - 1e-9)
+    maximo = np.zeros(len(capacidade))
+    np.maximum.at(maximo, enlace, taxa[fluxo])
+    justificado = np.zeros(len(taxa), dtype=bool)
+    ok = saturado[enlace] & (taxa[fluxo] >= maximo[enlace] * (1 - 1e-9))
+    justificado[fluxo[ok]] = True
+    pendentes = resultado["alcancavel"] & (taxa < demanda * (1 - 1e-9)) & ~justificado
+    if pendentes.any():
+        raise AssertionError(f"{int(pendentes.sum())} fluxos abaixo da demanda sem enlace gargalo.")
+
+
+def benchmark_fluxos(fluxos=(10**4, 10**5, 10**6), semente=0):
+    """Fluxos/s da simulação fluida (matriz, roteamento e max-min) em uma rede com ~100 mil hosts."""
+    inicio = time.perf_counter()
+    rede = construir_rede(gerar_especificacao(20, 50, 100, semente=semente))
+    G, subredes = rede[:2]
+    _indice_lote(G)
+    print(f"Rede com {sum(len(info['hosts']) for info in subredes.values())} hosts "
+          f"montada em {time.perf_counter() - inicio:.2f} s")
+    for modelo in MODELOS_TRAFEGO:
+        for quantidade in fluxos:
+            inicio = time.perf_counter()
+            matriz = matriz_trafego(G, subredes, modelo, quantidade, 1e6, semente)
+            t_matriz = time.perf_counter() - inicio
+            resultado = simular_fluxos(G, matriz)
+            decorrido = time.perf_counter() - inicio
+            resumo = resumo_fluxos(resultado)
+            print(f"  {modelo:9s} {quantidade:>9,} fluxos: {decorrido:6.2f} s (matriz {t_matriz:.2f} s), "
+                  f"{resumo['rodadas']:4d} rodadas, {resumo['limitados']:>9,} limitados, "
+                  f"atendimento {resumo['atendimento_pct']}%")
+            _conferir_max_min(resultado)
+    uplinks = dimensionar_uplinks(resultado)
+    mais_carregado = max(uplinks, key=lambda linha: linha["utilizacao_pct"])
+    print(f"  Uplink mais carregado: {mais_carregado['roteador']} ({mais_carregado['utilizacao_pct']}% de "
+          f"{mais_carregado['capacidade']}, sugestão {mais_carregado['sugestao']})")
+
+
+###############################################
+# SIMULAÇÃO PARALELA (UMA PARTIÇÃO POR GRUPO DE ROTEADORES)
+###############################################
+class _SimuladorParticao(SimuladorEventos):
+    """
+    SimuladorEventos de uma partição (Switch Central + alguns roteadores e as
+    suas subredes), executado em um processo filho. Um pacote que, ao chegar ao
+    Switch Central, segue para um roteador de outra partição sai por
+    _atravessar e vai para a fila de saída; o coordenador o entrega à partição
+    certa, onde ele continua do mesmo salto (importar).
+    """
+
+    def __init__(self, G, particao, particao_de, **opcoes):
+        super().__init__(G, **opcoes)
+        self.particao = particao
+        self.particao_de = particao_de
+        self.fronteira = frozenset(["Switch Central"])
+        self.saida = {}                  # partição de destino → mensagens desta rodada
+        self.estatisticas_fluxos = {}    # índice do fluxo → [enviados, entregues, descartados, bytes entregues]
+        self._avisos = {}
+        self._fluxo_do_aviso = {}
+
+    def _avisos_fluxo(self, indice):
+        """Callbacks (ao_entregar, ao_descartar) que contam os pacotes do fluxo nesta partição."""
+        if indice not in self._avisos:
+            contagem = self.estatisticas_fluxos.setdefault(indice, [0, 0, 0, 0])
+
+            def entregue(datagrama, instante, latencia):
+                contagem[1] += 1
+                contagem[3] += datagrama.total_length
+
+            def descartado(datagrama, instante, motivo):
+                contagem[2] += 1
+
+            self._avisos[indice] = (entregue, descartado)
+            self._fluxo_do_aviso[entregue] = indice
+        return self._avisos[indice]
+
+    def _atravessar(self, pid, chegada, salto):
+        pacote = self._pacotes[pid]
+        caminho = pacote[1]
+        if salto + 1 >= len(caminho):
+            return False
+        destino = self.particao_de.get(caminho[salto + 1], self.particao)
+        if destino == self.particao:
+            return False
+        del self._pacotes[pid]
+        self.saida.setdefault(destino, []).append(
+            (chegada, pacote[0], caminho, salto, pacote[2], self._fluxo_do_aviso.get(pacote[3])))
+        return True
+
+    def importar(self, mensagens):
+        """Agenda os pacotes vindos de outras partições (chegada ao Switch Central)."""
+        for chegada, datagrama, caminho, salto, enviado_em, fluxo in mensagens:
+            avisos = self._avisos_fluxo(fluxo) if fluxo is not None else (None, None)
+            pid = self._proximo_id
+            self._proximo_id += 1
+            self._pacotes[pid] = [datagrama, caminho, enviado_em, *avisos]
+            heapq.heappush(self._eventos, (chegada, next(self._seq), self.CHEGADA, pid, salto))
+
+    def injetar(self, origem, destino, ip_origem, ip_destino, caminho, tamanho, instante, protocolo, ttl):
+        self._rotas[(origem, destino)] = caminho
+        payload = b'\x00' * max(tamanho - 20, 0)
+        self.enviar(origem, destino, IPDatagram(ip_origem, ip_destino, payload, protocolo, ttl=ttl), instante)
+
+    def iniciar_fluxo(self, indice, origem, destino, ip_origem, ip_destino, caminho, taxa_bps, tamanho,
+                      inicio, duracao, protocolo, poisson, ttl):
+        """Mesma fonte de tráfego de adicionar_fluxo, com contagem por índice do fluxo."""
+        self._rotas[(origem, destino)] = caminho
+        entregue, descartado = self._avisos_fluxo(indice)
+        contagem = self.estatisticas_fluxos[indice]
+        payload = b'\x00' * max(tamanho - 20, 0)
+        periodo = tamanho * 8 / taxa_bps
+        fim = inicio + duracao
+
+        def emitir(instante):
+            contagem[0] += 1
+            datagrama = IPDatagram(ip_origem, ip_destino, payload, protocolo, ttl=ttl)
+            self.enviar(origem, destino, datagrama, instante, entregue, descartado)
+            proximo = instante + (self.rng.expovariate(1 / periodo) if poisson else periodo)
+            if proximo < fim:
+                self.agendar(proximo, emitir, proximo)
+
+        self.agendar(inicio, emitir, inicio)
+
+    def proximo_evento(self):
+        return self._eventos[0][0] if self._eventos else float("inf")
+
+
+def _executar_particao(conexao, particao, nucleo, particao_de, opcoes):
+    """
+    Laço do processo filho: recebe comandos do coordenador pelo Pipe.
+      ("injetar", (pacotes, fluxos)) → próximo evento
+      ("rodada", (fim, mensagens))   → (mensagens para outras partições, próximo evento)
+      ("fim", None)                  → estatísticas da partição
+    """
+    sim = _SimuladorParticao(nucleo, particao, particao_de, **opcoes)
+    inicio_cpu = time.process_time()
+    while True:
+        comando, dados = conexao.recv()
+        if comando == "injetar":
+            pacotes, fluxos = dados
+            for pacote in pacotes:
+                sim.injetar(*pacote)
+            for fluxo in fluxos:
+                sim.iniciar_fluxo(*fluxo)
+            conexao.send(sim.proximo_evento())
+        elif comando == "rodada":
+            fim, mensagens = dados
+            sim.importar(mensagens)
+            sim.executar(fim)
+            conexao.send((sim.saida, sim.proximo_evento()))
+            sim.saida = {}
+        else:
+            conexao.send({
+                "eventos": sim.eventos_processados,
+                "entregues": sim.entregues,
+                "descartes": sim.descartes,
+                "latencias": sim.latencias,
+                "fragmentados": sim.fragmentados,
+                "fluxos": sim.estatisticas_fluxos,
+                "tempo_cpu": time.process_time() - inicio_cpu,
+            })
+            conexao.close()
+            return
+
+
+class SimuladorParalelo:
+    """
+    Simulação de datagramas e fluxos com um processo por partição. Os
+    roteadores de agregação são repartidos entre `processos` partições
+    (equilibrando o número de nós); cada partição simula suas subredes e os
+    enlaces de fibra dos seus roteadores com o Switch Central, e só o tráfego
+    que cruza o Switch Central para outra partição passa pelo coordenador.
+
+    A sincronização é conservadora, em rodadas: todas as partições processam a
+    janela [t, t + L], onde L (lookahead) é o menor atraso de propagação dos
+    enlaces do Switch Central. Um pacote que começa a subir para o Switch
+    Central em t só chega lá depois de t + L, então nenhuma partição recebe um
+    evento do passado. Janelas sem eventos são puladas.
+
+      sim = SimuladorParalelo(rede, processos=4)
+      sim.enviar("Host e1-1", "Host e9-3", tamanho=512, instante=0.0)
+      fluxo = sim.adicionar_fluxo("Host e2-1", "Host e7-1", 50e6, duracao=0.5)
+      resumo = sim.executar()
+
+    As rotas são calculadas no coordenador (índice de percursos); callbacks não
+    atravessam processos, por isso o resultado são contadores e latências.
+    """
+
+    def __init__(self, rede, processos=None, tamanho_fila=100, politica_fila="fifo", intervalo_serie=1e-3,
+                 semente=None, tempo_remontagem=TEMPO_REMONTAGEM_S):
+        if isinstance(rede, Rede):
+            rede = rede.como_tupla()
+        G, subredes, enderecos_ip, _, subredes_por_roteador, roteadores = rede[:6]
+        self.G, self.enderecos_ip = G, enderecos_ip
+        self.processos = max(1, min(processos or os.cpu_count() or 1, len(roteadores)))
+        self.lookahead = min(atraso_propagacao_s(dados.get('tipo_enlace'))
+                             for dados in G._adj["Switch Central"].values())
+        self.opcoes = {"tamanho_fila": tamanho_fila, "politica_fila": politica_fila,
+                       "intervalo_serie": intervalo_serie, "tempo_remontagem": tempo_remontagem}
+        self.semente = semente
+
+        # Roteadores do maior para o menor, cada um na partição menos carregada
+        carga = {r: 1 + sum(1 + subredes[s]["capacidade"] for s in subredes_por_roteador[r]) for r in roteadores}
+        particoes = [(0, p) for p in range(self.processos)]
+        self.particao_de = {}
+        for roteador in sorted(roteadores, key=carga.get, reverse=True):
+            total, p = heapq.heappop(particoes)
+            self.particao_de[roteador] = p
+            heapq.heappush(particoes, (total + carga[roteador], p))
+        # Partição de cada dispositivo (o Switch Central não tem: está em todas)
+        self._particao_no = dict(self.particao_de)
+        for subrede, info in subredes.items():
+            p = self.particao_de[info["roteador"]]
+            self._particao_no[f"Switch {subrede}"] = p
+            self._particao_no.update(dict.fromkeys(info["hosts"], p))
+
+        self._pacotes = [[] for _ in range(self.processos)]
+        self._fluxos = [[] for _ in range(self.processos)]
+        self.fluxos = []
+        self._rotas = {}
+        self.sem_rota = 0
+
+    def _rota(self, origem, destino):
+        chave = (origem, destino)
+        if chave not in self._rotas:
+            indice = obter_indice_percursos(self.G)
+            if indice is not None:
+                caminho = indice.caminho(origem, destino)
+            elif nx.has_path(self.G, origem, destino):
+                caminho = nx.shortest_path(self.G, origem, destino)
+            else:
+                caminho = None
+            self._rotas[chave] = tuple(caminho) if caminho else None
+        return self._rotas[chave]
+
+    def _particao_origem(self, origem, destino):
+        # Tráfego que nasce no Switch Central é simulado na partição do destino,
+        # que é dona do enlace Switch Central → roteador de destino
+        p = self._particao_no.get(origem)
+        return self._particao_no.get(destino, 0) if p is None else p
+
+    def enviar(self, origem, destino, tamanho=512, instante=0.0, protocolo='UDP', ttl=64):
+        """Agenda um datagrama de `tamanho` bytes (total) de origem para destino."""
+        caminho = self._rota(origem, destino)
+        if caminho is None:
+            self.sem_rota += 1
+            return
+        self._pacotes[self._particao_origem(origem, destino)].append(
+            (origem, destino, self.enderecos_ip[origem], self.enderecos_ip[destino], caminho,
+             tamanho, instante, protocolo, ttl))
+
+    def adicionar_fluxo(self, origem, destino, taxa_bps, tamanho=1500, inicio=0.0, duracao=1.0,
+                        protocolo='UDP', poisson=False, ttl=64):
+        """Como SimuladorEventos.adicionar_fluxo; o Fluxo devolvido é preenchido por executar()."""
+        fluxo = Fluxo(origem, destino, taxa_bps, tamanho, inicio, duracao, protocolo, poisson)
+        self.fluxos.append(fluxo)
+        caminho = self._rota(origem, destino)
+        if caminho is None:
+            self.sem_rota += 1
+            return fluxo
+        self._fluxos[self._particao_origem(origem, destino)].append(
+            (len(self.fluxos) - 1, origem, destino, self.enderecos_ip[origem], self.enderecos_ip[destino],
+             caminho, taxa_bps, tamanho, inicio, duracao, protocolo, poisson, ttl))
+        return fluxo
+
+    def _nucleo_particao(self, p):
+        nos = ["Switch Central"] + [no for no, particao in self._particao_no.items() if particao == p]
+        return GrafoCSR.de_grafo(self.G).subgrafo(nos)
+
+    def executar(self, ate=float("inf")):
+        """
+        Cria os processos, roda as rodadas até acabarem os eventos (ou até `ate`)
+        e devolve um resumo: eventos, entregues, descartes, latências (array
+        NumPy, s), rodadas, mensagens trocadas e tempo de parede/CPU por processo.
+        """
+        import multiprocessing
+        contexto = multiprocessing.get_context()
+        inicio = time.perf_counter()
+        conexoes, filhos = [], []
+        for p in range(self.processos):
+            opcoes = dict(self.opcoes, semente=None if self.semente is None else self.semente + p)
+            pai, filho = contexto.Pipe()
+            processo = contexto.Process(target=_executar_particao, daemon=True,
+                                        args=(filho, p, self._nucleo_particao(p), self.particao_de, opcoes))
+            processo.start()
+            filho.close()
+            conexoes.append(pai)
+            filhos.append(processo)
+        try:
+            for p, conexao in enumerate(conexoes):
+                conexao.send(("injetar", (self._pacotes[p], self._fluxos[p])))
+            proximos = [conexao.recv() for conexao in conexoes]
+            pendentes = [[] for _ in conexoes]
+            rodadas = mensagens = 0
+            while True:
+                janela = min(min(proximos), min((m[0] for lista in pendentes for m in lista), default=float("inf")))
+                if janela == float("inf") or janela > ate:
+                    break
+                fim = min(janela + self.lookahead, ate)
+                for p, conexao in enumerate(conexoes):
+                    conexao.send(("rodada", (fim, pendentes[p])))
+                    pendentes[p] = []
+                for p, conexao in enumerate(conexoes):
+                    saida, proximos[p] = conexao.recv()
+                    for destino, lista in saida.items():
+                        pendentes[destino].extend(lista)
+                        mensagens += len(lista)
+                rodadas += 1
+            for conexao in conexoes:
+                conexao.send(("fim", None))
+            estatisticas = [conexao.recv() for conexao in conexoes]
+        finally:
+            for processo in filhos:
+                processo.join(timeout=5)
+                if processo.is_alive():
+                    processo.terminate()
+
+        descartes = Counter(sem_rota=self.sem_rota) if self.sem_rota else Counter()
+        for fluxo in self.fluxos:
+            fluxo.enviados = fluxo.entregues = fluxo.descartados = fluxo.bytes_entregues = 0
+        for parcial in estatisticas:
+            descartes.update(parcial["descartes"])
+            for indice, (enviados, entregues, descartados, total_bytes) in parcial["fluxos"].items():
+                fluxo = self.fluxos[indice]
+                fluxo.enviados += enviados
+                fluxo.entregues += entregues
+                fluxo.descartados += descartados
+                fluxo.bytes_entregues += total_bytes
+        return {
+            "processos": self.processos,
+            "lookahead_s": self.lookahead,
+            "rodadas": rodadas,
+            "mensagens": mensagens,
+            "eventos": sum(parcial["eventos"] for parcial in estatisticas),
+            "entregues": sum(parcial["entregues"] for parcial in estatisticas),
+            "fragmentados": sum(parcial["fragmentados"] for parcial in estatisticas),
+            "descartes": dict(descartes),
+            "latencias": np.concatenate([np.frombuffer(parcial["latencias"], dtype=np.float64)
+                                         for parcial in estatisticas]),
+            "tempo_s": time.perf_counter() - inicio,
+            "tempo_cpu_s": [parcial["tempo_cpu"] for parcial in estatisticas],
+        }
+
+
+def benchmark_paralelo(num_pacotes=100_000, processos=(1, 2, 4), semente=0):
+    """
+    Mesmo tráfego aleatório no simulador sequencial e no paralelo com 1, 2 e 4
+    processos: tempo de parede, rodadas de sincronização e conferência dos totais.
+    """
+    rede = construir_rede(gerar_especificacao(16, 8, 50, semente=semente))
+    G, subredes, enderecos_ip = rede[:3]
+    hosts = [h for info in subredes.values() for h in info["hosts"]]
+    rng = random.Random(semente)
+    pares = [rng.sample(hosts, 2) for _ in range(num_pacotes)]
+    intervalo = 2e-6
+
+    sim = SimuladorEventos(G, enderecos_ip)
+    inicio = time.perf_counter()
+    for i, (origem, destino) in enumerate(pares):
+        sim.enviar(origem, destino, IPDatagram(enderecos_ip[origem], enderecos_ip[destino], b'x' * 492, 'UDP'),
+                   i * intervalo)
+    sim.executar()
+    t_sequencial = time.perf_counter() - inicio
+    latencias = np.frombuffer(sim.latencias, dtype=np.float64)
+    print(f"{num_pacotes} datagramas entre {len(hosts)} hosts ({os.cpu_count()} CPUs disponíveis)")
+    print(f"  Sequencial:  {t_sequencial:6.2f} s, {sim.eventos_processados} eventos, {sim.entregues} entregues, "
+          f"latência média {latencias.mean() * 1e3:.4f} ms")
+
+    for quantidade in processos:
+        paralelo = SimuladorParalelo(rede, processos=quantidade)
+        for i, (origem, destino) in enumerate(pares):
+            paralelo.enviar(origem, destino, 512, i * intervalo)
+        resumo = paralelo.executar()
+        print(f"  {resumo['processos']} processo(s): {resumo['tempo_s']:6.2f} s ({t_sequencial / resumo['tempo_s']:.2f}×), "
+              f"{resumo['rodadas']} rodadas de {resumo['lookahead_s'] * 1e6:.0f} µs, {resumo['mensagens']} pacotes "
+              f"entre partições, latência média {resumo['latencias'].mean() * 1e3:.4f} ms")
+        if (resumo["eventos"], resumo["entregues"], resumo["descartes"]) != \
+                (sim.eventos_processados, sim.entregues, dict(sim.descartes)):
+            raise AssertionError(f"Simulação paralela divergiu da sequencial: {resumo['eventos']} eventos, "
+                                 f"{resumo['entregues']} entregues, descartes {resumo['descartes']}")
+
+
+###############################################
+# MENU INTERATIVO DO SIMULADOR DE REDE
+###############################################
+def menu(G, subredes, enderecos_ip, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda, especificacoes_rede, fibs=None):
+    while True:
+        print("\n==== Simulador de Rede ====")
+        print("1. Exibir Topologia da Rede")
+        print("2. Executar Ping")
+        print("3. Executar Traceroute")
+        print("4. Exibir Endereços IP")
+        print("5. Exibir Configuração da Rede")
+        print("6. Criar Datagram IP")
+        print("7. Ping em Lote (subrede × subrede)")
+        print("8. Sair")
+        opcao = input("Escolha uma opção: ").strip()
+        if opcao == "1":
+            exibir_topologia(G)
+        elif opcao == "2":
+            origem = input("Digite o nome do host de origem (ex.: Host e1-1): ").strip()
+            destino = input("Digite o nome do host de destino (ex.: Host e2-5): ").strip()
+            contagem = input("Número de sondas [4]: ").strip()
+            intervalo = input("Intervalo entre sondas em segundos [1.0]: ").strip()
+            tamanho = input("Tamanho dos dados em bytes [56]: ").strip()
+            try:
+                print(ping(G, enderecos_ip, origem, destino, int(contagem or 4),
+                           float(intervalo or 1.0), int(tamanho or 56)))
+            except ValueError:
+                print("Valores inválidos: use números para sondas, intervalo e tamanho.")
+        elif opcao == "3":
+            origem = input("Digite o nome do host de origem (ex.: Host e1-1): ").strip()
+            destino = input("Digite o nome do host de destino (ex.: Host e2-5): ").strip()
+            print(traceroute(G, enderecos_ip, origem, destino, fibs))
+        elif opcao == "4":
+            try:
+                exibir_enderecos_ip(enderecos_ip, G, subredes, por_pagina=LINHAS_POR_PAGINA, **_perguntar_filtros())
+            except ValueError as erro:
+                print(f"{erro}\n")
+        elif opcao == "5":
+            exibir_configuracao_rede(subredes, mascaras_subrede, subredes_por_roteador, roteadores, switches_borda,
+                                     especificacoes_rede, enderecos_ip, por_pagina=LINHAS_POR_PAGINA)
+        elif opcao == "6":
+            criar_e_visualizar_datagrama(enderecos_ip)
+        elif opcao == "7":
+            ping_lote_subredes(G, subredes)
+        elif opcao == "8":
+            print("Encerrando o simulador...")
+            break
+        else:
+            print("Opção inválida. Tente novamente.")
+
+
+###############################################
+# LINHA DE COMANDO (SUBCOMANDOS, SAÍDA EM JSON LINES)
+###############################################
+COMANDOS_CLI = ("build", "ping", "traceroute", "ips", "config", "datagram", "fluxos", "serve")
+
+
+def _analisador_cli():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]) or "projeto2_FINALFINAL.py",
+        description="Simulador de rede hierárquica, modo não interativo: cada resultado é "
+                    "uma linha JSON no stdout. Sem subcomando, abre o menu interativo.")
+    parser.add_argument("--benchmark", choices=BENCHMARKS, metavar="NOME",
+                        help=f"roda um benchmark e sai ({', '.join(BENCHMARKS)})")
+    comandos = parser.add_subparsers(dest="comando")
+
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--tempo", action="store_true",
+                       help="mostra no stderr o número de resultados e a vazão do comando")
+    topologia = argparse.ArgumentParser(add_help=False)
+    topologia.add_argument("topologia", help="arquivo de topologia (JSON, TOML ou YAML) ou snapshot binário")
+    consultas = argparse.ArgumentParser(add_help=False)
+    consultas.add_argument("origem", nargs="?", help="host de origem (consulta única)")
+    consultas.add_argument("destino", nargs="?", help="host de destino (consulta única)")
+    consultas.add_argument("-c", "--consultas", metavar="ARQUIVO",
+                           help="uma consulta por linha: objeto JSON ou 'origem<TAB>destino' ('-' = stdin)")
+    consultas.add_argument("--lote", type=int, default=10_000,
+                           help="consultas processadas por bloco (padrão: 10000)")
+
+    build_cli = comandos.add_parser("build", parents=[comum, topologia],
+                                    help="monta a rede e mostra o resumo")
+    build_cli.add_argument("-s", "--salvar", metavar="ARQUIVO",
+                           help="grava um snapshot binário da rede (recarregável em qualquer comando)")
+    ping_cli = comandos.add_parser("ping", parents=[comum, topologia, consultas],
+                                   help="alcançabilidade, saltos e RTT simulado")
+    ping_cli.add_argument("--semente", type=int, help="semente do jitter (resultados reprodutíveis)")
+    ping_cli.add_argument("-n", "--contagem", type=int, default=1,
+                          help="sondas por par (padrão: 1); o JSON traz sempre min/avg/max/mdev e p50/p95/p99 em ms")
+    ping_cli.add_argument("-i", "--intervalo", type=float, default=1.0,
+                          help="intervalo entre sondas em segundos (padrão: 1.0)")
+    ping_cli.add_argument("--tamanho", type=int, default=56, help="bytes de dados por sonda (padrão: 56)")
+    comandos.add_parser("traceroute", parents=[comum, topologia, consultas],
+                        help="caminho salto a salto, com o IP de cada nó")
+    relatorio = argparse.ArgumentParser(add_help=False)
+    relatorio.add_argument("--subrede", help="só dispositivos/enlaces desta subrede")
+    relatorio.add_argument("--roteador", help="só o roteador e os dispositivos/enlaces das suas subredes")
+    relatorio.add_argument("--pagina", type=int, default=1, help="página a exibir, a partir de 1 (com --por-pagina)")
+    relatorio.add_argument("--por-pagina", type=int, help="linhas por página (padrão: todas)")
+    relatorio.add_argument("--formato", choices=FORMATOS_RELATORIO, default="jsonl", help="jsonl (padrão) ou csv")
+    ips_cli = comandos.add_parser("ips", parents=[comum, topologia, relatorio], help="tabela de endereços IP")
+    ips_cli.add_argument("--tipo", help="só dispositivos deste tipo (ex.: Host, 'Switch de Borda')")
+    ips_cli.add_argument("--ordenado", action="store_true",
+                         help="em ordem alfabética (padrão: ordem de criação dos dispositivos)")
+    config_cli = comandos.add_parser("config", parents=[comum, topologia, relatorio], help="especificações da rede")
+    config_cli.add_argument("--detalhe", choices=("resumo", "subredes", "enlaces"), default="resumo",
+                            help="resumo (padrão), uma linha por subrede ou uma linha por enlace")
+    datagrama_cli = comandos.add_parser("datagram", parents=[comum],
+                                        help="gera datagramas IPv4 (bytes em hexadecimal)")
+    datagrama_cli.add_argument("origem", nargs="?", help="IP (ou nome do host, com --topologia)")
+    datagrama_cli.add_argument("destino", nargs="?", help="IP (ou nome do host, com --topologia)")
+    datagrama_cli.add_argument("-t", "--topologia", help="resolve nomes de hosts por esta topologia")
+    datagrama_cli.add_argument("-c", "--consultas", metavar="ARQUIVO",
+                               help="um datagrama por linha: objeto JSON com origem, destino, payload, "
+                                    "protocolo, ttl, tos, flags ('-' = stdin)")
+    datagrama_cli.add_argument("--payload", default=PADRAO_DATAGRAMA["payload"], help="mensagem (padrão: vazia)")
+    datagrama_cli.add_argument("--protocolo", default=PADRAO_DATAGRAMA["protocolo"], help="TCP, UDP, ICMP ou número")
+    datagrama_cli.add_argument("--ttl", type=int, default=PADRAO_DATAGRAMA["ttl"])
+    datagrama_cli.add_argument("--tos", type=int, default=PADRAO_DATAGRAMA["tos"])
+    datagrama_cli.add_argument("--flags", default=PADRAO_DATAGRAMA["flags"], help="DF, MF ou Reserved")
+    datagrama_cli.add_argument("--pcap", help="também grava os datagramas neste arquivo pcap")
+    fluxos_cli = comandos.add_parser("fluxos", parents=[comum, topologia],
+                                     help="matriz de tráfego, taxas max-min por fluxo e dimensionamento dos uplinks")
+    fluxos_cli.add_argument("--modelo", choices=MODELOS_TRAFEGO, default="uniforme",
+                            help="modelo da matriz de tráfego sintética (padrão: uniforme)")
+    fluxos_cli.add_argument("-m", "--matriz", metavar="ARQUIVO",
+                            help="lê a matriz de tráfego: uma demanda por linha, 'origem<TAB>destino<TAB>demanda' "
+                                 "ou objeto JSON ('-' = stdin)")
+    fluxos_cli.add_argument("--fluxos", type=int, default=10_000, help="fluxos sintéticos (padrão: 10000)")
+    fluxos_cli.add_argument("--demanda", default="1 Mbps", help="demanda média por fluxo (padrão: '1 Mbps')")
+    fluxos_cli.add_argument("--semente", type=int, help="semente da matriz sintética")
+    fluxos_cli.add_argument("--alvo", type=float, default=0.7,
+                            help="utilização máxima desejada nos uplinks sugeridos (padrão: 0.7)")
+    fluxos_cli.add_argument("--enlaces", type=int, default=0, metavar="N",
+                            help="também lista os N enlaces mais carregados")
+    servir_cli = comandos.add_parser("serve", parents=[topologia],
+                                     help="carrega a rede e atende pedidos JSON Lines por TCP ou socket Unix")
+    servir_cli.add_argument("--host", default="127.0.0.1", help="endereço TCP (padrão: 127.0.0.1)")
+    servir_cli.add_argument("--porta", type=int, default=8765, help="porta TCP (padrão: 8765)")
+    servir_cli.add_argument("--unix", metavar="CAMINHO", help="usa um socket Unix em vez de TCP")
+    servir_cli.add_argument("--trabalhadores", type=int, help="threads para pedidos em lote (padrão: até 4)")
+    servir_cli.add_argument("--pendentes", type=int, default=64,
+                            help="pedidos em andamento por conexão antes de parar de ler (padrão: 64)")
+    return parser
+
+
+def _ler_consultas(caminho, campos=("origem", "destino", "payload")):
+    """Gera um dicionário por linha não vazia (JSON, ou `campos` separados por TAB/vírgula)."""
+    arquivo = sys.stdin if caminho == "-" else open(caminho, encoding="utf-8")
+    try:
+        for linha in arquivo:
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            if linha.startswith("{"):
+                yield json.loads(linha)
+                continue
+            valores = [valor.strip() for valor in linha.split("\t" if "\t" in linha else ",")]
+            yield dict(zip(campos, valores))
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+
+
+def _consultas_cli(args):
+    if args.consultas:
+        return _ler_consultas(args.consultas)
+    if args.origem is None or args.destino is None:
+        raise SystemExit(f"{args.comando}: informe origem e destino ou --consultas ARQUIVO")
+    return iter([{"origem": args.origem, "destino": args.destino}])
+
+
+def _escrever_jsonl(saida, registros):
+    saida.write("".join(json.dumps(registro, ensure_ascii=False, default=str) + "\n" for registro in registros))
+
+
+def _pares_validos(bloco, enderecos_ip):
+    """Separa as consultas com hosts conhecidos das que devem virar erro."""
+    validos, resultados = [], [None] * len(bloco)
+    for i, consulta in enumerate(bloco):
+        origem, destino = consulta.get("origem"), consulta.get("destino")
+        faltando = [nome for nome in (origem, destino) if nome not in enderecos_ip]
+        if faltando:
+            resultados[i] = {"origem": origem, "destino": destino,
+                             "erro": f"host inexistente: {', '.join(map(str, faltando))}"}
+        else:
+            validos.append(i)
+    return validos, resultados
+
+
+_CAMPOS_RTT = ("min", "avg", "max", "mdev", "p50", "p95", "p99")
+
+
+def _campos_ping(resumo):
+    """Campos de estatisticas_rtt no resultado JSON do ping (tempos com sufixo _ms)."""
+    return {"enviados": resumo["enviados"], "recebidos": resumo["recebidos"], "perda_pct": resumo["perda_pct"],
+            **{f"{campo}_ms": resumo[campo] for campo in _CAMPOS_RTT}}
+
+
+def _campos_sonda_unica(rtt_ms):
+    """Os mesmos campos de _campos_ping para uma única sonda (sem passar por np.percentile)."""
+    if rtt_ms != rtt_ms:  # nan: sonda perdida ou sem rota
+        return {"enviados": 1, "recebidos": 0, "perda_pct": 100.0, **dict.fromkeys(f"{c}_ms" for c in _CAMPOS_RTT)}
+    return {"enviados": 1, "recebidos": 1, "perda_pct": 0.0,
+            **{f"{campo}_ms": 0.0 if campo == "mdev" else rtt_ms for campo in _CAMPOS_RTT}}
+
+
+def _resultados_ping(G, enderecos_ip, bloco, semente=None, contagem=1, intervalo=1.0, tamanho=56,
+                     contagem_maxima=None):
+    """
+    Um resultado (dicionário) por consulta {"origem", "destino"} do bloco, sempre
+    com os mesmos campos: origem, destino, alcancavel, saltos, enviados,
+    recebidos, perda_pct e min/avg/max/mdev/p50/p95/p99 com sufixo _ms. Com uma
+    sonda vem de ping_lote; com contagem > 1, de sondar (cada consulta pode
+    trocar contagem/intervalo/tamanho). `contagem_maxima` limita as sondas por
+    consulta (usado pelo servidor).
+    """
+    def limitar(valor):
+        valor = int(valor)
+        return valor if contagem_maxima is None else max(1, min(valor, contagem_maxima))
+
+    validos, resultados = _pares_validos(bloco, enderecos_ip)
+    if validos and (contagem > 1 or any("contagem" in bloco[i] or "tamanho" in bloco[i] for i in validos)):
+        for i in validos:
+            consulta = bloco[i]
+            resumo = sondar(G, consulta["origem"], consulta["destino"], limitar(consulta.get("contagem", contagem)),
+                            float(consulta.get("intervalo", intervalo)), int(consulta.get("tamanho", tamanho)),
+                            semente)
+            caminho = resumo["caminho"]
+            resultados[i] = {"origem": consulta["origem"], "destino": consulta["destino"],
+                             "alcancavel": caminho is not None, "saltos": resumo["saltos"] if caminho else None,
+                             **_campos_ping(resumo)}
+    elif validos:
+        pares = [(bloco[i]["origem"], bloco[i]["destino"]) for i in validos]
+        medida = ping_lote(G, pares, semente, tamanho)
+        alcancavel = medida["alcancavel"].tolist()
+        saltos = medida["saltos"].tolist()
+        latencia = medida["latencia_ms"].tolist()
+        for j, i in enumerate(validos):
+            resultados[i] = {"origem": pares[j][0], "destino": pares[j][1], "alcancavel": alcancavel[j],
+                             "saltos": saltos[j] if alcancavel[j] else None, **_campos_sonda_unica(latencia[j])}
+    return resultados
+
+
+def _resultados_traceroute(G, enderecos_ip, bloco):
+    """Um resultado (dicionário) por consulta {"origem", "destino"} do bloco, via traceroute_lote."""
+    validos, resultados = _pares_validos(bloco, enderecos_ip)
+    if validos:
+        pares = [(bloco[i]["origem"], bloco[i]["destino"]) for i in validos]
+        caminhos = traceroute_lote(G, pares)["caminhos"]
+        for (origem, destino), caminho, i in zip(pares, caminhos, validos):
+            resultados[i] = {"origem": origem, "destino": destino, "alcancavel": caminho is not None,
+                             "saltos": [{"no": no, "ip": enderecos_ip.get(no)} for no in caminho]
+                             if caminho else None}
+    return resultados
+
+
+CONTAGEM_MAXIMA_PING = 10_000  # sondas por consulta aceitas pelo servidor
+PADRAO_DATAGRAMA = {"payload": "", "protocolo": "TCP", "ttl": 64, "tos": 0, "flags": "DF"}
+
+
+def _resultado_datagrama(campos, enderecos_ip):
+    """
+    Monta o datagrama descrito por `campos` (origem/destino como IP ou nome de
+    host) e retorna (resultado, bytes); em caso de erro, (resultado com "erro", None).
+    """
+    try:
+        src = enderecos_ip.get(campos["origem"], campos["origem"])
+        dest = enderecos_ip.get(campos["destino"], campos["destino"])
+        protocolo = protocolo_para_numero(str(campos["protocolo"])) or 6
+        datagrama = IPDatagram(src, dest, campos["payload"], protocolo, int(campos["tos"]),
+                               int(campos["ttl"]), campos["flags"])
+        dados = datagrama.generate()
+    except (OSError, ValueError, TypeError, KeyError, struct.error) as erro:
+        return {"origem": campos.get("origem"), "destino": campos.get("destino"),
+                "erro": str(erro) or type(erro).__name__}, None
+    return {"origem": src, "destino": dest, "protocolo": datagrama.protocol,
+            "ttl": datagrama.ttl, "total_length": datagrama.total_length,
+            "identification": datagrama.identification,
+            "checksum": datagrama.checksum, "hex": dados.hex()}, dados
+
+
+def _cli_ping(args, rede, saida):
+    G, enderecos_ip = rede[0], rede[2]
+    total = 0
+    consultas = _consultas_cli(args)
+    while True:
+        bloco = list(itertools.islice(consultas, args.lote))
+        if not bloco:
+            return total
+        _escrever_jsonl(saida, _resultados_ping(G, enderecos_ip, bloco, args.semente,
+                                                args.contagem, args.intervalo, args.tamanho))
+        total += len(bloco)
+
+
+def _cli_traceroute(args, rede, saida):
+    G, enderecos_ip = rede[0], rede[2]
+    total = 0
+    consultas = _consultas_cli(args)
+    while True:
+        bloco = list(itertools.islice(consultas, args.lote))
+        if not bloco:
+            return total
+        _escrever_jsonl(saida, _resultados_traceroute(G, enderecos_ip, bloco))
+        total += len(bloco)
+
+
+def _cli_relatorio(args, rede, saida):
+    """Subcomandos ips e config: linhas geradas sob demanda, exportadas em JSON Lines ou CSV."""
+    G, subredes, enderecos_ip, especificacoes_rede = rede[0], rede[1], rede[2], rede[7]
+    if args.comando == "ips":
+        return exportar_relatorio(linhas_enderecos(enderecos_ip, G, subredes, args.subrede, args.roteador,
+                                                   args.tipo, args.pagina, args.por_pagina, args.ordenado),
+                                  saida, args.formato, colunas=COLUNAS_RELATORIO["enderecos"])
+    if args.detalhe == "subredes":
+        if args.subrede is not None:
+            raise SystemExit("config --detalhe subredes: use --roteador para filtrar")
+        return exportar_relatorio(linhas_subredes(subredes, args.roteador, args.pagina, args.por_pagina),
+                                  saida, args.formato, colunas=COLUNAS_RELATORIO["subredes"])
+    if args.detalhe == "enlaces":
+        return exportar_relatorio(linhas_enlaces(especificacoes_rede, subredes, args.subrede, args.roteador,
+                                                 pagina=args.pagina, por_pagina=args.por_pagina),
+                                  saida, args.formato, colunas=COLUNAS_RELATORIO["enlaces"])
+    return exportar_relatorio([resumo_configuracao(especificacoes_rede)], saida, args.formato)
+
+
+def _cli_fluxos(args, rede, saida):
+    """Resumo da simulação por fluxos, uma linha por uplink e (com --enlaces) os enlaces mais carregados."""
+    G, subredes = rede[0], rede[1]
+    inicio = time.perf_counter()
+    matriz = matriz_trafego(G, subredes, args.modelo, args.fluxos, capacidade_para_bps(args.demanda),
+                            args.semente, arquivo=args.matriz)
+    resultado = simular_fluxos(G, matriz)
+    registros = [{**resumo_fluxos(resultado), "segundos": round(time.perf_counter() - inicio, 3)}]
+    registros += dimensionar_uplinks(resultado, args.alvo)
+    registros += carga_enlaces(resultado, args.enlaces) if args.enlaces else []
+    _escrever_jsonl(saida, registros)
+    return len(registros)
+
+
+def _cli_datagrama(args, saida):
+    enderecos_ip = construir_rede(args.topologia)[2] if args.topologia else {}
+    if args.consultas:
+        consultas = _ler_consultas(args.consultas)
+    elif args.origem is None or args.destino is None:
+        raise SystemExit("datagram: informe origem e destino ou --consultas ARQUIVO")
+    else:
+        consultas = iter([{"origem": args.origem, "destino": args.destino}])
+    padrao = {"payload": args.payload, "protocolo": args.protocolo, "ttl": args.ttl,
+              "tos": args.tos, "flags": args.flags}
+    captura = EscritorPcap(args.pcap) if args.pcap else None
+    total = 0
+    try:
+        for bloco in iter(lambda: list(itertools.islice(consultas, 10_000)), []):
+            resultados = []
+            for consulta in bloco:
+                resultado, dados = _resultado_datagrama({**padrao, **consulta}, enderecos_ip)
+                if captura is not None and dados is not None:
+                    captura.escrever(dados)
+                resultados.append(resultado)
+            _escrever_jsonl(saida, resultados)
+            total += len(bloco)
+    finally:
+        if captura is not None:
+            captura.fechar()
+    return total
+
+
+def executar_cli(argv, saida=None):
+    """
+    Executa um subcomando (build, ping, traceroute, ips, config, datagram,
+    fluxos) e escreve os resultados em JSON Lines. Exemplos:
+        python projeto2_FINALFINAL.py ping rede.json "Host e1-1" "Host e2-1"
+        python projeto2_FINALFINAL.py traceroute rede.json -c consultas.jsonl
+        cat pares.tsv | python projeto2_FINALFINAL.py ping rede.json -c - --tempo
+        python projeto2_FINALFINAL.py fluxos rede.json --modelo hotspot --fluxos 100000
+    O subcomando serve mantém a rede em memória e atende pedidos por socket
+    (ver ServidorRede):
+        python projeto2_FINALFINAL.py serve rede.json --unix /tmp/rede.sock
+    """
+    analisador = _analisador_cli()
+    args = analisador.parse_args(argv)
+    if args.benchmark:
+        BENCHMARKS[args.benchmark]()
+        return 0
+    if args.comando is None:
+        analisador.error("informe um subcomando ou --benchmark NOME")
+    saida = saida or sys.stdout
+    inicio = time.perf_counter()
+    if args.comando == "datagram":
+        total = _cli_datagrama(args, saida)
+    else:
+        rede = construir_rede(args.topologia)
+        G, subredes, enderecos_ip, _, _, roteadores = rede[:6]
+        if args.comando == "serve":
+            _cli_servir(args, rede)
+            return 0
+        if args.comando == "build":
+            if args.salvar:
+                salvar_snapshot(rede, args.salvar)
+            _escrever_jsonl(saida, [{"nos": G.number_of_nodes(), "enlaces": G.number_of_edges(),
+                                     "roteadores": len(roteadores), "subredes": len(subredes),
+                                     "enderecos": len(enderecos_ip),
+                                     "segundos": round(time.perf_counter() - inicio, 3)}])
+            total = 1
+        elif args.comando == "ping":
+            total = _cli_ping(args, rede, saida)
+        elif args.comando == "traceroute":
+            total = _cli_traceroute(args, rede, saida)
+        elif args.comando == "fluxos":
+            try:
+                total = _cli_fluxos(args, rede, saida)
+            except ValueError as erro:  # matriz de tráfego inválida
+                raise SystemExit(f"{args.comando}: {erro}")
+        else:
+            try:
+                total = _cli_relatorio(args, rede, saida)
+            except ValueError as erro:
+                raise SystemExit(f"{args.comando}: {erro}")
+    saida.flush()
+    if args.tempo:
+        duracao = time.perf_counter() - inicio
+        print(f"{args.comando}: {total} resultados em {duracao:.3f} s ({total / duracao:,.0f}/s)", file=sys.stderr)
+    return 0
+
+
+###############################################
+# SERVIDOR ASSÍNCRONO (JSON LINES POR SOCKET LOCAL)
+###############################################
+class ServidorRede:
+    """
+    Atende consultas sobre uma rede carregada uma única vez em memória, por
+    TCP ou socket Unix, com o protocolo de uma linha JSON por pedido e uma por
+    resposta (na mesma ordem dos pedidos da conexão):
+
+      {"id": 1, "op": "ping", "origem": "Host e1-1", "destino": "Host e2-1"}
+      {"id": 2, "op": "traceroute", "consultas": [{"origem": ..., "destino": ...}, ...]}
+      {"id": 3, "op": "datagram", "origem": "Host e1-1", "destino": "10.0.0.9", "payload": "oi"}
+      {"id": 4, "op": "config"}
+
+    Consultas únicas respondem {"id", ...campos do resultado}; com "consultas"
+    a resposta é {"id", "resultados": [...]}; erros viram {"id", "erro"}.
+      - pipelining: o cliente pode mandar vários pedidos sem esperar as respostas;
+      - pedidos com lista de consultas, e pings com "contagem" > 1, rodam em
+        um pool limitado de threads (o laço de eventos continua atendendo as
+        consultas unitárias); "contagem" é limitada a `contagem_maxima`;
+      - contrapressão: cada conexão tem no máximo `max_pendentes` pedidos em
+        andamento; com o limite atingido (ou com o pool ocupado) o servidor
+        para de ler o socket até as respostas saírem, e cada resposta espera
+        o cliente consumir a anterior (drain).
+    As consultas só leem a rede; ela não deve ser alterada com o servidor no ar.
+    """
+
+    OPERACOES = ("ping", "traceroute", "datagram", "config")
+
+    def __init__(self, rede, trabalhadores=None, max_pendentes=64, tamanho_linha=1 << 24,
+                 contagem_maxima=CONTAGEM_MAXIMA_PING):
+        if isinstance(rede, Rede):
+            rede = rede.como_tupla()
+        self.G, self.enderecos_ip, self.especificacoes_rede = rede[0], rede[2], rede[7]
+        obter_indice_percursos(self.G)
+        self.trabalhadores = trabalhadores or min(4, os.cpu_count() or 1)
+        self.max_pendentes = max_pendentes
+        self.tamanho_linha = tamanho_linha
+        self.contagem_maxima = contagem_maxima
+        self.conexoes = 0
+        self.pedidos = 0
+        self._pool = None
+        self._vagas = None
+
+    def _configuracao(self):
+        configuracao = {chave: valor for chave, valor in self.especificacoes_rede.items() if chave != "Enlaces"}
+        configuracao["Total de Enlaces"] = len(self.especificacoes_rede.get("Enlaces", ()))
+        return configuracao
+
+    def _contagem(self, pedido):
+        return max(1, min(int(pedido.get("contagem", 1)), self.contagem_maxima))
+
+    def _executar(self, op, consultas, pedido):
+        """Resolve uma lista de consultas (no laço de eventos ou em uma thread do pool)."""
+        if op == "ping":
+            return _resultados_ping(self.G, self.enderecos_ip, consultas, pedido.get("semente"),
+                                    self._contagem(pedido), float(pedido.get("intervalo", 1.0)),
+                                    int(pedido.get("tamanho", 56)), self.contagem_maxima)
+        if op == "traceroute":
+            return _resultados_traceroute(self.G, self.enderecos_ip, consultas)
+        padrao = {**PADRAO_DATAGRAMA, **{chave: pedido[chave] for chave in PADRAO_DATAGRAMA if chave in pedido}}
+        return [_resultado_datagrama({**padrao, **consulta}, self.enderecos_ip)[0] for consulta in consultas]
+
+    async def _responder(self, linha):
+        import asyncio
+        try:
+            pedido = json.loads(linha)
+            if not isinstance(pedido, dict):
+                raise ValueError("o pedido deve ser um objeto JSON")
+        except ValueError as erro:
+            return {"id": None, "erro": f"JSON inválido: {erro}"}
+        resposta = {"id": pedido.get("id")}
+        op = pedido.get("op")
+        if op not in self.OPERACOES:
+            resposta["erro"] = f"operação desconhecida: {op!r} (use {', '.join(self.OPERACOES)})"
+            return resposta
+        if op == "config":
+            resposta.update(self._configuracao())
+            return resposta
+        consultas = pedido.get("consultas")
+        try:
+            unitaria = consultas is None
+            if unitaria:
+                consultas = [{"origem": pedido.get("origem"), "destino": pedido.get("destino")}]
+            if unitaria and not (op == "ping" and self._contagem(pedido) > 1):
+                resposta.update(self._executar(op, consultas, pedido)[0])
+            else:
+                # Listas e pings com várias sondas saem do laço de eventos
+                async with self._vagas:
+                    resultados = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, self._executar, op, list(consultas), pedido)
+                if unitaria:
+                    resposta.update(resultados[0])
+                else:
+                    resposta["resultados"] = resultados
+        except Exception as erro:  # um pedido com erro não derruba a conexão
+            resposta["erro"] = str(erro) or type(erro).__name__
+        return resposta
+
+    async def _atender(self, leitor, escritor):
+        import asyncio
+        self.conexoes += 1
+        fila = asyncio.Queue(self.max_pendentes)
+
+        async def escrever():
+            while True:
+                tarefa = await fila.get()
+                if tarefa is None:
+                    return
+                resposta = await tarefa
+                escritor.write(json.dumps(resposta, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                await escritor.drain()
+
+        escrita = asyncio.ensure_future(escrever())
+        try:
+            while not escrita.done():
+                try:
+                    linha = await leitor.readline()
+                except ValueError:  # linha maior que tamanho_linha
+                    linha = b'{"op": null}\n'
+                if not linha:
+                    break
+                if not linha.strip():
+                    continue
+                self.pedidos += 1
+                await fila.put(asyncio.ensure_future(self._responder(linha)))
+            await fila.put(None)
+            await escrita
+        except (ConnectionError, asyncio.CancelledError):
+            escrita.cancel()
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host="127.0.0.1", porta=8765, caminho_unix=None):
+        """Abre o socket (Unix se caminho_unix for dado, senão TCP) e retorna o asyncio.Server."""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self._pool = ThreadPoolExecutor(self.trabalhadores, thread_name_prefix="consultas")
+        self._vagas = asyncio.Semaphore(self.trabalhadores * 2)
+        if caminho_unix:
+            return await asyncio.start_unix_server(self._atender, caminho_unix, limit=self.tamanho_linha)
+        return await asyncio.start_server(self._atender, host, porta, limit=self.tamanho_linha)
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def servir(rede, host="127.0.0.1", porta=8765, caminho_unix=None, trabalhadores=None, max_pendentes=64):
+    """Sobe um ServidorRede e atende até o processo ser interrompido."""
+    servidor = ServidorRede(rede, trabalhadores, max_pendentes)
+    socket_servidor = await servidor.iniciar(host, porta, caminho_unix)
+    endereco = caminho_unix or "{}:{}".format(*socket_servidor.sockets[0].getsockname()[:2])
+    print(f"Atendendo em {endereco} ({servidor.trabalhadores} trabalhadores, "
+          f"até {max_pendentes} pedidos pendentes por conexão)", file=sys.stderr, flush=True)
+    try:
+        async with socket_servidor:
+            await socket_servidor.serve_forever()
+    finally:
+        servidor.fechar()
+
+
+def _cli_servir(args, rede):
+    import asyncio
+    try:
+        asyncio.run(servir(rede, args.host, args.porta, args.unix, args.trabalhadores, args.pendentes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def _servir_para_benchmark(especificacao, caminho_unix, trabalhadores):
+    import asyncio
+    asyncio.run(servir(construir_rede(especificacao), caminho_unix=caminho_unix, trabalhadores=trabalhadores))
+
+
+def benchmark_servidor(clientes=32, pedidos_por_cliente=300, janela=16, semente=0):
+    """
+    Gerador de carga: `clientes` conexões simultâneas, cada uma com até `janela`
+    pedidos em voo (pipelining), contra um servidor em outro processo por
+    socket Unix. Mede vazão e latência p50/p99 de consultas unitárias e de um
+    tráfego misto com lotes de 1000 pings (que vão para o pool de trabalhadores).
+    """
+    import asyncio
+    import multiprocessing
+    import tempfile
+
+    especificacao = gerar_especificacao(20, 10, 100, semente)
+    rede = construir_rede(especificacao)
+    hosts = [h for info in rede[1].values() for h in info["hosts"]]
+    rng = random.Random(semente)
+
+    def pedido(i, misto):
+        origem, destino = rng.sample(hosts, 2)
+        if misto and i % 20 == 0:
+            return {"id": i, "op": "ping", "consultas": [{"origem": o, "destino": d}
+                                                         for o, d in (rng.sample(hosts, 2) for _ in range(1000))]}
+        return {"id": i, "op": ("traceroute", "ping", "datagram")[i % 3], "origem": origem, "destino": destino}
+
+    async def cliente(caminho, pedidos, latencias):
+        leitor, escritor = await asyncio.open_unix_connection(caminho, limit=1 << 24)
+        enviados_em = deque()
+        vagas = asyncio.Semaphore(janela)
+
+        async def ler():
+            for _ in pedidos:
+                linha = await leitor.readline()
+                latencias.append(time.perf_counter() - enviados_em.popleft())
+                vagas.release()
+                if "erro" in json.loads(linha):
+                    raise AssertionError(f"Servidor respondeu com erro: {linha[:200]!r}")
+
+        leitura = asyncio.ensure_future(ler())
+        for linha in pedidos:
+            await vagas.acquire()
+            enviados_em.append(time.perf_counter())
+            escritor.write(linha)
+            await escritor.drain()
+        await leitura
+        escritor.close()
+
+    async def carga(caminho, misto):
+        latencias = []
+        lotes = [[(json.dumps(pedido(c * pedidos_por_cliente + i, misto)) + "\n").encode()
+                  for i in range(pedidos_por_cliente)] for c in range(clientes)]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(caminho, lote, latencias) for lote in lotes))
+        return time.perf_counter() - inicio, np.array(latencias) * 1e3
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "rede.sock")
+        processo = multiprocessing.get_context().Process(
+            target=_servir_para_benchmark, args=(especificacao, caminho, None), daemon=True)
+        processo.start()
+        try:
+            while not os.path.exists(caminho):
+                if not processo.is_alive():
+                    raise RuntimeError("O servidor terminou antes de abrir o socket.")
+                time.sleep(0.05)
+            print(f"Servidor com {len(hosts)} hosts; {clientes} clientes × {pedidos_por_cliente} pedidos, "
+                  f"janela de {janela} pedidos em voo por conexão")
+            for rotulo, misto in (("Consultas unitárias", False), ("Misto (5% lotes de 1000)", True)):
+                duracao, latencias = asyncio.run(carga(caminho, misto))
+                total = clientes * pedidos_por_cliente
+                print(f"  {rotulo:<26} {total / duracao:9,.0f} pedidos/s   p50 {np.percentile(latencias, 50):7.2f} ms"
+                      f"   p99 {np.percentile(latencias, 99):7.2f} ms")
+        finally:
+            processo.terminate()
+            processo.join()
+
+
+###############################################
+# FUNÇÃO MAIN – INÍCIO DO SIMULADOR
+###############################################
+# Benchmarks disponíveis via: python projeto2_FINALFINAL.py --benchmark <nome>
+def benchmark_inicializacao(repeticoes=5):
+    """
+    Tempo para iniciar o interpretador e importar este módulo (caminho sem
+    interface gráfica), comparado ao custo de também carregar networkx e
+    matplotlib, como acontecia quando eles eram importados no topo do arquivo.
+    """
+    import subprocess
+    codigo = (
+        "import sys, time, importlib.util\n"
+        "inicio = time.perf_counter()\n"
+        "spec = importlib.util.spec_from_file_location('projeto2', sys.argv[1])\n"
+        "modulo = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(modulo)\n"
+        "meio = time.perf_counter()\n"
+        "if sys.argv[2] == '1':\n"
+        "    import networkx, matplotlib.pyplot\n"
+        "print(meio - inicio, time.perf_counter() - inicio,"
+        " 'networkx' in sys.modules, 'matplotlib' in sys.modules)\n"
+    )
+    print(f"Inicialização (melhor de {repeticoes} execuções):")
+    for rotulo, carregar_gui in (("Módulo (sem GUI)", "0"), ("Módulo + networkx + matplotlib", "1")):
+        melhor = None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            saida = subprocess.run([sys.executable, "-c", codigo, os.path.abspath(__file__), carregar_gui],
+                                   capture_output=True, text=True, check=True).stdout.split()
+            total = time.perf_counter() - inicio
+            if melhor is None or total < melhor[0]:
+                melhor = (total, float(saida[1]), saida[2] == "True", saida[3] == "True")
+        total, importacao, com_nx, com_plt = melhor
+        print(f"  {rotulo:<32} processo {total * 1e3:6.0f} ms, imports {importacao * 1e3:6.0f} ms "
+              f"(networkx: {'sim' if com_nx else 'não'}, matplotlib: {'sim' if com_plt else 'não'})")
+
+
+BENCHMARKS = {
+    "fib": benchmark_fib,
+    "simulador": benchmark_simulador,
+    "serializacao": benchmark_serializacao,
+    "checksum": benchmark_checksum,
+    "parser": benchmark_parser,
+    "memoria": benchmark_memoria,
+    "fragmentacao": benchmark_fragmentacao,
+    "pcap": benchmark_pcap,
+    "layout": benchmark_layout,
+    "inicializacao": benchmark_inicializacao,
+    "snapshot": benchmark_snapshot,
+    "mutacao": benchmark_mutacao,
+    "nucleo": benchmark_nucleo,
+    "paralelo": benchmark_paralelo,
+    "servidor": benchmark_servidor,
+    "latencia": benchmark_latencia,
+    "fluxos": benchmark_fluxos,
+    "posicionamento": benchmark_posicionamento,
+    "relatorios": benchmark_relatorios,
+}
+
+
+def main():
+    # Subcomandos (build, ping, ...) e --benchmark rodam sem menu, pelo argparse
+    if len(sys.argv) > 1 and (sys.argv[1] in COMANDOS_CLI or sys.argv[1].startswith("-")):
+        return executar_cli(sys.argv[1:])
+    # Se um arquivo de topologia (JSON/TOML/YAML) for passado na linha de comando,
+    # a rede é construída a partir dele, sem prompts.
+    if len(sys.argv) > 1:
+        rede = construir_rede(sys.argv[1])
+    else:
+        rede = configurar_rede()
+    G, subredes, enderecos_ip, _, _, roteadores = rede[:6]
+    fibs = construir_fibs(subredes, enderecos_ip, roteadores)
+    obter_indice_percursos(G)
+    exibir_topologia(G)
+    menu(*rede, fibs)
 
 
-main()
+if __name__ == "__main__":
+    main()
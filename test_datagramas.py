@@ -0,0 +1,72 @@
+import pytest
+
+import projeto2_FINALFINAL as projeto
+
+
+def _lote(ttls):
+    lote = projeto.LoteDatagramas()
+    for ttl in ttls:
+        lote.adicionar_campos("10.0.0.1", "10.0.0.2", b"dados", protocol=17, ttl=ttl)
+    return lote
+
+
+def test_lote_decrementa_ate_zero_e_para():
+    lote = _lote([1, 3])
+    assert lote.decrementar_ttl().tolist() == [0, 2]
+    assert lote.decrementar_ttl().tolist() == [0, 1]
+    assert lote.ttl[:2].tolist() == [0, 1]
+    assert projeto.verificar_checksums(lote.serializar()).all()
+
+
+def test_linha_do_lote_com_ttl_zero_recusa_decremento():
+    lote = _lote([1])
+    assert lote[0].decrement_ttl() == 0
+    with pytest.raises(ValueError, match="TTL"):
+        lote[0].decrement_ttl()
+    assert projeto.verificar_checksums(lote.serializar()).all()
+
+
+def _blob():
+    return b"".join(projeto.IPDatagram("10.0.0.1", "10.0.0.2", b"x" * 100, "UDP").generate() for _ in range(2))
+
+
+def test_indexar_datagramas():
+    blob = _blob()
+    assert projeto.indexar_datagramas(blob).tolist() == [0, 120]
+    assert projeto.verificar_checksums(blob).tolist() == [True, True]
+
+
+@pytest.mark.parametrize("sobra", [50, 10])
+def test_indexar_recusa_datagrama_truncado(sobra):
+    blob = _blob()
+    with pytest.raises(ValueError, match="offset 240"):
+        projeto.indexar_datagramas(blob + blob[:sobra])
+
+
+def test_indexar_recusa_ihl_alem_do_buffer():
+    blob = bytearray(_blob())
+    blob[120] = 0x4F  # IHL 15: 60 bytes de cabeçalho, total continua 120
+    blob[122:124] = (40).to_bytes(2, "big")
+    with pytest.raises(ValueError, match="offset 120"):
+        projeto.verificar_checksums(bytes(blob[:150]))
+
+
+def test_ipdatagram_recusa_decremento_com_ttl_zero():
+    datagrama = projeto.IPDatagram("10.0.0.1", "10.0.0.2", b"dados", "UDP", ttl=1)
+    datagrama.generate()
+    assert datagrama.decrement_ttl() == 0
+    assert datagrama.checksum == datagrama.compute_checksum()
+    with pytest.raises(ValueError, match="TTL"):
+        datagrama.decrement_ttl()
+    assert datagrama.ttl == 0
+    datagrama.generate()
+
+
+def test_buffer_recusa_decremento_com_ttl_zero():
+    buffer = bytearray(projeto.IPDatagram("10.0.0.1", "10.0.0.2", b"dados", "UDP", ttl=1).generate())
+    assert projeto.decrementar_ttl_em_buffer(buffer) == 0
+    original = bytes(buffer)
+    with pytest.raises(ValueError, match="TTL"):
+        projeto.decrementar_ttl_em_buffer(buffer)
+    assert bytes(buffer) == original
+    assert projeto.verificar_checksums(bytes(buffer)).all()
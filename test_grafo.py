@@ -0,0 +1,49 @@
+import pytest
+
+import projeto2_FINALFINAL as projeto
+
+
+@pytest.fixture
+def rede():
+    return projeto.construir_rede({"roteadores": 2, "subredes": {"e1": 3, "e2": 0, "e3": 2}, "semente": 3})
+
+
+def test_construir_rede_entrega_o_nucleo(rede):
+    G, especificacoes = rede[0], rede[7]
+    assert isinstance(G, projeto.GrafoCSR)
+    assert G.number_of_nodes() == len(rede[2])
+    assert len(especificacoes["Enlaces"]) == G.number_of_edges()
+    assert all(G.edges[u, v] is atributos for u, v, atributos in especificacoes["Enlaces"])
+
+    exportado = G.para_networkx()
+    assert dict(exportado.nodes(data=True)) == dict(G.nodes(data=True))
+    assert {frozenset((u, v)): d for u, v, d in exportado.edges(data=True)} == \
+        {frozenset((u, v)): d for u, v, d in G.edges(data=True)}
+    assert {v: d for v, d in exportado["Switch e1"].items()} == dict(G["Switch e1"].items())
+
+
+def test_rede_mutavel_exporta_para_networkx(rede):
+    mutavel = projeto.Rede(*rede)
+    assert isinstance(mutavel.G, projeto.GrafoRede)
+    assert isinstance(mutavel.especificacoes_rede["Enlaces"], list)
+    host = mutavel.adicionar_host("e2")
+    assert mutavel.G.has_edge("Switch e2", host)
+    assert projeto._conferir_rede(mutavel, amostra=20) == []
+
+
+def test_indice_sobre_o_nucleo_igual_ao_do_networkx(rede):
+    G = rede[0]
+    nucleo = projeto.IndicePercursos(G)
+    grafo = projeto.IndicePercursos(G.para_networkx())
+    assert nucleo.arvore and nucleo.num_componentes == grafo.num_componentes == 1
+    for u in G.nomes:
+        for v in ("Switch e1", "Host e3-2", u):
+            assert nucleo.caminho(u, v) == grafo.caminho(u, v)
+
+    # Um ciclo tira a topologia da árvore, e as consultas recorrem ao networkx
+    com_ciclo = G.para_networkx()
+    com_ciclo.add_edge("Host e1-1", "Host e3-1")
+    indice = projeto.IndicePercursos(projeto.GrafoCSR.de_grafo(com_ciclo))
+    assert not indice.arvore
+    assert indice.caminho("Host e1-2", "Host e3-2") == ["Host e1-2", "Switch e1", "Host e1-1", "Host e3-1",
+                                                        "Switch e3", "Host e3-2"]
@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+import projeto2_FINALFINAL as projeto
+
+
+@pytest.fixture(scope="module")
+def rede():
+    return projeto.construir_rede(projeto.gerar_especificacao(2, 2, 3, 5))
+
+
+def test_mesmos_campos_com_uma_ou_mais_sondas(rede):
+    G, subredes, enderecos_ip = rede[:3]
+    consulta = [{"origem": subredes["e1"]["hosts"][0], "destino": subredes["e2"]["hosts"][0]}]
+    um = projeto._resultados_ping(G, enderecos_ip, consulta, semente=1)[0]
+    varios = projeto._resultados_ping(G, enderecos_ip, consulta, semente=1, contagem=5)[0]
+    assert list(um) == list(varios)
+    assert um["enviados"] == 1 and varios["enviados"] == 5
+    assert um["min_ms"] == um["avg_ms"] == um["p99_ms"] and um["mdev_ms"] == 0.0
+
+
+def test_sonda_unica_perdida():
+    campos = projeto._campos_sonda_unica(math.nan)
+    assert campos["recebidos"] == 0 and campos["perda_pct"] == 100.0 and campos["avg_ms"] is None
+
+
+def test_sem_trafego_de_fundo_igual_ao_simulador_de_eventos(rede):
+    G, subredes, enderecos_ip = rede[:3]
+    origem, destino = subredes["e1"]["hosts"][0], subredes["e4"]["hosts"][0]
+    rtts = projeto.SimuladorEventos(G, enderecos_ip).ping(origem, destino, 3, intervalo=0.01)
+    modelo = projeto.sondar(G, origem, destino, 3, intervalo=0.01, trafego_fundo=False)["rtt_ms"]
+    assert modelo == pytest.approx([rtt * 1e3 for rtt in rtts])
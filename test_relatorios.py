@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+import projeto2_FINALFINAL as projeto
+
+
+@pytest.fixture(scope="module")
+def rede():
+    return projeto.construir_rede(projeto.gerar_especificacao(2, 2, 3, 5))
+
+
+def test_roteador_desconhecido_e_recusado(rede):
+    G, subredes, enderecos_ip, especificacoes = rede[0], rede[1], rede[2], rede[7]
+    with pytest.raises(ValueError, match="Roteador 'Roteador 99'"):
+        projeto.linhas_enderecos(enderecos_ip, G, subredes, roteador="Roteador 99")
+    with pytest.raises(ValueError, match="Roteador 'Roteador 99'"):
+        projeto.linhas_subredes(subredes, "Roteador 99")
+    with pytest.raises(ValueError, match="Roteador 'Roteador 99'"):
+        list(projeto.linhas_enlaces(especificacoes, subredes, roteador="Roteador 99"))
+
+
+def test_filtro_por_roteador(rede):
+    subredes = rede[1]
+    roteador = next(iter(subredes.values()))["roteador"]
+    linhas = list(projeto.linhas_subredes(subredes, roteador))
+    assert linhas and all(linha["roteador"] == roteador for linha in linhas)
+
+
+def test_csv_vazio_tem_cabecalho(rede):
+    G, enderecos_ip = rede[0], rede[2]
+    saida = io.StringIO()
+    total = projeto.exportar_relatorio(projeto.linhas_enderecos(enderecos_ip, G, tipo="Inexistente"), saida, "csv",
+                                       colunas=projeto.COLUNAS_RELATORIO["enderecos"])
+    assert total == 0
+    assert saida.getvalue() == "dispositivo,ip,tipo\n"
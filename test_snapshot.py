@@ -0,0 +1,92 @@
+import struct
+
+import pytest
+
+import projeto2_FINALFINAL as projeto
+
+
+ESPECIFICACAO = {
+    "roteadores": 2,
+    "subredes": [
+        {"nome": "e1", "capacidade": 3},
+        {"nome": "e2", "capacidade": 0},
+        {"nome": "e3", "capacidade": 2},
+        {"nome": "e4", "capacidade": 0},
+    ],
+    "semente": 7,
+}
+
+
+@pytest.fixture
+def rede():
+    return projeto.construir_rede(ESPECIFICACAO)
+
+
+def _enlaces(especificacoes_rede):
+    return sorted((u, v, tuple(sorted(atributos.items()))) for u, v, atributos in especificacoes_rede["Enlaces"])
+
+
+def test_ida_e_volta(rede, tmp_path):
+    caminho = tmp_path / "rede.snap"
+    projeto.salvar_snapshot(rede, caminho)
+    assert projeto.eh_snapshot(caminho)
+
+    G, subredes, enderecos_ip, mascaras, por_roteador, roteadores, borda, especificacoes = rede
+    G2, subredes2, enderecos_ip2, mascaras2, por_roteador2, roteadores2, borda2, especificacoes2 = \
+        projeto.Snapshot(caminho).rede()
+
+    assert dict(G2.nodes(data=True)) == dict(G.nodes(data=True))
+    assert {frozenset((u, v)): d for u, v, d in G2.edges(data=True)} == \
+        {frozenset((u, v)): d for u, v, d in G.edges(data=True)}
+    assert dict(enderecos_ip2) == dict(enderecos_ip)
+    assert subredes2 == subredes
+    assert subredes2["e2"]["hosts"] == [] and subredes2["e4"]["hosts"] == []
+    assert mascaras2 == mascaras
+    assert por_roteador2 == por_roteador
+    assert roteadores2 == roteadores
+    assert borda2 == borda
+    assert {k: v for k, v in especificacoes2.items() if k != "Enlaces"} == \
+        {k: v for k, v in especificacoes.items() if k != "Enlaces"}
+    assert _enlaces(especificacoes2) == _enlaces(especificacoes)
+
+
+def test_construir_rede_aceita_snapshot(rede, tmp_path):
+    caminho = tmp_path / "rede.snap"
+    projeto.salvar_snapshot(rede, caminho)
+    recarregada = projeto.construir_rede(str(caminho))
+    assert dict(recarregada[2]) == dict(rede[2])
+    assert projeto.ping_lote(recarregada[0], [("Host e1-1", "Host e3-2")])["alcancavel"].all()
+
+
+def test_tabela_e_grafo_compartilham_as_posicoes(rede, tmp_path):
+    caminho = tmp_path / "rede.snap"
+    projeto.salvar_snapshot(rede, caminho)
+    G, _, enderecos_ip = projeto.construir_rede(str(caminho))[:3]
+    assert G.ids is enderecos_ip._posicao
+    assert G.ids["Host e3-2"] == G.nomes.index("Host e3-2")
+    assert "Host e9-1" not in G.ids and 7 not in G.ids
+
+    # A tabela copia as posições antes de ganhar um nome; o grafo não muda
+    enderecos_ip["Host novo"] = "10.0.0.1"
+    assert "Host novo" not in G.ids and G.ids is not enderecos_ip._posicao
+    assert enderecos_ip["Host novo"] == "10.0.0.1"
+    assert enderecos_ip["Host e3-2"] == rede[2]["Host e3-2"]
+
+
+def test_versao_mais_nova_e_recusada(rede, tmp_path):
+    caminho = tmp_path / "rede.snap"
+    projeto.salvar_snapshot(rede, caminho)
+    with open(caminho, "r+b") as arquivo:
+        magico, _, tamanho = struct.unpack_from("<8sII", arquivo.read(16))
+        arquivo.seek(0)
+        arquivo.write(struct.pack("<8sII", magico, projeto.VERSAO_SNAPSHOT + 1, tamanho))
+    with pytest.raises(ValueError, match="versão"):
+        projeto.Snapshot(caminho)
+
+
+def test_arquivo_que_nao_e_snapshot(tmp_path):
+    caminho = tmp_path / "topologia.json"
+    caminho.write_text('{"roteadores": 1}', encoding="utf-8")
+    assert not projeto.eh_snapshot(caminho)
+    with pytest.raises(ValueError, match="não é um snapshot"):
+        projeto.Snapshot(caminho)